@@ -1,9 +1,16 @@
 from langchain_core.messages import HumanMessage
-from langchain_community.chat_models import ChatOllama
+from services import chat_intents, fallback_content, model_router
 import json
 
 def chat_node(state):
-    llm = ChatOllama(model="llama3.2", base_url="http://127.0.0.1:11434")
+    preferences = state.get('preferences', {})
+    # Factual lookups (fees, hours, permits, festivals, helplines) are answered from data
+    intent = chat_intents.match(state['user_question'], preferences.get('destination', ''), preferences.get('month', ''))
+    if intent.answered:
+        chat_entry = {"question": state['user_question'], "response": intent.answer}
+        chat_history = state.get('chat_history', []) + [chat_entry]
+        return {"chat_response": intent.answer, "chat_history": chat_history, "intent": intent.intent}
+
     prompt = f"""
     Context:
     Preferences: {json.dumps(state['preferences'], indent=2)}
@@ -16,7 +23,7 @@ def chat_node(state):
     {{ "chat_response": "Your response here" }}
     """
     try:
-        result = llm.invoke([HumanMessage(content=prompt)]).content
+        result = model_router.invoke("chat", [HumanMessage(content=prompt)], deadline=state.get('deadline'))
         try:
             parsed = json.loads(result.strip())
             response = parsed.get("chat_response", result.strip())
@@ -24,6 +31,8 @@ def chat_node(state):
             response = result.strip()
         chat_entry = {"question": state['user_question'], "response": response}
         chat_history = state.get('chat_history', []) + [chat_entry]
-        return {"chat_response": response, "chat_history": chat_history}
+        return {"chat_response": response, "chat_history": chat_history, **model_router.truncation(result)}
+    except model_router.LLMUnavailable:
+        return {"chat_response": fallback_content.render("chat", state.get('preferences', {})), "fallback": True}
     except Exception as e:
-        return {"chat_response": "", "warning": str(e)}
\ No newline at end of file
+        return {"chat_response": fallback_content.render("chat", state.get('preferences', {})), "fallback": True, "warning": str(e)}
\ No newline at end of file
@@ -2,7 +2,7 @@
 Specialized cultural recommendations agent for Jharkhand tribal cultur
 """
 from langchain_core.messages import HumanMessage
-from langchain_community.chat_models import ChatOllama
+from services import fallback_content, inventory, model_router, poi_ranker
 import json
 import sys
 import os
@@ -10,40 +10,11 @@ import os
 # Add data directory to path to import our data loader
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
 from data_loader import jharkhand_data
+from data_records import jharkhand_records, prompt_json
 
 def get_cultural_activities_by_interest(tribal_interest, special_interests):
-    """Filter cultural activities based on interest level and special interests"""
-    activities = []
-    
-    if tribal_interest in ["High", "Very High"]:
-        activities.extend([
-            "Tribal village homestays",
-            "Traditional music and dance performances", 
-            "Cultural storytelling sessions",
-            "Traditional medicine workshops",
-            "Sacred grove visits",
-            "Community-based tourism activities"
-        ])
-    
-    if tribal_interest in ["Medium", "High", "Very High"]:
-        activities.extend([
-            "Handicraft workshops",
-            "Local market visits",
-            "Cultural museum visits",
-            "Traditional cooking classes"
-        ])
-    
-    # Add activities based on special interests
-    if "Tribal festivals & ceremonies" in special_interests:
-        activities.append("Tribal festival participation")
-    if "Handicraft workshops" in special_interests:
-        activities.append("Artisan workshop visits")
-    if "Traditional music & dance" in special_interests:
-        activities.append("Traditional performance attendance")
-    if "Local cuisine & cooking" in special_interests:
-        activities.append("Traditional cooking experiences")
-    
-    return list(set(activities))  # Remove duplicates
+    """Cultural activities for the interest level and special interests, best match first"""
+    return poi_ranker.rank_cultural_activities(tribal_interest, special_interests)
 
 def get_community_interaction_guidelines():
     """Get guidelines for respectful community interaction"""
@@ -69,8 +40,6 @@ def get_community_interaction_guidelines():
 
 def cultural_recommender(state):
     """Specialized cultural recommendations agent"""
-    llm = ChatOllama(model="llama3.2", base_url="http://127.0.0.1:11434")
-    
     # Extract preferences
     preferences = state.get('preferences', {})
     month = preferences.get('month', 'October').lower()
@@ -81,16 +50,17 @@ def cultural_recommender(state):
     
     # Get cultural data
     try:
-        festivals = jharkhand_data.get_tribal_festivals_by_month(month)
-        workshops = jharkhand_data.get_handicraft_workshops()
-        homestays = jharkhand_data.get_homestay_options()
-        guides = jharkhand_data.get_local_guides()
+        festivals = jharkhand_records.festivals_by_month(month)
+        # Only places with room for the group on the trip dates
+        workshops = inventory.available(inventory.WORKSHOP, jharkhand_records.workshops(), preferences)
+        homestays = inventory.available(inventory.HOMESTAY, jharkhand_records.homestays(), preferences)
+        guides = inventory.available(inventory.GUIDE, jharkhand_records.guides(), preferences)
         etiquette = jharkhand_data.get_cultural_etiquette()
     except Exception as e:
-        festivals = []
-        workshops = []
-        homestays = []
-        guides = []
+        festivals = ()
+        workshops = ()
+        homestays = ()
+        guides = ()
         etiquette = {}
     
     # Get filtered activities
@@ -111,31 +81,13 @@ You are a Jharkhand tribal culture specialist focused on authentic cultural expe
 {json.dumps(cultural_activities, indent=2)}
 
 **AVAILABLE TRIBAL FESTIVALS ({month}):**
-{json.dumps([{{
-    'name': f['name'],
-    'description': f['description'],
-    'activities': f['activities'],
-    'best_locations': f['best_locations'],
-    'visitor_experience': f['visitor_experience']
-}} for f in festivals], indent=2)}
+{prompt_json(festivals)}
 
 **AUTHENTIC WORKSHOPS:**
-{json.dumps([{{
-    'name': w['name'],
-    'location': w['location'],
-    'craft_type': w['craft_type'],
-    'description': w['description'],
-    'cost': w['cost'],
-    'group_size': w['group_size']
-}} for w in workshops], indent=2)}
+{prompt_json(workshops)}
 
 **CULTURAL HOMESTAYS:**
-{json.dumps([{{
-    'name': h['name'],
-    'community': h['community'],
-    'description': h['description'],
-    'special_features': h['special_features']
-}} for h in homestays], indent=2)}
+{prompt_json(homestays)}
 
 **COMMUNITY INTERACTION GUIDELINES:**
 {json.dumps(interaction_guidelines, indent=2)}
@@ -175,8 +127,10 @@ Make recommendations that promote authentic cultural exchange while respecting a
 """
     
     try:
-        result = llm.invoke([HumanMessage(content=prompt)]).content
-        return {"cultural_recommendations": result.strip()}
+        result = model_router.invoke("cultural", [HumanMessage(content=prompt)], deadline=state.get('deadline'))
+        return {"cultural_recommendations": result.strip(), **model_router.truncation(result)}
+    except model_router.LLMUnavailable:
+        return {"cultural_recommendations": fallback_content.render("cultural", preferences), "fallback": True}
     except Exception as e:
-        return {"cultural_recommendations": "", "warning": str(e)}
+        return {"cultural_recommendations": fallback_content.render("cultural", preferences), "fallback": True, "warning": str(e)}
         
\ No newline at end of file
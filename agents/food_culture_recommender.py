@@ -1,5 +1,5 @@
 from langchain_core.messages import HumanMessage
-from langchain_community.chat_models import ChatOllama
+from services import fallback_content, model_router
 import json
 import sys
 import os
@@ -7,19 +7,18 @@ import os
 # Add data directory to path to import our data loader
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
 from data_loader import jharkhand_data
+from data_records import jharkhand_records, prompt_json
 
 def load_jharkhand_cuisine():
     """Load Jharkhand cuisine data"""
     try:
-        file_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'jharkhand_cuisine.json')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return jharkhand_data.load_cuisine_data()
     except Exception as e:
         return {}
 
-def get_dishes_by_preference(cuisine_data, preferences):
+def get_dishes_by_preference(preferences):
     """Filter dishes based on user preferences"""
-    dishes = cuisine_data.get('traditional_dishes', [])
+    dishes = jharkhand_records.dishes()
     filtered_dishes = []
     
     # Filter by dietary preferences
@@ -29,10 +28,10 @@ def get_dishes_by_preference(cuisine_data, preferences):
         # Include all dishes by default, but prioritize based on interests
         if "Local cuisine & cooking" in dietary_prefs:
             filtered_dishes.append(dish)
-        elif dish['category'] in ['main_course', 'bread', 'side_dish']:
+        elif dish.category in ['main_course', 'bread', 'side_dish']:
             filtered_dishes.append(dish)
     
-    return filtered_dishes[:6]  # Limit to 6 dishes for better focus
+    return tuple(filtered_dishes[:6])  # Limit to 6 dishes for better focus
 
 def get_dining_recommendations_by_location(destination, cuisine_data):
     """Get dining recommendations based on destination"""
@@ -50,8 +49,6 @@ def get_dining_recommendations_by_location(destination, cuisine_data):
         return ["Traditional Jharkhand cuisine", "Local tribal food", "Regional specialties"]
 
 def food_culture_recommender(state):
-    llm = ChatOllama(model="llama3.2", base_url="http://127.0.0.1:11434")
-    
     # Extract preferences
     preferences = state.get('preferences', {})
     destination = preferences.get('destination', 'Jharkhand')
@@ -64,7 +61,7 @@ def food_culture_recommender(state):
     cuisine_data = load_jharkhand_cuisine()
     
     # Get filtered dishes
-    recommended_dishes = get_dishes_by_preference(cuisine_data, preferences)
+    recommended_dishes = get_dishes_by_preference(preferences)
     
     # Get location-specific recommendations
     location_recommendations = get_dining_recommendations_by_location(destination, cuisine_data)
@@ -79,7 +76,7 @@ def food_culture_recommender(state):
     cooking_experiences = cuisine_data.get('cooking_experiences', [])
     
     # Get food markets
-    food_markets = cuisine_data.get('food_markets', [])
+    food_markets = jharkhand_records.markets()
     
     # Get dining etiquette
     dining_etiquette = cuisine_data.get('dining_etiquette', {})
@@ -98,7 +95,7 @@ You are a Jharkhand cuisine and culture specialist. Provide comprehensive food a
 {json.dumps(cuisine_data.get('cuisine_overview', {}), indent=2)}
 
 **RECOMMENDED TRADITIONAL DISHES:**
-{json.dumps(recommended_dishes, indent=2)}
+{prompt_json(recommended_dishes)}
 
 **LOCATION-SPECIFIC DINING:**
 {json.dumps(location_recommendations, indent=2)}
@@ -107,7 +104,7 @@ You are a Jharkhand cuisine and culture specialist. Provide comprehensive food a
 {json.dumps(cooking_experiences, indent=2)}
 
 **FOOD MARKETS TO VISIT:**
-{json.dumps(food_markets, indent=2)}
+{prompt_json(food_markets)}
 
 **DINING ETIQUETTE:**
 {json.dumps(dining_etiquette, indent=2)}
@@ -148,7 +145,9 @@ Make recommendations that promote authentic culinary experiences while respectin
 """
     
     try:
-        result = llm.invoke([HumanMessage(content=prompt)]).content
-        return {"food_culture_info": result.strip()}
+        result = model_router.invoke("food_culture", [HumanMessage(content=prompt)], deadline=state.get('deadline'))
+        return {"food_culture_info": result.strip(), **model_router.truncation(result)}
+    except model_router.LLMUnavailable:
+        return {"food_culture_info": fallback_content.render("food_culture", preferences), "fallback": True}
     except Exception as e:
-        return {"food_culture_info": "", "warning": str(e)}
\ No newline at end of file
+        return {"food_culture_info": fallback_content.render("food_culture", preferences), "fallback": True, "warning": str(e)}
\ No newline at end of file
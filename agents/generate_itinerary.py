@@ -1,5 +1,7 @@
 from langchain_core.messages import HumanMessage
-from langchain_community.chat_models import ChatOllama
+from services import (
+    event_calendar, fallback_content, inventory, model_router, poi_ranker, travel_times, trip_budget
+)
 import json
 import sys
 import os
@@ -7,22 +9,11 @@ import os
 # Add data directory to path to import our data loader
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
 from data_loader import jharkhand_data
+from data_records import jharkhand_records, prompt_json
 
-def get_tourism_focus_pois(tourism_type, suitable_pois):
-    """Filter POIs based on tourism type preference"""
-    if tourism_type == "Eco-Tourism & Nature":
-        return [poi for poi in suitable_pois if poi['category'] == 'nature']
-    elif tourism_type == "Tribal Culture & Heritage":
-        return [poi for poi in suitable_pois if poi['category'] == 'cultural'] + \
-               [poi for poi in suitable_pois if 'tribal' in poi['description'].lower()]
-    elif tourism_type == "Pilgrimage & Spiritual":
-        return [poi for poi in suitable_pois if poi['category'] == 'religious']
-    elif tourism_type == "Adventure & Trekking":
-        return [poi for poi in suitable_pois if poi['difficulty_level'] in ['moderate', 'challenging']]
-    elif tourism_type == "Photography & Wildlife":
-        return [poi for poi in suitable_pois if 'photography' in poi['activities'] or poi['category'] == 'nature']
-    else:  # Mixed Experience
-        return suitable_pois
+def get_tourism_focus_pois(preferences, month):
+    """POIs open in the month that match the tourism type, ranked by fit with the preferences"""
+    return poi_ranker.rank_pois(preferences, month)
 
 def get_accommodation_suggestions(accommodation_type, budget_range):
     """Get accommodation suggestions based on preferences"""
@@ -48,8 +39,6 @@ def get_accommodation_suggestions(accommodation_type, budget_range):
     return suggestions
 
 def generate_itinerary(state):
-    llm = ChatOllama(model="llama3.2", base_url="http://127.0.0.1:11434")
-    
     # Extract preferences
     preferences = state.get('preferences', {})
     month = preferences.get('month', 'October').lower()
@@ -63,23 +52,18 @@ def generate_itinerary(state):
     
     # Get Jharkhand-specific data
     try:
-        # Get suitable POIs for the month
-        suitable_pois = jharkhand_data.get_pois_by_season(month)
-        
-        # Filter POIs based on tourism type
-        focused_pois = get_tourism_focus_pois(tourism_type, suitable_pois)
+        # Rank the POIs open this month by fit with the tourism type and preferences
+        focused_pois = get_tourism_focus_pois(preferences, month)
         
         # Get seasonal recommendations
         seasonal_info = jharkhand_data.get_seasonal_recommendations(month)
         
         # Get tribal festivals for the month
-        festivals = jharkhand_data.get_tribal_festivals_by_month(month)
-        
-        # Get handicraft workshops
-        workshops = jharkhand_data.get_handicraft_workshops()
+        festivals = jharkhand_records.festivals_by_month(month)
         
-        # Get homestay options
-        homestays = jharkhand_data.get_homestay_options()
+        # Get handicraft workshops and homestays with room for the group on the trip dates
+        workshops = inventory.available(inventory.WORKSHOP, jharkhand_records.workshops(), preferences)
+        homestays = inventory.available(inventory.HOMESTAY, jharkhand_records.homestays(), preferences)
         
         # Get cultural etiquette
         etiquette = jharkhand_data.get_cultural_etiquette()
@@ -87,6 +71,14 @@ def generate_itinerary(state):
         # Get accommodation suggestions
         accommodation_suggestions = get_accommodation_suggestions(accommodation_type, budget_range)
         
+        # Driving times in this season from the destination and between the destinations
+        travel_legs = travel_times.itinerary_legs(
+            preferences.get('destination') or 'Ranchi', [poi['id'] for poi in focused_pois[:8]], month
+        )
+        
+        # Costs computed from the data, so the model does not have to guess prices
+        budget_lines = trip_budget.prompt_text(trip_budget.compute_budget(preferences))
+        
     except Exception as e:
         # Fallback to basic data if loading fails
         focused_pois = []
@@ -96,6 +88,31 @@ def generate_itinerary(state):
         homestays = []
         etiquette = {}
         accommodation_suggestions = []
+        travel_legs = []
+        budget_lines = ""
+    
+    # Festivals and workshops on the actual travel dates, when they are known; a bad
+    # date range (e.g. a trip over a year long) only drops this section
+    try:
+        dated_events = event_calendar.trip_events(preferences) if preferences.get('start_date') else []
+    except (ValueError, OverflowError):
+        dated_events = []
+    
+    dates_section = ""
+    if dated_events:
+        dates_section = f"""
+**EVENTS DURING THE TRAVEL DATES (trip starts {preferences['start_date']}):**
+{json.dumps([
+    {
+        'name': event['name'],
+        'type': event['kind'],
+        'runs': event['starts'] + ' to ' + event['ends'],
+        'locations': event['locations'],
+        'duration': event.get('duration', ''),
+    }
+    for event in dated_events
+], indent=2)}
+"""
     
     # Create comprehensive prompt with Jharkhand context
     prompt = f"""
@@ -117,30 +134,22 @@ You are an expert Jharkhand eco-cultural tourism specialist. Create a detailed,
 {json.dumps(seasonal_info, indent=2)}
 
 **AVAILABLE DESTINATIONS (focused on {tourism_type} for {month}):**
-{json.dumps([
-    {
-        'name': poi['name'],
-        'category': poi['category'],
-        'description': poi['description'],
-        'activities': poi['activities'],
-        'duration_recommended': poi['duration_recommended'],
-        'difficulty_level': poi['difficulty_level'],
-        'entry_fee': poi['entry_fee'],
-        'special_notes': poi['special_notes'],
-        'cultural_significance': poi.get('cultural_significance', ''),
-        'safety_notes': poi.get('safety_notes', '')
-    }
-    for poi in focused_pois[:8]
-], indent=2)}
+{prompt_json(jharkhand_records.pois([poi['id'] for poi in focused_pois[:8]]))}
 
 **TRIBAL CULTURAL OPPORTUNITIES:**
-Festivals: {json.dumps([f['name'] for f in festivals], indent=2)}
-Workshops: {json.dumps([w['name'] + ' (' + w['location'] + ')' for w in workshops[:3]], indent=2)}
-Homestays: {json.dumps([h['name'] + ' (' + h['community'] + ')' for h in homestays[:2]], indent=2)}
+Festivals: {json.dumps([f.name for f in festivals], indent=2)}
+Workshops: {json.dumps([w.name + ' (' + w.location + ')' for w in workshops[:3]], indent=2)}
+Homestays: {json.dumps([h.name + ' (' + h.community + ')' for h in homestays[:2]], indent=2)}
+{dates_section}
+**TRAVEL TIMES ({travel_times.season_of(month).replace('_', '-')} road conditions):**
+{json.dumps(travel_legs, indent=2)}
 
 **ACCOMMODATION SUGGESTIONS:**
 {json.dumps(accommodation_suggestions, indent=2)}
 
+**COMPUTED TRIP BUDGET (INR):**
+{budget_lines}
+
 **CULTURAL ETIQUETTE GUIDELINES:**
 {json.dumps(etiquette, indent=2)}
 
@@ -153,11 +162,11 @@ Homestays: {json.dumps([h['name'] + ' (' + h['community'] + ')' for h in homesta
 3. Respect seasonal constraints and accessibility (monsoon considerations)
 4. Include cultural experiences appropriate for the tribal_interest level
 5. Suggest accommodation based on accommodation_type preference
-6. Include practical information: travel times, entry fees, safety notes
+6. Include practical information: travel times (use the TRAVEL TIMES above), entry fees, safety notes
 7. Add cultural etiquette reminders where relevant
 8. Balance popular attractions with authentic local experiences
 9. Include downtime and cultural immersion opportunities
-10. Provide budget-conscious suggestions in INR
+10. Quote costs only from the COMPUTED TRIP BUDGET and the entry fees above; do not estimate other prices
 11. Incorporate special interests from the user's preferences
 12. Consider mobility level for activity recommendations
 13. Include local transportation options and costs
@@ -174,7 +183,7 @@ Homestays: {json.dumps([h['name'] + ' (' + h['community'] + ')' for h in homesta
 - Include local food recommendations and cultural dining experiences
 - Suggest photography opportunities and cultural interaction guidelines
 - Add weather considerations and seasonal advice
-- Include budget breakdown and cost-saving tips
+- Include the computed budget breakdown and cost-saving tips
 
 **CULTURAL SENSITIVITY:**
 - Always emphasize respect for tribal communities and their traditions
@@ -187,7 +196,13 @@ Make the itinerary authentic, respectful, and focused on sustainable eco-cultura
 """
     
     try:
-        result = llm.invoke([HumanMessage(content=prompt)]).content
-        return {"itinerary": result.strip()}
+        # Day trips are short enough for the small model
+        request_class = "day_trip" if int(duration) <= 1 else None
+        result = model_router.invoke("itinerary", [HumanMessage(content=prompt)], request_class,
+                                     deadline=state.get('deadline'))
+        return {"itinerary": result.strip(), **model_router.truncation(result)}
+    except model_router.LLMUnavailable:
+        return {"itinerary": fallback_content.render("itinerary", preferences), "fallback": True}
     except Exception as e:
-        return {"itinerary": "", "warning": str(e)}
\ No newline at end of file
+        # Any other failed generation (timeout, bad response) also gets the data-only answer
+        return {"itinerary": fallback_content.render("itinerary", preferences), "fallback": True, "warning": str(e)}
\ No newline at end of file
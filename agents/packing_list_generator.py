@@ -1,14 +1,143 @@
+"""
+Rule-based packing list agent for Jharkhand tourism
+
+The list is computed from data/packing_rules.json (keyed on season, tourism
+type, mobility level and trip length), so no LLM call is needed. The LLM is
+only used to add personalised notes when the traveller left comments.
+"""
 from langchain_core.messages import HumanMessage
-from langchain_community.chat_models import ChatOllama
+from services import model_router
+from functools import lru_cache
+import math
+import sys
+import os
 
-def packing_list_generator(state):
-    llm = ChatOllama(model="llama3.2", base_url="http://127.0.0.1:11434")
+# Add data directory to path to import our data loader
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
+from data_loader import jharkhand_data
+
+TOURISM_TYPE_KEYWORDS = {
+    'eco_nature': ['eco', 'nature', 'waterfall', 'hill'],
+    'tribal_culture': ['tribal', 'culture', 'heritage', 'village', 'handicraft'],
+    'pilgrimage': ['pilgrim', 'spiritual', 'temple', 'religious'],
+    'adventure': ['adventure', 'trek', 'hiking', 'camping'],
+    'photography_wildlife': ['photo', 'wildlife', 'safari', 'bird'],
+}
+
+# Season label for a trip across seasons (or not tied to one); packs for all of them
+MIXED_SEASON = 'mixed'
+
+def resolve_season(month_or_season):
+    """Map a month name or a season label (e.g. 'Post-Monsoon', 'Mixed') to a season key"""
+    key = (month_or_season or '').strip().lower().replace('-', '_').replace(' ', '_')
+    seasons = jharkhand_data.load_seasonal_constraints()['seasons']
+    if key in seasons or key == MIXED_SEASON:
+        return key
+    return jharkhand_data.get_season_for_month(key) or 'post_monsoon'
+
+def season_keys(season):
+    """The seasons whose rules apply: every season for a mixed trip"""
+    if season == MIXED_SEASON:
+        return list(jharkhand_data.load_seasonal_constraints()['seasons'])
+    return [season]
+
+def resolve_tourism_types(holiday_type):
+    """Map a tourism type or free-text activity list to rule keys"""
+    text = (holiday_type or '').lower()
+    types = [name for name, keywords in TOURISM_TYPE_KEYWORDS.items()
+             if any(keyword in text for keyword in keywords)]
+    return tuple(sorted(types)) or ('mixed',)
+
+def resolve_mobility(mobility_level):
+    """Map a mobility level label to a rule key"""
+    level = (mobility_level or '').lower()
+    for key in ['easy', 'active', 'adventure']:
+        if level.startswith(key):
+            return key
+    return 'moderate'
+
+def item_quantity(rule, days):
+    """Quantity of an item for a trip of the given length"""
+    quantity = rule.get('base', 1) + math.ceil(rule.get('per_day', 0) * days)
+    return min(quantity, rule.get('max', quantity))
+
+@lru_cache(maxsize=512)
+def compute_packing_items(season, tourism_types, mobility, days):
+    """Compute (category, item, quantity) tuples for a trip, grouped by category"""
+    rules = jharkhand_data.load_packing_rules()
+    selected = list(rules['essentials'])
+    for key in season_keys(season):
+        selected += rules['seasons'].get(key, [])
+    for tourism_type in tourism_types:
+        selected += rules['tourism_types'].get(tourism_type, [])
+    selected += rules['mobility'].get(mobility, [])
+    if days >= rules['duration']['long_trip_days']:
+        selected += rules['duration']['long_trip']
+
+    # The same item can come from several rule groups; keep the largest quantity
+    quantities = {}
+    for rule in selected:
+        key = (rule['category'], rule['item'])
+        quantities[key] = max(quantities.get(key, 0), item_quantity(rule, days))
+
+    order = {category: i for i, category in enumerate(rules['categories'])}
+    return tuple(sorted(
+        ((category, item, quantity) for (category, item), quantity in quantities.items()),
+        key=lambda entry: order.get(entry[0], len(order))
+    ))
+
+@lru_cache(maxsize=512)
+def render_packing_list(season, tourism_types, mobility, days):
+    """Render the packing list body as markdown"""
+    lines = []
+    current_category = None
+    for category, item, quantity in compute_packing_items(season, tourism_types, mobility, days):
+        if category != current_category:
+            lines.append(f"\n**{category}**")
+            current_category = category
+        lines.append(f"- {item}" + (f" × {quantity}" if quantity > 1 else ""))
+
+    seasons = jharkhand_data.load_seasonal_constraints()['seasons']
+    precautions = []
+    for key in season_keys(season):
+        precautions += [p for p in seasons.get(key, {}).get('safety_precautions', []) if p not in precautions]
+    if precautions:
+        lines.append("\n**Seasonal Safety Precautions**")
+        lines.extend(f"- {precaution}" for precaution in precautions)
+    return "\n".join(lines).strip()
+
+def personalize_notes(preferences, packing_list, deadline=None):
+    """Ask the LLM for short personalised notes based on the traveller's comments"""
     prompt = f"""
-    Generate a comprehensive packing list for a {state['preferences'].get('holiday_type', 'general')} holiday in {state['preferences'].get('destination', '')} during {state['preferences'].get('month', '')} for {state['preferences'].get('duration', 0)} days.
-    Include essentials based on expected weather and trip type.
+    A traveller to {preferences.get('destination', 'Jharkhand')} left this comment: "{preferences.get('comments')}"
+    Their packing list is:
+    {packing_list}
+
+    In at most 4 short bullet points, suggest additions or changes to the list that address the comment. Do not repeat items already listed.
     """
+    return model_router.invoke("packing_list", [HumanMessage(content=prompt)], deadline=deadline).strip()
+
+def packing_list_generator(state):
+    preferences = state.get('preferences', {})
+    destination = preferences.get('destination', '') or 'Jharkhand'
+    month = preferences.get('month', '')
+    days = max(1, int(preferences.get('duration') or 1))
+    holiday_type = preferences.get('holiday_type') or preferences.get('tourism_type', '')
+
+    season = resolve_season(month)
+    packing_list = render_packing_list(
+        season,
+        resolve_tourism_types(holiday_type),
+        resolve_mobility(preferences.get('mobility_level', '')),
+        days,
+    )
+    header = f"### 🎒 Packing List: {destination} ({(month or season.replace('_', '-')).title()}, {days} days)"
+    result = f"{header}\n{packing_list}"
+
+    if not (preferences.get('comments') or '').strip():
+        return {"packing_list": result}
     try:
-        result = llm.invoke([HumanMessage(content=prompt)]).content
-        return {"packing_list": result.strip()}
+        notes = personalize_notes(preferences, packing_list, state.get('deadline'))
+        return {"packing_list": f"{result}\n\n**Personal Notes**\n{notes}"}
     except Exception as e:
-        return {"packing_list": "", "warning": str(e)}
+        return {"packing_list": result, "warning": str(e)}
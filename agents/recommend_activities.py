@@ -1,5 +1,5 @@
 from langchain_core.messages import HumanMessage
-from langchain_community.chat_models import ChatOllama
+from services import fallback_content, inventory, model_router, poi_ranker
 import json
 import sys
 import os
@@ -7,40 +7,11 @@ import os
 # Add data directory to path to import our data loader
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
 from data_loader import jharkhand_data
+from data_records import jharkhand_records, prompt_json
 
 def get_cultural_activities_by_interest(tribal_interest, special_interests):
-    """Filter cultural activities based on interest level and special interests"""
-    activities = []
-    
-    if tribal_interest in ["High", "Very High"]:
-        activities.extend([
-            "Tribal village homestays",
-            "Traditional music and dance performances", 
-            "Cultural storytelling sessions",
-            "Traditional medicine workshops",
-            "Sacred grove visits",
-            "Community-based tourism activities"
-        ])
-    
-    if tribal_interest in ["Medium", "High", "Very High"]:
-        activities.extend([
-            "Handicraft workshops",
-            "Local market visits",
-            "Cultural museum visits",
-            "Traditional cooking classes"
-        ])
-    
-    # Add activities based on special interests
-    if "Tribal festivals & ceremonies" in special_interests:
-        activities.append("Tribal festival participation")
-    if "Handicraft workshops" in special_interests:
-        activities.append("Artisan workshop visits")
-    if "Traditional music & dance" in special_interests:
-        activities.append("Traditional performance attendance")
-    if "Local cuisine & cooking" in special_interests:
-        activities.append("Traditional cooking experiences")
-    
-    return list(set(activities))  # Remove duplicates
+    """Cultural activities for the interest level and special interests, best match first"""
+    return poi_ranker.rank_cultural_activities(tribal_interest, special_interests)
 
 def get_community_interaction_guidelines():
     """Get guidelines for respectful community interaction"""
@@ -65,8 +36,6 @@ def get_community_interaction_guidelines():
     }
 
 def recommend_activities(state):
-    llm = ChatOllama(model="llama3.2", base_url="http://127.0.0.1:11434")
-    
     # Extract preferences
     preferences = state.get('preferences', {})
     month = preferences.get('month', 'October').lower()
@@ -80,16 +49,12 @@ def recommend_activities(state):
     # Get Jharkhand-specific cultural data
     try:
         # Get tribal festivals for the month
-        festivals = jharkhand_data.get_tribal_festivals_by_month(month)
-        
-        # Get handicraft workshops
-        workshops = jharkhand_data.get_handicraft_workshops()
-        
-        # Get homestay options
-        homestays = jharkhand_data.get_homestay_options()
+        festivals = jharkhand_records.festivals_by_month(month)
         
-        # Get local guides
-        guides = jharkhand_data.get_local_guides()
+        # Get handicraft workshops, homestays and local guides with room for the group on the trip dates
+        workshops = inventory.available(inventory.WORKSHOP, jharkhand_records.workshops(), preferences)
+        homestays = inventory.available(inventory.HOMESTAY, jharkhand_records.homestays(), preferences)
+        guides = inventory.available(inventory.GUIDE, jharkhand_records.guides(), preferences)
         
         # Get cultural etiquette
         etiquette = jharkhand_data.get_cultural_etiquette()
@@ -105,10 +70,10 @@ def recommend_activities(state):
         
     except Exception as e:
         # Fallback to basic data if loading fails
-        festivals = []
-        workshops = []
-        homestays = []
-        guides = []
+        festivals = ()
+        workshops = ()
+        homestays = ()
+        guides = ()
         etiquette = {}
         cultural_pois = []
         cultural_activities = []
@@ -136,45 +101,16 @@ You are a Jharkhand eco-cultural tourism specialist and activities expert. Based
 {json.dumps(cultural_activities, indent=2)}
 
 **AVAILABLE TRIBAL FESTIVALS ({month}):**
-{json.dumps([{
-    'name': f['name'],
-    'description': f['description'],
-    'activities': f['activities'],
-    'best_locations': f['best_locations'],
-    'duration': f['duration'],
-    'visitor_experience': f['visitor_experience']
-} for f in festivals], indent=2)}
+{prompt_json(festivals)}
 
 **HANDICRAFT WORKSHOPS:**
-{json.dumps([{
-    'name': w['name'],
-    'location': w['location'],
-    'craft_type': w['craft_type'],
-    'description': w['description'],
-    'duration': w['duration'],
-    'cost': w['cost'],
-    'group_size': w['group_size'],
-    'season': w['season']
-} for w in workshops], indent=2)}
+{prompt_json(workshops)}
 
 **CULTURAL HOMESTAYS:**
-{json.dumps([{
-    'name': h['name'],
-    'location': h['location'],
-    'community': h['community'],
-    'description': h['description'],
-    'amenities': h['amenities'],
-    'special_features': h['special_features']
-} for h in homestays], indent=2)}
+{prompt_json(homestays)}
 
 **LOCAL GUIDES:**
-{json.dumps([{
-    'name': g['name'],
-    'specialization': g['specialization'],
-    'languages': g['languages'],
-    'services': g['services'],
-    'cost_per_day': g['cost_per_day']
-} for g in guides], indent=2)}
+{prompt_json(guides)}
 
 **COMMUNITY INTERACTION GUIDELINES:**
 {json.dumps(interaction_guidelines, indent=2)}
@@ -188,7 +124,7 @@ You are a Jharkhand eco-cultural tourism specialist and activities expert. Based
 3. Consider mobility_level when suggesting activities
 4. Incorporate special_interests into recommendations
 5. Provide cultural context and significance for each activity
-6. Include practical information: timing, cost in INR, booking requirements
+6. Include practical information: timing, cost in INR as listed in the data above (do not estimate prices), booking requirements
 7. Suggest ways to respectfully engage with tribal communities
 8. Include cultural etiquette reminders for each activity
 9. Balance cultural experiences with nature, adventure, and spiritual activities
@@ -249,7 +185,9 @@ Make the suggestions authentic, respectful, and focused on meaningful cultural e
 """
     
     try:
-        result = llm.invoke([HumanMessage(content=prompt)]).content
-        return {"activity_suggestions": result.strip()}
+        result = model_router.invoke("activities", [HumanMessage(content=prompt)], deadline=state.get('deadline'))
+        return {"activity_suggestions": result.strip(), **model_router.truncation(result)}
+    except model_router.LLMUnavailable:
+        return {"activity_suggestions": fallback_content.render("activities", preferences), "fallback": True}
     except Exception as e:
-        return {"activity_suggestions": "", "warning": str(e)}
\ No newline at end of file
+        return {"activity_suggestions": fallback_content.render("activities", preferences), "fallback": True, "warning": str(e)}
\ No newline at end of file
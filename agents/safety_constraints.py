@@ -1,9 +1,14 @@
 """
 Safety constraints and permit requirements agent for Jharkhand tourism
+
+The report is rendered straight from data/safety_constraints.json. Its
+content depends only on (destination class, month, tourism focus, mobility),
+so each combination is rendered once and memoised. The LLM is only used to
+add personalised notes when the traveller left comments.
 """
 from langchain_core.messages import HumanMessage
-from langchain_community.chat_models import ChatOllama
-import json
+from services import model_router
+from functools import lru_cache
 import sys
 import os
 
@@ -11,34 +16,68 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
 from data_loader import jharkhand_data
 
+MONTHS = [
+    'january', 'february', 'march', 'april', 'may', 'june',
+    'july', 'august', 'september', 'october', 'november', 'december'
+]
+
+# Permit class -> group it is listed under in permit_requirements
+PERMIT_GROUPS = {
+    'betla_national_park': 'national_parks',
+    'hazaribagh_national_park': 'national_parks',
+    'dalma_wildlife_sanctuary': 'wildlife_sanctuaries',
+    'village_visits': 'tribal_areas',
+}
+
 def load_safety_constraints():
     """Load safety constraints data"""
     try:
-        file_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'safety_constraints.json')
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        return jharkhand_data.load_safety_constraints()
     except Exception as e:
         return {}
 
-def get_permit_requirements(destination, activity_type, safety_data):
-    """Get permit requirements for specific destination and activity"""
-    permit_data = safety_data.get('permit_requirements', {})
-    
+def classify_destination(destination, activity_type):
+    """Permit class of a destination and activity ('general' when no permit applies)"""
+    destination = destination.lower()
+    activity_type = activity_type.lower()
     # Check national parks
-    if 'national park' in destination.lower() or 'betla' in destination.lower():
-        return permit_data.get('national_parks', {}).get('betla_national_park', {})
-    elif 'hazaribagh' in destination.lower():
-        return permit_data.get('national_parks', {}).get('hazaribagh_national_park', {})
-    
+    if 'national park' in destination or 'betla' in destination:
+        return 'betla_national_park'
+    elif 'hazaribagh' in destination:
+        return 'hazaribagh_national_park'
     # Check wildlife sanctuaries
-    if 'wildlife' in activity_type.lower() or 'safari' in activity_type.lower():
-        return permit_data.get('wildlife_sanctuaries', {}).get('dalma_wildlife_sanctuary', {})
-    
+    if 'wildlife' in activity_type or 'safari' in activity_type:
+        return 'dalma_wildlife_sanctuary'
     # Check tribal areas
-    if 'tribal' in activity_type.lower() or 'village' in destination.lower():
-        return permit_data.get('tribal_areas', {}).get('village_visits', {})
-    
-    return {}
+    if 'tribal' in activity_type or 'village' in destination:
+        return 'village_visits'
+    return 'general'
+
+def resolve_tourism_focus(tourism_type):
+    """Keywords of a tourism type that change the safety guidance"""
+    text = (tourism_type or '').lower()
+    focus = []
+    if 'wildlife' in text or 'adventure' in text:
+        focus.append('wildlife')
+    if 'cultural' in text or 'tribal' in text:
+        focus.append('cultural')
+    return ' '.join(focus)
+
+def resolve_mobility(mobility_level):
+    """Map a mobility level label to its key in the accessibility data"""
+    level = (mobility_level or '').lower()
+    for key in ['easy', 'moderate', 'active', 'adventure']:
+        if level.startswith(key):
+            return key
+    return ''
+
+def get_permit_requirements(destination, activity_type, safety_data):
+    """Get permit requirements for specific destination and activity"""
+    permit_class = classify_destination(destination, activity_type)
+    group = PERMIT_GROUPS.get(permit_class)
+    if not group:
+        return {}
+    return safety_data.get('permit_requirements', {}).get(group, {}).get(permit_class, {})
 
 def get_safety_guidelines(month, mobility_level, tourism_type, safety_data):
     """Get relevant safety guidelines based on context"""
@@ -111,93 +150,119 @@ def get_health_recommendations(month, safety_data):
     
     return recommendations
 
+def bullets(items):
+    return "\n".join(f"- {item}" for item in items)
+
+def section(title, items):
+    return f"**{title}**\n{bullets(items)}" if items else ""
+
+def titled(key):
+    return key.replace('_', ' ').title()
+
+@lru_cache(maxsize=2048)
+def render_safety_report(permit_class, month, tourism_focus, mobility):
+    """Render the safety and permit report body as markdown"""
+    safety_data = load_safety_constraints()
+    group = PERMIT_GROUPS.get(permit_class)
+    permit = safety_data.get('permit_requirements', {}).get(group, {}).get(permit_class, {}) if group else {}
+    guidelines = get_safety_guidelines(month, mobility, tourism_focus, safety_data)
+    health = get_health_recommendations(month, safety_data)
+    seasonal = jharkhand_data.get_seasonal_recommendations(month)
+    general = guidelines.get('general', {})
+
+    sections = []
+    if permit.get('permit_required'):
+        sections.append(section(f"Permit Requirements: {titled(permit_class)}", [
+            f"{permit['permit_type']}: {permit['cost']}, valid {permit['validity']}",
+            f"Book {permit['booking_advance']} in advance ({permit['booking_method']})",
+        ] + permit.get('restrictions', [])))
+        sections.append(section("On-site Safety Requirements", permit.get('safety_requirements', [])))
+    elif permit:
+        sections.append(section("Permit Requirements", [
+            "No permit required",
+            f"Arrange visits through: {permit['booking_method']}",
+        ] + permit.get('restrictions', [])))
+    else:
+        sections.append(section("Permit Requirements", [
+            "No special permit listed for this destination; carry a valid photo ID",
+        ]))
+
+    sections.append(section("General Safety Guidelines",
+                            general.get('communication', []) + general.get('documentation', [])))
+
+    seasonal_items = [item for values in guidelines.get('seasonal', {}).values() for item in values]
+    if seasonal.get('avoid'):
+        seasonal_items.append(f"Avoid this month: {', '.join(seasonal['avoid'])}")
+    sections.append(section(f"Seasonal Precautions ({month.title()})", seasonal_items))
+
+    health_items = list(general.get('health_precautions', []))
+    for risk, info in health.get('seasonal', {}).items():
+        health_items.append(f"{titled(risk)}: {'; '.join(info.get('prevention', []))}")
+    for city, hospitals in health.get('facilities', {}).get('major_cities', {}).items():
+        health_items.append(f"Hospitals in {city.title()}: {', '.join(hospitals)}")
+    sections.append(section("Health Recommendations and Medical Facilities", health_items))
+
+    contacts = general.get('emergency_contacts', {})
+    sections.append(section("Emergency Contacts",
+                            [f"{titled(name)}: {number}" for name, number in contacts.items()]))
+
+    access = guidelines.get('mobility', {})
+    sections.append(section("Accessibility Considerations", [
+        f"{titled(key)}: {', '.join(values)}" for key, values in access.items()
+    ]))
+
+    if 'wildlife' in guidelines:
+        sections.append(section("Wildlife and Trekking Safety",
+                                [item for values in guidelines['wildlife'].values() for item in values]))
+    if 'cultural' in guidelines:
+        sections.append(section("Cultural Safety Guidelines",
+                                [item for values in guidelines['cultural'].values() for item in values]))
+
+    insurance = safety_data.get('insurance_recommendations', {}).get('travel_insurance', {})
+    insurance_items = [f"Coverage: {', '.join(insurance.get('coverage_required', []))}"]
+    if 'wildlife' in guidelines or mobility in ('active', 'adventure'):
+        insurance_items.append(f"Adventure cover: {', '.join(insurance.get('adventure_activities', []))}")
+    insurance_items += insurance.get('recommendations', [])
+    sections.append(section("Insurance Recommendations", insurance_items))
+
+    return "\n\n".join(s for s in sections if s)
+
+def personalize_notes(preferences, report, deadline=None):
+    """Ask the LLM for short personalised safety notes based on the traveller's comments"""
+    prompt = f"""
+    A traveller to {preferences.get('destination', 'Jharkhand')} in {preferences.get('month', 'October')} left this comment: "{preferences.get('comments')}"
+    Special interests: {', '.join(preferences.get('special_interests', [])) or 'None'}
+    Their safety and permit guide is:
+    {report}
+
+    In at most 4 short bullet points, add safety advice that addresses the comment. Do not repeat points already in the guide.
+    """
+    return model_router.invoke("safety", [HumanMessage(content=prompt)], deadline=deadline).strip()
+
 def safety_constraints_agent(state):
     """Safety constraints and permit requirements agent"""
-    llm = ChatOllama(model="llama3.2", base_url="http://127.0.0.1:11434")
-    
-    # Extract preferences
     preferences = state.get('preferences', {})
-    destination = preferences.get('destination', 'Jharkhand')
-    month = preferences.get('month', 'October').lower()
+    destination = preferences.get('destination', '') or 'Jharkhand'
+    month = (preferences.get('month') or 'October').lower()
+    if month not in MONTHS:
+        month = 'october'
     tourism_type = preferences.get('tourism_type', 'Mixed Experience')
-    mobility_level = preferences.get('mobility_level', 'Moderate (Light walking)')
-    special_interests = preferences.get('special_interests', [])
-    
-    # Load safety constraints data
-    safety_data = load_safety_constraints()
-    
-    # Get permit requirements
-    permit_requirements = get_permit_requirements(destination, tourism_type, safety_data)
-    
-    # Get safety guidelines
-    safety_guidelines = get_safety_guidelines(month, mobility_level, tourism_type, safety_data)
-    
-    # Get health recommendations
-    health_recommendations = get_health_recommendations(month, safety_data)
-    
-    # Get seasonal constraints
-    try:
-        seasonal_constraints = jharkhand_data.get_seasonal_recommendations(month)
-    except Exception as e:
-        seasonal_constraints = {}
-    
-    prompt = f"""
-You are a Jharkhand tourism safety specialist and permit requirements expert. Provide comprehensive safety guidance and permit information for travelers visiting Jharkhand.
-
-**TRAVEL CONTEXT:**
-- Destination: {destination}
-- Month: {month.title()}
-- Tourism Type: {tourism_type}
-- Mobility Level: {mobility_level}
-- Special Interests: {special_interests}
-
-**PERMIT REQUIREMENTS:**
-{json.dumps(permit_requirements, indent=2)}
-
-**SAFETY GUIDELINES:**
-{json.dumps(safety_guidelines, indent=2)}
-
-**HEALTH RECOMMENDATIONS:**
-{json.dumps(health_recommendations, indent=2)}
-
-**SEASONAL CONSTRAINTS:**
-{json.dumps(seasonal_constraints, indent=2)}
-
-**INSTRUCTIONS:**
-1. Provide detailed permit requirements for the destination and activities
-2. Include comprehensive safety guidelines based on season and mobility level
-3. Give specific health recommendations for the travel month
-4. Include emergency contact information and procedures
-5. Provide accessibility considerations based on mobility level
-6. Include cultural safety guidelines for tribal areas
-7. Suggest insurance requirements and recommendations
-8. Include seasonal safety precautions
-9. Provide practical safety tips and precautions
-10. Include emergency procedures and contact information
-
-**FORMAT:**
-- Permit Requirements and Booking Information
-- General Safety Guidelines
-- Seasonal Safety Precautions
-- Health Recommendations and Medical Facilities
-- Emergency Contacts and Procedures
-- Accessibility Considerations
-- Cultural Safety Guidelines
-- Insurance Recommendations
-- Practical Safety Tips
-
-**SAFETY EMPHASIS:**
-- Prioritize traveler safety and well-being
-- Include specific precautions for Jharkhand's unique conditions
-- Provide clear emergency procedures
-- Emphasize respect for local communities and environment
-- Include practical, actionable safety advice
-
-Make the safety guidance comprehensive, practical, and focused on ensuring safe and respectful travel in Jharkhand.
-"""
-    
+
+    report = render_safety_report(
+        classify_destination(destination, tourism_type),
+        month,
+        resolve_tourism_focus(tourism_type),
+        resolve_mobility(preferences.get('mobility_level', 'Moderate (Light walking)')),
+    )
+    result = f"### 🛡️ Safety & Permit Guide: {destination} ({month.title()})\n\n{report}"
+
+    if not (preferences.get('comments') or '').strip():
+        return {"safety_constraints": result}
     try:
-        result = llm.invoke([HumanMessage(content=prompt)]).content
-        return {"safety_constraints": result.strip()}
+        notes = personalize_notes(preferences, report, state.get('deadline'))
+        return {"safety_constraints": f"{result}\n\n**Personal Notes**\n{notes}"}
+    except model_router.LLMUnavailable:
+        # The guide is complete without the notes, but keep it out of the cache
+        return {"safety_constraints": result, "fallback": True}
     except Exception as e:
-        return {"safety_constraints": "", "warning": str(e)}
\ No newline at end of file
+        return {"safety_constraints": result, "warning": str(e)}
@@ -1,47 +1,36 @@
 from langchain_core.messages import HumanMessage
-from langchain_community.chat_models import ChatOllama
+from services import climatology, fallback_content, model_router
 import json
 import sys
 import os
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # Add data directory to path to import our data loader
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
 from data_loader import jharkhand_data
 
+# Live observations only help when the trip starts within the API's forecast horizon
+LIVE_WEATHER_HORIZON_DAYS = 5
+
 def get_jharkhand_weather_data(city="Ranchi"):
-    """Get weather data from Indian weather API (OpenWeatherMap)"""
+    """Get live weather data from OpenWeatherMap, or None when unavailable"""
     try:
         # Using OpenWeatherMap API (free tier available)
         # You can replace with other Indian weather APIs like IMD
         api_key = os.getenv('OPENWEATHER_API_KEY', 'demo_key')
         
         if api_key == 'demo_key':
-            # Return demo data if no API key is provided
-            return get_demo_weather_data(city)
-        
-        # Jharkhand city coordinates
-        city_coords = {
-            "ranchi": {"lat": 23.3441, "lon": 85.3096},
-            "deoghar": {"lat": 24.4833, "lon": 86.7000},
-            "dumka": {"lat": 24.2667, "lon": 87.2500},
-            "netarhat": {"lat": 23.4833, "lon": 84.7167},
-            "hazaribagh": {"lat": 24.0000, "lon": 85.3667}
-        }
+            return None
         
-        city_lower = city.lower()
-        if city_lower in city_coords:
-            coords = city_coords[city_lower]
-        else:
-            coords = city_coords["ranchi"]  # Default to Ranchi
+        lat, lon = climatology.coordinates(city)
         
         # Get current weather
-        current_url = f"http://api.openweathermap.org/data/2.5/weather?lat={coords['lat']}&lon={coords['lon']}&appid={api_key}&units=metric"
+        current_url = f"http://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={api_key}&units=metric"
         current_response = requests.get(current_url, timeout=10)
         
         # Get 5-day forecast
-        forecast_url = f"http://api.openweathermap.org/data/2.5/forecast?lat={coords['lat']}&lon={coords['lon']}&appid={api_key}&units=metric"
+        forecast_url = f"http://api.openweathermap.org/data/2.5/forecast?lat={lat}&lon={lon}&appid={api_key}&units=metric"
         forecast_response = requests.get(forecast_url, timeout=10)
         
         if current_response.status_code == 200 and forecast_response.status_code == 200:
@@ -60,60 +49,32 @@ def get_jharkhand_weather_data(city="Ranchi"):
                 "forecast": forecast_data['list'][:8],  # Next 24 hours
                 "city": current_data['name']
             }
-        else:
-            return get_demo_weather_data(city)
+        return None
             
     except Exception as e:
         print(f"Weather API error: {e}")
-        return get_demo_weather_data(city)
+        return None
 
-def get_demo_weather_data(city="Ranchi"):
-    """Demo weather data for demonstration purposes"""
-    month = datetime.now().month
-    
-    # Seasonal weather patterns for Jharkhand
-    if month in [6, 7, 8, 9]:  # Monsoon
-        return {
-            "current": {
-                "temperature": 28,
-                "feels_like": 32,
-                "humidity": 85,
-                "description": "heavy rain",
-                "wind_speed": 15,
-                "visibility": 2
-            },
-            "forecast": [],
-            "city": city,
-            "demo": True
-        }
-    elif month in [12, 1, 2]:  # Winter
-        return {
-            "current": {
-                "temperature": 18,
-                "feels_like": 16,
-                "humidity": 45,
-                "description": "clear sky",
-                "wind_speed": 8,
-                "visibility": 10
-            },
-            "forecast": [],
-            "city": city,
-            "demo": True
-        }
-    else:  # Summer/Post-monsoon
-        return {
-            "current": {
-                "temperature": 32,
-                "feels_like": 36,
-                "humidity": 60,
-                "description": "partly cloudy",
-                "wind_speed": 12,
-                "visibility": 8
-            },
-            "forecast": [],
-            "city": city,
-            "demo": True
-        }
+def trip_is_near(preferences):
+    """Whether live weather is relevant: the trip starts within the forecast horizon"""
+    today = datetime.now().date()
+    if preferences.get('start_date'):
+        try:
+            start = datetime.strptime(preferences['start_date'], "%Y-%m-%d").date()
+        except ValueError:
+            return False
+        return 0 <= (start - today).days <= LIVE_WEATHER_HORIZON_DAYS
+    return (preferences.get('month') or '').lower() == today.strftime("%B").lower()
+
+def get_weather_outlook(preferences):
+    """Climate normals for the destination and month, blended with live data for imminent trips"""
+    destination = preferences.get('destination', 'Jharkhand')
+    normals = climatology.outlook(destination, preferences.get('month', 'October'))
+    if trip_is_near(preferences):
+        live = get_jharkhand_weather_data(destination)
+        if live:
+            return climatology.blend(normals, live)
+    return normals
 
 def get_seasonal_weather_analysis(month, weather_data):
     """Analyze weather based on Jharkhand's seasonal patterns"""
@@ -124,7 +85,6 @@ def get_seasonal_weather_analysis(month, weather_data):
     }.get(month.lower(), 10)
     
     if month_num in [6, 7, 8, 9]:
-        season = "monsoon"
         analysis = {
             "season": "Monsoon Season",
             "characteristics": ["Heavy rainfall", "High humidity", "Reduced visibility", "Possible flooding"],
@@ -132,7 +92,6 @@ def get_seasonal_weather_analysis(month, weather_data):
             "recommendations": ["Carry rain gear", "Check road conditions", "Avoid remote areas", "Indoor activities preferred"]
         }
     elif month_num in [12, 1, 2]:
-        season = "winter"
         analysis = {
             "season": "Winter Season",
             "characteristics": ["Cool temperatures", "Clear skies", "Low humidity", "Good visibility"],
@@ -140,7 +99,6 @@ def get_seasonal_weather_analysis(month, weather_data):
             "recommendations": ["Carry warm clothing", "Perfect for photography", "All attractions accessible", "Book accommodations early"]
         }
     elif month_num in [3, 4, 5]:
-        season = "summer"
         analysis = {
             "season": "Summer Season",
             "characteristics": ["Hot temperatures", "Dry weather", "Moderate humidity", "Good visibility"],
@@ -148,7 +106,6 @@ def get_seasonal_weather_analysis(month, weather_data):
             "recommendations": ["Stay hydrated", "Plan early morning activities", "Visit hill stations", "Avoid midday outdoor activities"]
         }
     else:  # October, November
-        season = "post_monsoon"
         analysis = {
             "season": "Post-Monsoon Season",
             "characteristics": ["Pleasant temperatures", "Lush greenery", "Occasional light showers", "Good visibility"],
@@ -159,8 +116,6 @@ def get_seasonal_weather_analysis(month, weather_data):
     return analysis
 
 def weather_forecaster(state):
-    llm = ChatOllama(model="llama3.2", base_url="http://127.0.0.1:11434")
-    
     # Extract preferences
     preferences = state.get('preferences', {})
     destination = preferences.get('destination', 'Jharkhand')
@@ -168,8 +123,8 @@ def weather_forecaster(state):
     tourism_type = preferences.get('tourism_type', 'Mixed Experience')
     mobility_level = preferences.get('mobility_level', 'Moderate (Light walking)')
     
-    # Get weather data
-    weather_data = get_jharkhand_weather_data(destination)
+    # Get weather data (no network round trip unless the trip is imminent)
+    weather_data = get_weather_outlook(preferences)
     
     # Get seasonal analysis
     seasonal_analysis = get_seasonal_weather_analysis(month, weather_data)
@@ -177,7 +132,7 @@ def weather_forecaster(state):
     # Get seasonal constraints
     try:
         seasonal_constraints = jharkhand_data.get_seasonal_recommendations(month)
-    except Exception as e:
+    except Exception:
         seasonal_constraints = {}
     
     # Get accessibility information
@@ -188,7 +143,7 @@ def weather_forecaster(state):
             "hill_stations": jharkhand_data.get_accessibility_info("hill_stations", month),
             "temples": jharkhand_data.get_accessibility_info("temples", month)
         }
-    except Exception as e:
+    except Exception:
         accessibility_info = {}
     
     prompt = f"""
@@ -200,7 +155,7 @@ You are a Jharkhand weather specialist and seasonal tourism expert. Provide comp
 - Tourism Type: {tourism_type}
 - Mobility Level: {mobility_level}
 
-**CURRENT WEATHER DATA:**
+**WEATHER DATA (climate normals for the travel month; live conditions included when the trip is imminent):**
 {json.dumps(weather_data, indent=2)}
 
 **SEASONAL ANALYSIS:**
@@ -250,7 +205,9 @@ Make the weather forecast practical, safety-focused, and tailored to Jharkhand's
 """
     
     try:
-        result = llm.invoke([HumanMessage(content=prompt)]).content
-        return {"weather_forecast": result.strip()}
+        result = model_router.invoke("weather", [HumanMessage(content=prompt)], deadline=state.get('deadline'))
+        return {"weather_forecast": result.strip(), **model_router.truncation(result)}
+    except model_router.LLMUnavailable:
+        return {"weather_forecast": fallback_content.render("weather", preferences), "fallback": True}
     except Exception as e:
-        return {"weather_forecast": "", "warning": str(e)}
\ No newline at end of file
+        return {"weather_forecast": fallback_content.render("weather", preferences), "fallback": True, "warning": str(e)}
\ No newline at end of file
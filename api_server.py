@@ -1,26 +1,45 @@
+import time
+_import_started = time.perf_counter()
+
 import os
-import uvicorn
-from fastapi import FastAPI, HTTPException
+import sys
+import json
+from functools import lru_cache
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-# Import existing agents and graph
-from agents import (
-    generate_itinerary,
-    safety_constraints,
-    cultural_recommender,
-    food_culture_recommender,
-    recommend_activities,
-    packing_list_generator,
-    weather_forecaster,
+from services import (
+    admission, analytics, batch_jobs, chat_intents, endpoint_preferences, event_calendar, inventory, job_queue,
+    model_router, pdf_export, request_context, request_log, response_cache, semantic_cache, startup, travel_times,
+    trip_budget
 )
-from agents import chat_agent
-from langgraph.graph import StateGraph, END
 from typing import TypedDict, Annotated
 
 load_dotenv()
 
+# Agents (and LangChain with them) are imported on first call or by the warm-up, not with the API
+AGENT_MODULES = [
+    "agents.generate_itinerary",
+    "agents.safety_constraints",
+    "agents.cultural_recommender",
+    "agents.food_culture_recommender",
+    "agents.recommend_activities",
+    "agents.packing_list_generator",
+    "agents.weather_forecaster",
+    "agents.chat_agent",
+]
+generate_itinerary = startup.lazy_function("agents.generate_itinerary", "generate_itinerary")
+safety_constraints_agent = startup.lazy_function("agents.safety_constraints", "safety_constraints_agent")
+cultural_recommender = startup.lazy_function("agents.cultural_recommender", "cultural_recommender")
+food_culture_recommender = startup.lazy_function("agents.food_culture_recommender", "food_culture_recommender")
+recommend_activities = startup.lazy_function("agents.recommend_activities", "recommend_activities")
+packing_list_generator = startup.lazy_function("agents.packing_list_generator", "packing_list_generator")
+weather_forecaster = startup.lazy_function("agents.weather_forecaster", "weather_forecaster")
+chat_node = startup.lazy_function("agents.chat_agent", "chat_node")
+
 class GraphState(TypedDict):
     preferences_text: str
     preferences: dict
@@ -34,13 +53,24 @@ class GraphState(TypedDict):
     chat_history: Annotated[list[dict], "List of question-response pairs"]
     user_question: str
     chat_response: str
-
-# Build a minimal graph reusing your existing functions
-workflow = StateGraph(GraphState)
-workflow.add_node("generate_itinerary", generate_itinerary.generate_itinerary)
-workflow.set_entry_point("generate_itinerary")
-workflow.add_edge("generate_itinerary", END)
-graph = workflow.compile()
+    warning: str
+    fallback: bool
+    # time.time() by which the answer is due (None without a deadline), and whether it cut the answer short
+    deadline: float | None
+    truncated: bool
+
+@lru_cache(maxsize=1)
+def itinerary_graph():
+    # Build a minimal graph reusing your existing functions
+    from langgraph.graph import StateGraph, END
+    workflow = StateGraph(GraphState)
+    workflow.add_node("generate_itinerary", generate_itinerary)
+    workflow.set_entry_point("generate_itinerary")
+    workflow.add_edge("generate_itinerary", END)
+    return workflow.compile()
+
+def run_itinerary_graph(state: dict) -> dict:
+    return itinerary_graph().invoke(state)
 
 app = FastAPI(title="Travel Itinerary Planner API")
 
@@ -52,6 +82,96 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# End-to-end time budget of an API request; clients can ask for less (or more) with X-Request-Timeout
+REQUEST_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", "120"))
+MAX_REQUEST_TIMEOUT_SECONDS = float(os.getenv("MAX_REQUEST_TIMEOUT_SECONDS", "600"))
+
+def request_timeout(request: Request) -> float:
+    try:
+        timeout = float(request.headers.get("x-request-timeout", REQUEST_TIMEOUT_SECONDS))
+    except ValueError:
+        timeout = REQUEST_TIMEOUT_SECONDS
+    return min(max(timeout, 0.0), MAX_REQUEST_TIMEOUT_SECONDS)
+
+class RequestLogMiddleware:
+    """One structured record per API call; agents annotate it while the request runs
+
+    Plain ASGI rather than @app.middleware("http"): the body is read here for the log and
+    then replayed to the app, and everything after it (http.disconnect included) comes
+    straight from the server, so request.is_disconnected() keeps working downstream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        path = scope.get("path", "")
+        if scope["type"] != "http" or not path.startswith("/api/") or path == "/api/ready":
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        started = time.perf_counter()
+        messages = []
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request" or not message.get("more_body", False):
+                break
+        body = b"".join(m.get("body", b"") for m in messages if m["type"] == "http.request")
+        content_type = request.headers.get("content-type")
+        payload = raw_body = None
+        if body and (content_type or "application/json").split(";")[0].strip() == "application/json":
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                pass
+        if body and payload is None:
+            # NDJSON uploads and other bodies are logged as sent, so replays reproduce them
+            raw_body = body.decode("utf-8", errors="replace")
+        entry = request_log.start_request(
+            path, request.method, payload, request.client.host if request.client else None,
+            query=request.url.query, body=raw_body, content_type=content_type,
+        )
+
+        async def replay():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        status = {"code": 500}
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        # Generations of one session stick to the same LLM backend so it can reuse its KV cache
+        session = request_context.bind_session(
+            request.headers.get("x-session-id") or admission.client_key(request)
+        )
+        deadline = request_context.bind_deadline(time.time() + request_timeout(request))
+        try:
+            await self.app(scope, replay, send_status)
+        except Exception:
+            request_log.finish_request(entry, 500)
+            raise
+        finally:
+            request_context.reset_session(session)
+            request_context.reset_deadline(deadline)
+        request_log.finish_request(entry, status["code"])
+        startup.state.record_request(path, time.perf_counter() - started)
+
+app.add_middleware(RequestLogMiddleware)
+
+async def run_agent(request: Request, priority: str, agent: str, func, state: dict, output_key: str) -> dict:
+    # Cache hits skip the admission queue; only real generations compete for slots
+    queue = not response_cache.is_cached(agent, state.get("preferences", {}))
+    # The request's deadline travels with the graph state to the agent
+    state = {**state, "deadline": request_context.current_deadline()}
+    return await admission.run(
+        request, priority, response_cache.cached_call, agent, func, state, output_key, queue=queue
+    )
+
 class Preferences(BaseModel):
     destination: str
     month: str
@@ -65,64 +185,216 @@ class Preferences(BaseModel):
     budget_range: str
     special_interests: list[str] = []
     comments: str | None = ""
+    # Optional first day of the trip (YYYY-MM-DD); when given it decides the month
+    start_date: str | None = None
 
 class GenerateRequest(BaseModel):
     preferences: Preferences
 
+def preferences_dict(preferences: Preferences) -> dict:
+    prefs = preferences.dict()
+    if prefs.get("start_date"):
+        try:
+            start = event_calendar.parse_date(prefs["start_date"])
+        except ValueError:
+            raise HTTPException(status_code=422, detail="start_date must be a YYYY-MM-DD date")
+        prefs["start_date"] = start.isoformat()
+        prefs["month"] = event_calendar.month_name(start)
+    else:
+        prefs.pop("start_date", None)
+    return prefs
+
+def itinerary_state(prefs: dict) -> dict:
+    dates = f"Start Date: {prefs['start_date']}\n" if prefs.get("start_date") else ""
+    preferences_text = (
+        f"Destination Focus: {prefs['destination']}\n"
+        f"Month: {prefs['month']}\n"
+        f"{dates}"
+        f"Duration: {prefs['duration']} days\n"
+        f"Number of People: {prefs['num_people']}\n"
+        f"Tourism Type: {prefs['tourism_type']}\n"
+        f"Tribal Culture Interest: {prefs['tribal_interest']}\n"
+        f"Mobility Level: {prefs['mobility_level']}\n"
+        f"Accommodation: {prefs['accommodation_type']}\n"
+        f"Language Preference: {prefs['language_preference']}\n"
+        f"Budget Range: {prefs['budget_range']}\n"
+        f"Special Interests: {', '.join(prefs.get('special_interests', [])) or 'None specified'}\n"
+        f"Additional Comments: {prefs.get('comments') or ''}"
+    )
+    return {
+        "preferences_text": preferences_text,
+        "preferences": prefs,
+        "itinerary": "",
+        "activity_suggestions": "",
+        "useful_links": [],
+        "weather_forecast": "",
+        "packing_list": "",
+        "food_culture_info": "",
+        "safety_constraints": "",
+        "chat_history": [],
+        "user_question": "",
+        "chat_response": "",
+    }
+
+def record_trip(prefs: dict, result: dict):
+    # Replayed cache hits are not new trips; the write happens on the analytics thread
+    if not result.get("cached"):
+        analytics.record_trip_later(prefs, result.get("itinerary", ""))
+
+def itinerary_response(prefs: dict, result: dict) -> dict:
+    response = {
+        "itinerary": result.get("itinerary", ""),
+        "activity_suggestions": result.get("activity_suggestions", ""),
+        "useful_links": result.get("useful_links", []),
+        "weather_forecast": result.get("weather_forecast", ""),
+        "packing_list": result.get("packing_list", ""),
+        "food_culture_info": result.get("food_culture_info", ""),
+        "safety_constraints": result.get("safety_constraints", ""),
+        "budget": trip_budget.compute_budget(prefs),
+    }
+    if result.get("truncated"):
+        # Shortened to meet the request's deadline
+        response["truncated"] = True
+    return response
+
 @app.post("/api/generate_itinerary")
-def api_generate_itinerary(payload: GenerateRequest):
+async def api_generate_itinerary(payload: GenerateRequest, request: Request):
     try:
-        prefs = payload.preferences.dict()
-        preferences_text = (
-            f"Destination Focus: {prefs['destination']}\n"
-            f"Month: {prefs['month']}\n"
-            f"Duration: {prefs['duration']} days\n"
-            f"Number of People: {prefs['num_people']}\n"
-            f"Tourism Type: {prefs['tourism_type']}\n"
-            f"Tribal Culture Interest: {prefs['tribal_interest']}\n"
-            f"Mobility Level: {prefs['mobility_level']}\n"
-            f"Accommodation: {prefs['accommodation_type']}\n"
-            f"Language Preference: {prefs['language_preference']}\n"
-            f"Budget Range: {prefs['budget_range']}\n"
-            f"Special Interests: {', '.join(prefs.get('special_interests', [])) or 'None specified'}\n"
-            f"Additional Comments: {prefs.get('comments') or ''}"
+        prefs = preferences_dict(payload.preferences)
+        result = await run_agent(
+            request, "standard", "itinerary", run_itinerary_graph, itinerary_state(prefs), "itinerary"
         )
-
-        state = {
-            "preferences_text": preferences_text,
-            "preferences": prefs,
-            "itinerary": "",
-            "activity_suggestions": "",
-            "useful_links": [],
-            "weather_forecast": "",
-            "packing_list": "",
-            "food_culture_info": "",
-            "safety_constraints": "",
-            "chat_history": [],
-            "user_question": "",
-            "chat_response": "",
-        }
-
-        result = graph.invoke(state)
-        return {
-            "itinerary": result.get("itinerary", ""),
-            "activity_suggestions": result.get("activity_suggestions", ""),
-            "useful_links": result.get("useful_links", []),
-            "weather_forecast": result.get("weather_forecast", ""),
-            "packing_list": result.get("packing_list", ""),
-            "food_culture_info": result.get("food_culture_info", ""),
-            "safety_constraints": result.get("safety_constraints", ""),
-        }
+        record_trip(prefs, result)
+        return itinerary_response(prefs, result)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def run_batch_itinerary(prefs: dict) -> dict:
+    # Runs on the batch workers, outside any HTTP request
+    result = response_cache.cached_call("itinerary", run_itinerary_graph, itinerary_state(prefs), "itinerary")
+    response = itinerary_response(prefs, result)
+    if result.get("cached"):
+        response["cached"] = True
+    if result.get("warning"):
+        response["warning"] = result["warning"]
+    if result.get("fallback"):
+        response["fallback"] = True
+    return response
+
+
+# Follow-up agents generated with the itinerary in a "bundle" job
+BUNDLE_AGENTS = {
+    "activities": (recommend_activities, "activity_suggestions"),
+    "cultural": (cultural_recommender, "cultural_recommendations"),
+    "food_culture": (food_culture_recommender, "food_culture_info"),
+    "weather": (weather_forecaster, "weather_forecast"),
+}
+
+
+def run_batch_item(prefs: dict) -> dict:
+    # Batch items run exactly once, so the trip is recorded here
+    response = run_batch_itinerary(prefs)
+    record_trip(prefs, response)
+    return response
+
+
+def run_itinerary_job(payload: dict) -> dict:
+    return run_batch_itinerary(payload["preferences"])
+
+
+def record_job_trip(payload: dict, result: dict):
+    # Jobs retry fallback attempts, so the trip is recorded only once the job has succeeded
+    record_trip(payload["preferences"], result)
+
+
+def run_bundle_job(payload: dict) -> dict:
+    prefs = payload["preferences"]
+    response = run_batch_itinerary(prefs)
+    state = {**itinerary_state(prefs), "itinerary": response["itinerary"]}
+    for agent, (func, output_key) in BUNDLE_AGENTS.items():
+        result = response_cache.cached_call(agent, func, state, output_key)
+        response[output_key] = result.get(output_key, "")
+        for flag in ("warning", "fallback", "truncated"):
+            if result.get(flag):
+                response[flag] = result[flag]
+    response["safety_constraints"] = safety_constraints_agent(state)["safety_constraints"]
+    response["packing_list"] = packing_list_generator(state)["packing_list"]
+    return response
+
+
+job_queue.register("itinerary", run_itinerary_job, on_success=record_job_trip)
+job_queue.register("bundle", run_bundle_job, on_success=record_job_trip)
+
+
+class BatchRequest(BaseModel):
+    preferences: list[Preferences]
+
+
+def parse_batch_payload(body: bytes, content_type: str) -> list[dict]:
+    # JSON {"preferences": [...]} or an uploaded JSONL file with one preference set per line
+    if "ndjson" in content_type or "jsonl" in content_type:
+        items = []
+        for number, line in enumerate(body.decode("utf-8").splitlines(), 1):
+            if line.strip():
+                record = json.loads(line)
+                preferences = record.get("preferences", record) if isinstance(record, dict) else None
+                if not isinstance(preferences, dict):
+                    raise ValueError(f"line {number} is not a preferences object")
+                items.append(preferences_dict(Preferences(**preferences)))
+        return items
+    return [preferences_dict(p) for p in BatchRequest(**json.loads(body)).preferences]
+
+
+@app.post("/api/budget")
+def api_budget(payload: GenerateRequest):
+    # Itemised trip cost from the data, without calling the LLM
+    return trip_budget.compute_budget(preferences_dict(payload.preferences))
+
+
+@app.post("/api/batch/itineraries")
+async def api_batch_itineraries(request: Request):
+    admission.controller.check_rate(request)
+    try:
+        items = parse_batch_payload(await request.body(), request.headers.get("content-type", ""))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid batch payload: {e}")
+    if not items:
+        raise HTTPException(status_code=422, detail="Batch is empty")
+    if len(items) > batch_jobs.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {batch_jobs.BATCH_MAX_ITEMS} items")
+    job = batch_jobs.submit(items)
+    return StreamingResponse(
+        batch_jobs.stream_results(job["job_id"]),
+        media_type="application/x-ndjson",
+        headers={"X-Job-Id": job["job_id"], "X-Job-Total": str(job["total"]), "X-Job-Unique": str(job["unique"])},
+    )
+
+
+@app.get("/api/batch/itineraries/{job_id}")
+def api_batch_status(job_id: str):
+    status = batch_jobs.store.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Unknown batch job")
+    return status
+
+
+@app.get("/api/batch/itineraries/{job_id}/results")
+def api_batch_results(job_id: str, cursor: int = 0):
+    # Resume a batch stream from the last cursor the client saw
+    if batch_jobs.store.status(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown batch job")
+    return StreamingResponse(batch_jobs.stream_results(job_id, cursor), media_type="application/x-ndjson")
+
+
 class SafetyPromptRequest(BaseModel):
     prompt: str
 
 
 @app.post("/api/safety_guidance")
-def api_safety_guidance(payload: SafetyPromptRequest):
+async def api_safety_guidance(payload: SafetyPromptRequest, request: Request):
     try:
         # Map the free-form prompt to the agent's expected state shape.
         # Using the prompt as destination enables keyword-based rules (e.g., Betla) to trigger.
@@ -147,8 +419,13 @@ def api_safety_guidance(payload: SafetyPromptRequest):
             "chat_response": "",
         }
 
-        result = safety_constraints.safety_constraints_agent(state)
+        # Rendered from the safety data, no LLM call: rate limited but not queued
+        result = await admission.run(
+            request, "interactive", safety_constraints_agent, state, queue=False
+        )
         return {"guidance": result.get("safety_constraints", "")}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -158,18 +435,11 @@ class SimplePromptRequest(BaseModel):
 
 
 @app.post("/api/culture_recommendations")
-def api_culture_recommendations(payload: SimplePromptRequest):
+async def api_culture_recommendations(payload: SimplePromptRequest, request: Request):
     try:
         state = {
             "preferences_text": f"Culture recommendations for: {payload.prompt}",
-            "preferences": {
-                "destination": payload.prompt,
-                "month": "October",
-                "tribal_interest": "Medium",
-                "mobility_level": "Moderate (Light walking)",
-                "budget_range": "Mid-Range (₹1500-3000/day)",
-                "special_interests": [],
-            },
+            "preferences": endpoint_preferences.cultural(payload.prompt),
             "itinerary": "",
             "activity_suggestions": "",
             "useful_links": [],
@@ -181,24 +451,22 @@ def api_culture_recommendations(payload: SimplePromptRequest):
             "user_question": "",
             "chat_response": "",
         }
-        result = cultural_recommender.cultural_recommender(state)
+        result = await run_agent(
+            request, "standard", "cultural", cultural_recommender, state, "cultural_recommendations"
+        )
         return {"recommendations": result.get("cultural_recommendations", "")}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/food_recommendations")
-def api_food_recommendations(payload: SimplePromptRequest):
+async def api_food_recommendations(payload: SimplePromptRequest, request: Request):
     try:
         state = {
             "preferences_text": f"Food recommendations for: {payload.prompt}",
-            "preferences": {
-                "destination": payload.prompt,
-                "month": "October",
-                "budget_range": "Mid-Range (₹1500-3000/day)",
-                "tribal_interest": "Medium",
-                "special_interests": ["Local cuisine & cooking"],
-            },
+            "preferences": endpoint_preferences.food_culture(payload.prompt),
             "itinerary": "",
             "activity_suggestions": "",
             "useful_links": [],
@@ -210,27 +478,23 @@ def api_food_recommendations(payload: SimplePromptRequest):
             "user_question": "",
             "chat_response": "",
         }
-        result = food_culture_recommender.food_culture_recommender(state)
+        result = await run_agent(
+            request, "standard", "food_culture", food_culture_recommender, state, "food_culture_info"
+        )
         return {"recommendations": result.get("food_culture_info", "")}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/api/activities_recommendations")
-def api_activities_recommendations(payload: SimplePromptRequest):
+async def api_activities_recommendations(payload: SimplePromptRequest, request: Request):
     try:
         # Use the prompt as the destination context to trigger place-specific data
         state = {
             "preferences_text": f"Activities recommendations for: {payload.prompt}",
-            "preferences": {
-                "destination": payload.prompt,
-                "month": "October",
-                "tourism_type": "Mixed Experience",
-                "tribal_interest": "Medium",
-                "mobility_level": "Moderate (Light walking)",
-                "budget_range": "Mid-Range (₹1500-3000/day)",
-                "special_interests": [],
-            },
+            "preferences": endpoint_preferences.activities(payload.prompt),
             "itinerary": "",
             "activity_suggestions": "",
             "useful_links": [],
@@ -242,8 +506,12 @@ def api_activities_recommendations(payload: SimplePromptRequest):
             "user_question": "",
             "chat_response": "",
         }
-        result = recommend_activities.recommend_activities(state)
+        result = await run_agent(
+            request, "standard", "activities", recommend_activities, state, "activity_suggestions"
+        )
         return {"recommendations": result.get("activity_suggestions", "")}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -256,7 +524,7 @@ class PackListRequest(BaseModel):
 
 
 @app.post("/api/pack_list")
-def api_pack_list(payload: PackListRequest):
+async def api_pack_list(payload: PackListRequest, request: Request):
     try:
         # Map request to the packing list agent's expected state
         state = {
@@ -271,8 +539,13 @@ def api_pack_list(payload: PackListRequest):
             },
             "packing_list": "",
         }
-        result = packing_list_generator.packing_list_generator(state)
+        # Rule-based list, no LLM call: rate limited but not queued
+        result = await admission.run(
+            request, "interactive", packing_list_generator, state, queue=False
+        )
         return {"list": result.get("packing_list", "")}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -283,33 +556,28 @@ class WeatherRequest(BaseModel):
 
 
 @app.post("/api/weather_forecast")
-def api_weather_forecast(payload: WeatherRequest):
+async def api_weather_forecast(payload: WeatherRequest, request: Request):
     try:
-        # Derive month name from date if provided, else default to October
-        month = "October"
-        try:
-            if payload.date:
-                # Expecting YYYY-MM-DD
-                parts = payload.date.split("-")
-                if len(parts) == 3:
-                    import calendar
-                    month_num = int(parts[1])
-                    month = calendar.month_name[month_num]
-        except Exception:
-            pass
+        # Month from the date if provided, else October
+        travel_date = None
+        if payload.date:
+            try:
+                travel_date = event_calendar.parse_date(payload.date)
+            except ValueError:
+                raise HTTPException(status_code=422, detail="date must be a YYYY-MM-DD date")
+        preferences = endpoint_preferences.weather(payload.location, travel_date)
 
         state = {
-            "preferences_text": f"Weather forecast for {payload.location} on {payload.date or month}",
-            "preferences": {
-                "destination": payload.location,
-                "month": month,
-                "tourism_type": "Mixed Experience",
-                "mobility_level": "Moderate (Light walking)",
-            },
+            "preferences_text": f"Weather forecast for {payload.location} on {payload.date or preferences['month']}",
+            "preferences": preferences,
             "weather_forecast": "",
         }
-        result = weather_forecaster.weather_forecaster(state)
+        result = await run_agent(
+            request, "interactive", "weather", weather_forecaster, state, "weather_forecast"
+        )
         return {"forecast": result.get("weather_forecast", "")}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -319,7 +587,7 @@ class ChatRequest(BaseModel):
 
 
 @app.post("/api/chat")
-def api_chat(payload: ChatRequest):
+async def api_chat(payload: ChatRequest, request: Request):
     try:
         state = {
             "preferences_text": f"Chat prompt: {payload.prompt}",
@@ -334,13 +602,234 @@ def api_chat(payload: ChatRequest):
             "chat_history": [],
             "user_question": payload.prompt,
             "chat_response": "",
+            "deadline": request_context.current_deadline(),
         }
-        result = chat_agent.chat_node(state)
-        return {"response": result.get("chat_response", "")}
+        # Questions answered from data or the semantic cache never reach the LLM, so they skip the admission queue
+        intent = chat_intents.match(payload.prompt)
+        queue = not intent.answered and not semantic_cache.is_cached(payload.prompt, state)
+        result = await admission.run(request, "interactive", semantic_cache.cached_chat, chat_node, state, queue=queue)
+        return {"response": result.get("chat_response", ""), "intent": intent.intent,
+                "cached": bool(result.get("cached"))}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/events")
+def api_events(start: str, end: str | None = None, location: str | None = None,
+               radius_km: float = event_calendar.DEFAULT_RADIUS_KM, kinds: str | None = None):
+    # Festivals, workshops and open attractions between two dates, optionally near a place
+    try:
+        start_date = event_calendar.parse_date(start)
+        end_date = event_calendar.parse_date(end) if end else start_date
+        kind_list = [k.strip() for k in kinds.split(",")] if kinds else list(event_calendar.EVENT_KINDS)
+        unknown = set(kind_list) - set(event_calendar.EVENT_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown event kinds: {', '.join(sorted(unknown))}")
+        events = event_calendar.events_between(start_date, end_date, location, radius_km, kind_list)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"start": start_date.isoformat(), "end": end_date.isoformat(), "events": events}
+
+@app.get("/api/travel_time")
+def api_travel_time(origin: str, destination: str, month: str | None = None):
+    # Road distance and driving time between two POIs or district headquarters in the month's season
+    if month and month.lower() not in travel_times.MONTHS:
+        raise HTTPException(status_code=422, detail=f"Unknown month '{month}'; use a month name like 'July'")
+    result = travel_times.travel_time(origin, destination, month or "")
+    if result is None:
+        raise HTTPException(status_code=404, detail="Unknown place; use a POI id or name, or a district name")
+    return result
+
+@app.get("/api/inventory")
+def api_inventory(start: str, days: int = 1, people: int = 1, kinds: str | None = None):
+    # Rooms, workshop seats and guides left per day, and the days a group fits
+    try:
+        start_date = event_calendar.parse_date(start)
+        kind_list = [k.strip() for k in kinds.split(",")] if kinds else list(inventory.KINDS)
+        unknown = set(kind_list) - set(inventory.KINDS)
+        if unknown:
+            raise ValueError(f"Unknown inventory kinds: {', '.join(sorted(unknown))}")
+        if not 1 <= days <= inventory.MAX_HOLD_DAYS or people < 1:
+            raise ValueError(f"days must be between 1 and {inventory.MAX_HOLD_DAYS} and people at least 1")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"start": start_date.isoformat(), "days": days, "people": people,
+            "resources": inventory.inventory.availability(start_date, days, people, kind_list)}
+
+
+class HoldRequest(BaseModel):
+    kind: str
+    name: str
+    start_date: str
+    days: int = 1
+    people: int = 1
+
+
+@app.post("/api/inventory/holds", status_code=201)
+def api_inventory_hold(payload: HoldRequest):
+    # Hold a homestay, workshop or guide for a group; confirm it before it expires
+    try:
+        return inventory.inventory.hold(payload.kind, payload.name, event_calendar.parse_date(payload.start_date),
+                                        payload.days, max(1, payload.people))
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown {payload.kind}: {payload.name}")
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except inventory.Unavailable as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@app.post("/api/inventory/holds/{hold_id}/confirm")
+def api_inventory_confirm(hold_id: str):
+    hold = inventory.inventory.confirm(hold_id)
+    if hold is None:
+        raise HTTPException(status_code=409, detail="Hold is unknown, released or expired")
+    return hold
+
+
+@app.delete("/api/inventory/holds/{hold_id}")
+def api_inventory_release(hold_id: str):
+    hold = inventory.inventory.release(hold_id)
+    if hold is None:
+        raise HTTPException(status_code=404, detail="Unknown or already released hold")
+    return hold
+
+
+class ExportRequest(BaseModel):
+    preferences: dict = {}
+    itinerary: str
+    activity_suggestions: str = ""
+    weather_forecast: str = ""
+    packing_list: str = ""
+    food_culture_info: str = ""
+    safety_constraints: str = ""
+    useful_links: list[dict] = []
+
+
+@app.post("/api/export/pdf")
+async def api_export_pdf(payload: ExportRequest, request: Request):
+    # Rendered in the PDF worker processes (or served from the cache) and streamed back
+    admission.controller.check_rate(request)
+    if not payload.itinerary.strip():
+        raise HTTPException(status_code=422, detail="Nothing to export: the itinerary is empty")
+    try:
+        key, path = await pdf_export.exporter.export(payload.dict())
+        chunks = pdf_export.iter_file(path)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"PDF export failed: {e}")
+    return StreamingResponse(
+        chunks,
+        media_type="application/pdf",
+        headers={"Content-Disposition": 'attachment; filename="itinerary.pdf"', "ETag": f'"{key}"'},
+    )
+
+
+class JobRequest(BaseModel):
+    kind: str = "itinerary"
+    preferences: Preferences
+
+
+@app.post("/api/jobs", status_code=202)
+def api_submit_job(payload: JobRequest, request: Request):
+    # Queue a long generation for the job workers (job_worker.py) and return at once
+    admission.controller.check_rate(request)
+    if payload.kind not in job_queue.HANDLERS:
+        raise HTTPException(status_code=422, detail=f"Unknown job kind: {payload.kind}")
+    return job_queue.queue.submit(payload.kind, {"preferences": preferences_dict(payload.preferences)})
+
+
+@app.get("/api/jobs/{job_id}")
+def api_job_status(job_id: str):
+    job = job_queue.queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job
+
+
+@app.get("/api/jobs/{job_id}/events")
+def api_job_events(job_id: str):
+    if job_queue.queue.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return StreamingResponse(
+        job_queue.events(job_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def warm_agents():
+    startup.import_modules(AGENT_MODULES)
+    itinerary_graph()
+    semantic_cache.cache.embedder()
+
+
+startup.state.add_phase("data", startup.load_data)
+startup.state.add_phase("agents", warm_agents)
+startup.state.add_phase("model", model_router.preload)
+
+
+@app.on_event("startup")
+def start_warmup():
+    startup.state.start()
+
+@app.on_event("startup")
+def start_batch_workers():
+    batch_jobs.start(run_batch_item)
+
+@app.on_event("startup")
+def start_cache_warmer():
+    # Pre-generate popular trip bundles during idle periods (opt-in)
+    if os.getenv("CACHE_WARMER") == "1":
+        from services import cache_warmer
+        cache_warmer.start()
+
+@app.on_event("shutdown")
+def drain_llm_calls():
+    # Give in-flight generations (including the cache warmer's) time to finish
+    # The warmer is only imported when CACHE_WARMER=1; importing it here would load every agent
+    cache_warmer = sys.modules.get("services.cache_warmer")
+    if cache_warmer is not None:
+        cache_warmer.stop()
+    batch_jobs.stop()
+    pdf_export.exporter.shutdown()
+    analytics.flush(5)
+    if not model_router.router.drain(int(os.getenv("SHUTDOWN_DRAIN_SECONDS", "120"))):
+        print("Shutdown: timed out waiting for in-flight LLM calls")
+
+@app.get("/api/analytics")
+def api_analytics():
+    try:
+        dashboard = analytics.store.dashboard()
+        dashboard["byMonthAndType"] = analytics.store.counts_by_month_and_type()
+        return dashboard
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/model_routes")
+def api_model_routes():
+    return model_router.router.route_stats()
+
+@app.get("/api/chat/cache")
+def api_chat_cache():
+    return semantic_cache.cache.stats()
+
+@app.get("/api/admission")
+def api_admission():
+    return admission.controller.stats()
+
+@app.get("/api/ready")
+def api_ready():
+    # Readiness probe: 503 until the warm-up has loaded the data, agents and models
+    status = startup.state.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+startup.state.import_seconds = round(time.perf_counter() - _import_started, 3)
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("api_server:app", host="0.0.0.0", port=int(os.getenv("PORT", 8000)), reload=True)
 
 
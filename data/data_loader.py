@@ -1,10 +1,26 @@
 """
 Data loader utility for Jharkhand tourism data
 """
+import hashlib
 import json
 import os
+import re
 from typing import Dict, List, Optional, Any
 
+MONTHS = [
+    'january', 'february', 'march', 'april', 'may', 'june',
+    'july', 'august', 'september', 'october', 'november', 'december'
+]
+
+def month_span(text: str) -> List[str]:
+    """Months covered by a free-text month or range ("November", "August-September", "October to March")"""
+    names = [word for word in re.findall(r"[a-z]+", (text or "").lower()) if word in MONTHS]
+    if len(names) < 2:
+        return names
+    first, last = MONTHS.index(names[0]), MONTHS.index(names[-1])
+    # Ranges may wrap around the new year
+    return [MONTHS[(first + i) % 12] for i in range((last - first) % 12 + 1)]
+
 class JharkhandDataLoader:
     """Utility class to load and manage Jharkhand tourism data"""
     
@@ -15,6 +31,9 @@ class JharkhandDataLoader:
         self._seasonal_data = None
         self._cuisine_data = None
         self._safety_data = None
+        self._packing_rules = None
+        self._districts = None
+        self._version = (None, None)
     
     def load_pois(self) -> Dict[str, Any]:
         """Load Points of Interest data"""
@@ -56,6 +75,42 @@ class JharkhandDataLoader:
                 self._safety_data = json.load(f)
         return self._safety_data
     
+    def load_packing_rules(self) -> Dict[str, Any]:
+        """Load rule-based packing list data"""
+        if self._packing_rules is None:
+            file_path = os.path.join(self.data_dir, "packing_rules.json")
+            with open(file_path, 'r', encoding='utf-8') as f:
+                self._packing_rules = json.load(f)
+        return self._packing_rules
+    
+    def load_districts(self) -> Dict[str, Any]:
+        """Load district headquarters coordinates"""
+        if self._districts is None:
+            file_path = os.path.join(self.data_dir, "jharkhand_districts.json")
+            with open(file_path, 'r', encoding='utf-8') as f:
+                self._districts = json.load(f)
+        return self._districts
+    
+    def dataset_version(self) -> str:
+        """Short hash of the JSON data files; changes whenever any of them is edited"""
+        names = sorted(name for name in os.listdir(self.data_dir) if name.endswith(".json"))
+        signature = tuple((name, os.stat(os.path.join(self.data_dir, name)).st_mtime_ns) for name in names)
+        if self._version[0] != signature:
+            digest = hashlib.sha256()
+            for name in names:
+                with open(os.path.join(self.data_dir, name), 'rb') as f:
+                    digest.update(name.encode("utf-8") + b"\0" + f.read())
+            self._version = (signature, digest.hexdigest()[:12])
+        return self._version[1]
+    
+    def get_season_for_month(self, month: str) -> Optional[str]:
+        """Get the season name (monsoon, winter, summer, post_monsoon) for a month"""
+        seasonal_data = self.load_seasonal_constraints()
+        for season_name, season_info in seasonal_data['seasons'].items():
+            if month.lower() in season_info['months']:
+                return season_name
+        return None
+    
     def get_pois_by_category(self, category: str) -> List[Dict[str, Any]]:
         """Get POIs filtered by category"""
         pois_data = self.load_pois()
@@ -96,7 +151,7 @@ class JharkhandDataLoader:
         tribal_data = self.load_tribal_culture()
         festivals = []
         for festival in tribal_data['cultural_festivals']:
-            if month.lower() in festival['month'].lower():
+            if month.lower() in month_span(festival['month']):
                 festivals.append(festival)
         return festivals
     
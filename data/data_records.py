@@ -0,0 +1,303 @@
+"""
+Typed record classes for Jharkhand tourism data
+
+The JSON datasets load as nested dicts, and every agent used to re-project
+the fields it puts in its prompt on every request. The records here are
+built once from the loaded data:
+
+- immutable, slotted dataclasses (no per-instance __dict__);
+- list fields stored as tuples and short categorical strings (category,
+  month, location, community, ...) interned, so repeated values share one
+  object;
+- each record carries its prompt projection, built once, and the JSON text
+  for a given tuple of records is memoised.
+
+Records compare and hash by identity: there is exactly one record per
+dataset entry.
+"""
+import json
+import sys
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Any
+
+from data_loader import JharkhandDataLoader, jharkhand_data, month_span
+
+
+def _intern(value: Any) -> str:
+    return sys.intern(str(value or ""))
+
+
+def _texts(values: Any) -> Tuple[str, ...]:
+    return tuple(str(value) for value in values or ())
+
+
+def _tags(values: Any) -> Tuple[str, ...]:
+    return tuple(_intern(value) for value in values or ())
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class POI:
+    id: str
+    name: str
+    category: str
+    district: str
+    difficulty_level: str
+    description: str
+    activities: Tuple[str, ...]
+    best_season: Tuple[str, ...]
+    duration_recommended: str
+    entry_fee: int
+    special_notes: str
+    cultural_significance: str
+    safety_notes: str
+    prompt: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "POI":
+        values = dict(
+            id=_intern(data['id']),
+            name=data['name'],
+            category=_intern(data['category']),
+            district=_intern(data.get('district')),
+            difficulty_level=_intern(data.get('difficulty_level')),
+            description=data.get('description', ''),
+            activities=_tags(data.get('activities')),
+            best_season=_tags(data.get('best_season')),
+            duration_recommended=data.get('duration_recommended', ''),
+            entry_fee=data.get('entry_fee') or 0,
+            special_notes=data.get('special_notes', ''),
+            cultural_significance=data.get('cultural_significance', ''),
+            safety_notes=data.get('safety_notes', ''),
+        )
+        prompt = {key: values[key] for key in (
+            'name', 'category', 'description', 'activities', 'duration_recommended', 'difficulty_level',
+            'entry_fee', 'special_notes', 'cultural_significance', 'safety_notes')}
+        return cls(**values, prompt=prompt)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Festival:
+    name: str
+    month: str
+    months: Tuple[str, ...]
+    description: str
+    activities: Tuple[str, ...]
+    best_locations: Tuple[str, ...]
+    duration: str
+    visitor_experience: str
+    prompt: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Festival":
+        values = dict(
+            name=data['name'],
+            month=_intern(data.get('month')),
+            months=_tags(month_span(data.get('month', ''))),
+            description=data.get('description', ''),
+            activities=_texts(data.get('activities')),
+            best_locations=_tags(data.get('best_locations')),
+            duration=_intern(data.get('duration')),
+            visitor_experience=data.get('visitor_experience', ''),
+        )
+        prompt = {key: values[key] for key in (
+            'name', 'description', 'activities', 'best_locations', 'duration', 'visitor_experience')}
+        return cls(**values, prompt=prompt)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Workshop:
+    name: str
+    location: str
+    craft_type: str
+    description: str
+    duration: str
+    cost: str
+    group_size: str
+    season: str
+    prompt: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Workshop":
+        values = dict(
+            name=data['name'],
+            location=_intern(data.get('location')),
+            craft_type=_intern(data.get('craft_type')),
+            description=data.get('description', ''),
+            duration=_intern(data.get('duration')),
+            cost=_intern(data.get('cost')),
+            group_size=_intern(data.get('group_size')),
+            season=_intern(data.get('season')),
+        )
+        return cls(**values, prompt=dict(values))
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Homestay:
+    name: str
+    location: str
+    community: str
+    description: str
+    amenities: Tuple[str, ...]
+    special_features: Tuple[str, ...]
+    prompt: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Homestay":
+        values = dict(
+            name=data['name'],
+            location=_intern(data.get('location')),
+            community=_intern(data.get('community')),
+            description=data.get('description', ''),
+            amenities=_tags(data.get('amenities')),
+            special_features=_texts(data.get('special_features')),
+        )
+        return cls(**values, prompt=dict(values))
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Guide:
+    name: str
+    specialization: str
+    languages: Tuple[str, ...]
+    services: Tuple[str, ...]
+    cost_per_day: str
+    prompt: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Guide":
+        values = dict(
+            name=data['name'],
+            specialization=data.get('specialization', ''),
+            languages=_tags(data.get('languages')),
+            services=_tags(data.get('services')),
+            cost_per_day=_intern(data.get('cost_per_day')),
+        )
+        return cls(**values, prompt=dict(values))
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Dish:
+    name: str
+    name_hindi: str
+    category: str
+    description: str
+    ingredients: Tuple[str, ...]
+    origin: str
+    best_served_with: str
+    seasonal: str
+    cultural_significance: str
+    where_to_find: str
+    prompt: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Dish":
+        values = dict(
+            name=data['name'],
+            name_hindi=data.get('name_hindi', ''),
+            category=_intern(data.get('category')),
+            description=data.get('description', ''),
+            ingredients=_tags(data.get('ingredients')),
+            origin=_intern(data.get('origin')),
+            best_served_with=data.get('best_served_with', ''),
+            seasonal=_intern(data.get('seasonal')),
+            cultural_significance=data.get('cultural_significance', ''),
+            where_to_find=data.get('where_to_find', ''),
+        )
+        return cls(**values, prompt=dict(values))
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Market:
+    name: str
+    location: str
+    description: str
+    best_time: str
+    specialties: Tuple[str, ...]
+    prompt: Dict[str, Any] = field(repr=False)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Market":
+        values = dict(
+            name=data['name'],
+            location=_intern(data.get('location')),
+            description=data.get('description', ''),
+            best_time=_intern(data.get('best_time')),
+            specialties=_tags(data.get('specialties')),
+        )
+        return cls(**values, prompt=dict(values))
+
+
+@lru_cache(maxsize=1024)
+def prompt_json(records: Tuple[Any, ...]) -> str:
+    """JSON list of the records' prompt projections (memoised per tuple of records)"""
+    return json.dumps([record.prompt for record in records], indent=2)
+
+
+class JharkhandRecords:
+    """Record views of the datasets, built once on first use"""
+
+    def __init__(self, loader: JharkhandDataLoader):
+        self.loader = loader
+        self._lock = threading.Lock()
+        self._built = False
+
+    def _build(self):
+        with self._lock:
+            if self._built:
+                return
+            tribal = self.loader.load_tribal_culture()
+            cuisine = self.loader.load_cuisine_data()
+            self._pois = {poi['id']: POI.from_dict(poi) for poi in self.loader.load_pois()['pois']}
+            self._festivals = tuple(Festival.from_dict(f) for f in tribal.get('cultural_festivals', []))
+            self._workshops = tuple(Workshop.from_dict(w) for w in tribal.get('handicraft_workshops', []))
+            self._homestays = tuple(Homestay.from_dict(h) for h in tribal.get('homestay_options', []))
+            self._guides = tuple(Guide.from_dict(g) for g in tribal.get('local_guides', []))
+            self._dishes = tuple(Dish.from_dict(d) for d in cuisine.get('traditional_dishes', []))
+            self._markets = tuple(Market.from_dict(m) for m in cuisine.get('food_markets', []))
+            months = {month for festival in self._festivals for month in festival.months}
+            self._festivals_by_month = {
+                month: tuple(f for f in self._festivals if month in f.months) for month in months
+            }
+            self._built = True
+
+    def _ensure(self):
+        if not self._built:
+            self._build()
+
+    def poi(self, poi_id: str) -> Optional[POI]:
+        self._ensure()
+        return self._pois.get(poi_id)
+
+    def pois(self, poi_ids: List[str]) -> Tuple[POI, ...]:
+        self._ensure()
+        return tuple(self._pois[poi_id] for poi_id in poi_ids if poi_id in self._pois)
+
+    def festivals_by_month(self, month: str) -> Tuple[Festival, ...]:
+        self._ensure()
+        return self._festivals_by_month.get(month.lower(), ())
+
+    def workshops(self) -> Tuple[Workshop, ...]:
+        self._ensure()
+        return self._workshops
+
+    def homestays(self) -> Tuple[Homestay, ...]:
+        self._ensure()
+        return self._homestays
+
+    def guides(self) -> Tuple[Guide, ...]:
+        self._ensure()
+        return self._guides
+
+    def dishes(self) -> Tuple[Dish, ...]:
+        self._ensure()
+        return self._dishes
+
+    def markets(self) -> Tuple[Market, ...]:
+        self._ensure()
+        return self._markets
+
+
+# Global instance sharing the data loader's cached datasets
+jharkhand_records = JharkhandRecords(jharkhand_data)
@@ -0,0 +1,55 @@
+"""
+Background job worker for the Travel Itinerary Planner
+
+Runs N worker processes that claim jobs submitted through /api/jobs from the
+shared SQLite queue (JOB_DB_PATH) and run them through the same agents as
+the API. Workers can be started and stopped independently of the API server;
+on SIGTERM each finishes its current job before exiting.
+
+Usage:
+    python job_worker.py --processes 2
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+
+
+def run_worker():
+    # Importing the API registers the job handlers; the warm-up loads the data, agents and models
+    import api_server  # noqa: F401
+    from services import analytics, job_queue, startup
+    startup.state.run()
+
+    worker = job_queue.JobWorker(job_queue.queue)
+    signal.signal(signal.SIGTERM, lambda *_: worker.stop())
+    signal.signal(signal.SIGINT, lambda *_: worker.stop())
+    print(f"Job worker {worker.owner} started")
+    worker.run()
+    # Write the trips of the jobs that finished before exiting
+    analytics.flush(5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("JOB_WORKERS", "1")))
+    args = parser.parse_args()
+
+    processes = [multiprocessing.Process(target=run_worker, name=f"job-worker-{i}")
+                 for i in range(max(1, args.processes))]
+    for process in processes:
+        process.start()
+
+    def forward(signum, _frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
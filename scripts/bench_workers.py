@@ -0,0 +1,110 @@
+"""
+Benchmark how non-LLM endpoints scale with the number of server workers
+
+For each worker count, starts serve.py, drives /api/pack_list and
+/api/analytics from several client processes for a fixed time, and reports
+throughput and scaling efficiency relative to a single worker. No Ollama
+backend is needed because neither endpoint calls the LLM, and the server
+runs with the per-client rate limit lifted.
+
+Usage:
+    python scripts/bench_workers.py --workers 1 2 4 --seconds 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+PACK_LIST_PAYLOAD = {"destination": "Netarhat", "season": "November", "activities": "Trekking, photography", "days": 5}
+
+
+def wait_until_ready(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if requests.get(f"{base_url}/api/analytics", timeout=2).status_code == 200:
+                return True
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    return False
+
+
+def client_loop(args):
+    """Send requests in a tight loop until the deadline; returns (ok, failed)"""
+    base_url, deadline = args
+    session = requests.Session()
+    ok = failed = 0
+    i = 0
+    while time.time() < deadline:
+        try:
+            if i % 2:
+                response = session.get(f"{base_url}/api/analytics", timeout=10)
+            else:
+                response = session.post(f"{base_url}/api/pack_list", json=PACK_LIST_PAYLOAD, timeout=10)
+            ok += response.status_code == 200
+            failed += response.status_code != 200
+        except requests.RequestException:
+            failed += 1
+        i += 1
+    return ok, failed
+
+
+def bench(workers, port, seconds, clients):
+    base_url = f"http://127.0.0.1:{port}"
+    workdir = tempfile.mkdtemp(prefix="bench_workers_")
+    env = {
+        **os.environ,
+        "RESPONSE_CACHE_BACKEND": "sqlite",
+        "RESPONSE_CACHE_DB_PATH": os.path.join(workdir, "response_cache.db"),
+        "ANALYTICS_DB_PATH": os.path.join(workdir, "analytics.db"),
+        "REQUEST_LOG_PATH": os.path.join(workdir, "requests.jsonl"),
+        # All load comes from one address; the per-client rate limit would turn most of it into 429s
+        "RATE_LIMIT_PER_MINUTE": "1000000000",
+        "RATE_LIMIT_BURST": "1000000000",
+    }
+    server = subprocess.Popen(
+        [sys.executable, "serve.py", "--workers", str(workers), "--port", str(port), "--drain-seconds", "5"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        if not wait_until_ready(base_url):
+            raise RuntimeError(f"Server with {workers} workers did not start")
+        deadline = time.time() + seconds
+        with Pool(clients) as pool:
+            results = pool.map(client_loop, [(base_url, deadline)] * clients)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    ok = sum(r[0] for r in results)
+    failed = sum(r[1] for r in results)
+    return ok / seconds, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark worker scaling of non-LLM endpoints")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--seconds", type=int, default=15)
+    parser.add_argument("--clients", type=int, default=(os.cpu_count() or 2) * 2,
+                        help="Client processes generating load")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    baseline = None
+    print(f"{'workers':>7} {'req/s':>10} {'speedup':>8} {'efficiency':>10} {'failed':>7}")
+    for workers in args.workers:
+        throughput, failed = bench(workers, args.port, args.seconds, args.clients)
+        baseline = baseline or throughput / workers
+        speedup = throughput / baseline
+        print(f"{workers:>7} {throughput:>10.1f} {speedup:>8.2f} {speedup / workers:>10.0%} {failed:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Replay a captured request log against an API server for load testing
+
+Re-sends every logged API call with its original query string and body,
+preserving the relative arrival times of the capture divided by a speed-up
+factor, and prints a latency summary.
+
+Usage:
+    python scripts/replay_requests.py logs/requests.jsonl --base-url http://127.0.0.1:8000 --speedup 10
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from services import request_log
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a sequence of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+def load_records(path, endpoint=None, limit=None):
+    """Replayable records (with endpoint and method), in capture order"""
+    records = []
+    for record in request_log.read(path):
+        if not record.get("endpoint") or not record.get("method"):
+            continue
+        if endpoint and record["endpoint"] != endpoint:
+            continue
+        records.append(record)
+    records.sort(key=lambda r: r.get("ts", 0))
+    return records[:limit] if limit else records
+
+
+def send(session_factory, base_url, record, timeout):
+    """Send one recorded call; returns (status or None, latency seconds)"""
+    session = session_factory()
+    started_at = time.perf_counter()
+    try:
+        if "body" in record:
+            # Not JSON (e.g. an NDJSON batch upload): send the body as it was received
+            body = {"data": record["body"].encode("utf-8"),
+                    "headers": {"Content-Type": record.get("content_type") or "application/octet-stream"}}
+        else:
+            body = {"json": record.get("payload")}
+        response = session.request(
+            record["method"], base_url.rstrip("/") + record["endpoint"],
+            params=record.get("query"), timeout=timeout, **body,
+        )
+        status = response.status_code
+    except requests.RequestException:
+        status = None
+    return status, time.perf_counter() - started_at
+
+
+def replay(records, base_url, speedup=1.0, concurrency=16, timeout=300):
+    """Re-drive records at the captured pace divided by speedup"""
+    local = threading.local()
+
+    def session_factory():
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        return local.session
+
+    results = []
+    first_ts = records[0].get("ts", 0)
+    started_at = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = []
+        for record in records:
+            offset = (record.get("ts", first_ts) - first_ts) / speedup
+            delay = offset - (time.perf_counter() - started_at)
+            if delay > 0:
+                time.sleep(delay)
+            futures.append(pool.submit(send, session_factory, base_url, record, timeout))
+        for future in futures:
+            results.append(future.result())
+    return results, time.perf_counter() - started_at
+
+
+def summarize(results, elapsed):
+    latencies = [latency for _, latency in results]
+    errors = sum(1 for status, _ in results if status is None or status >= 500)
+    rejected = sum(1 for status, _ in results if status in (429, 503))
+    print(f"Requests:   {len(results)} in {elapsed:.1f}s ({len(results) / elapsed:.2f} req/s)")
+    print(f"Errors:     {errors} (rejected 429/503: {rejected})")
+    print(f"Latency:    p50 {percentile(latencies, 0.5):.3f}s  p95 {percentile(latencies, 0.95):.3f}s  "
+          f"p99 {percentile(latencies, 0.99):.3f}s  max {max(latencies):.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a request log against an API server")
+    parser.add_argument("log", nargs="?", default=request_log.REQUEST_LOG_PATH, help="Request log path")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="Server to replay against")
+    parser.add_argument("--speedup", type=float, default=1.0, help="Replay N times faster than captured")
+    parser.add_argument("--concurrency", type=int, default=16, help="Maximum requests in flight")
+    parser.add_argument("--endpoint", help="Only replay this endpoint, e.g. /api/chat")
+    parser.add_argument("--limit", type=int, help="Replay at most N requests")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-request timeout in seconds")
+    args = parser.parse_args()
+
+    records = load_records(args.log, args.endpoint, args.limit)
+    if not records:
+        print("No replayable requests found")
+        return
+    results, elapsed = replay(records, args.base_url, args.speedup, args.concurrency, args.timeout)
+    summarize(results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
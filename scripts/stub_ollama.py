@@ -0,0 +1,129 @@
+"""
+Stand-in Ollama servers for trying out the backend pool without a GPU
+
+Each server answers the parts of the Ollama API the planner uses
+(/api/tags, /api/ps, /api/generate and streaming /api/chat) with canned
+text after a configurable delay, streamed at --token-seconds per word and
+stopping after options.num_predict words. The first call for a model on a server
+also pays --load-seconds, as if the model had to be loaded, and servers can
+be made to fail a share of calls with --fail-rate.
+
+Usage:
+    python scripts/stub_ollama.py --ports 11501 11502 11503 --latency 0.5
+    OLLAMA_BACKENDS=http://127.0.0.1:11501,http://127.0.0.1:11502,http://127.0.0.1:11503 \\
+        python -m uvicorn api_server:app --port 8000
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPLY = "Day 1: Arrive in Ranchi and visit Tagore Hill. Day 2: Hundru Falls and local market."
+
+
+def make_handler(port, args):
+    loaded = set()
+    lock = threading.Lock()
+    counts = {"calls": 0}
+
+    class StubOllama(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *log_args):
+            if args.verbose:
+                super().log_message(format, *log_args)
+
+        def send_json(self, body, status=200):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/api/tags":
+                self.send_json({"models": [{"name": name} for name in args.models]})
+            elif self.path == "/api/ps":
+                with lock:
+                    self.send_json({"models": [{"name": name} for name in sorted(loaded)]})
+            else:
+                self.send_json({"error": "not found"}, 404)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            model = body.get("model", "")
+            if ":" not in model:
+                model += ":latest"
+            if random.random() < args.fail_rate:
+                self.send_json({"error": "stub failure"}, 500)
+                return
+            with lock:
+                counts["calls"] += 1
+                cold = model not in loaded
+                loaded.add(model)
+            time.sleep(args.latency + (args.load_seconds if cold else 0.0))
+            reply = f"[{port}] {REPLY}"
+            if self.path == "/api/generate":
+                self.send_json({"model": model, "response": reply[:1], "done": True,
+                                "load_duration": int((args.load_seconds if cold else 0.0) * 1e9)})
+            elif self.path == "/api/chat":
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                limit = (body.get("options") or {}).get("num_predict") or args.words
+                words = (reply.split(" ") * args.words)[:min(limit, args.words)]
+                decode_started = time.perf_counter()
+                try:
+                    for word in words:
+                        time.sleep(args.token_seconds)
+                        self.write_chunk({"model": model, "message": {"role": "assistant", "content": word + " "},
+                                          "done": False})
+                    self.write_chunk({"model": model, "message": {"role": "assistant", "content": ""}, "done": True,
+                                      "done_reason": "length" if len(words) == limit else "stop",
+                                      "prompt_eval_count": 50, "eval_count": len(words),
+                                      "eval_duration": int((time.perf_counter() - decode_started) * 1e9)})
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading (cancelled or out of time)
+                    return
+                self.wfile.write(b"0\r\n\r\n")
+            else:
+                self.send_json({"error": "not found"}, 404)
+
+        def write_chunk(self, body):
+            data = (json.dumps(body) + "\n").encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+
+    return StubOllama
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run stand-in Ollama servers")
+    parser.add_argument("--ports", type=int, nargs="+", default=[11501, 11502])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--models", nargs="+", default=["llama3.2:1b", "llama3.2:latest"])
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per generation")
+    parser.add_argument("--token-seconds", type=float, default=0.0, help="delay between streamed words")
+    parser.add_argument("--words", type=int, default=16, help="words in a full reply")
+    parser.add_argument("--load-seconds", type=float, default=2.0, help="extra seconds for a model's first call")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of calls answered with HTTP 500")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    servers = [ThreadingHTTPServer((args.host, port), make_handler(port, args)) for port in args.ports]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Stub Ollama listening on http://{args.host}:{server.server_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        for server in servers:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Production server for the Travel Itinerary Planner API
+
+Starts N worker processes. With gunicorn installed (Linux/macOS) the app and
+all datasets are loaded once in the master before forking, so workers share
+the data snapshot copy-on-write. Without gunicorn it falls back to uvicorn's
+own multi-process mode, where each worker loads its own copy. The response
+cache is switched to the shared SQLite backend so all workers see each
+other's cached generations. On SIGTERM workers stop accepting requests and
+drain in-flight LLM calls for up to --drain-seconds. Background job workers
+(job_worker.py) are started alongside the server unless --job-workers is 0.
+
+Usage:
+    python serve.py --workers 4 --port 8000
+"""
+import argparse
+import gc
+import os
+import subprocess
+import sys
+
+
+def preload_data():
+    """Load and index every dataset and import the agents so forked workers share them copy-on-write"""
+    from services import startup
+    # The model preload runs in each worker's own warm-up
+    startup.state.run(only=["data", "agents"])
+
+
+def run_gunicorn(args):
+    from gunicorn.app.base import BaseApplication
+
+    class PreloadedApplication(BaseApplication):
+        def __init__(self, options):
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            import api_server
+            preload_data()
+            # Keep the loaded objects out of the GC's reach so collections in
+            # the workers do not touch (and un-share) their memory pages
+            gc.freeze()
+            return api_server.app
+
+    PreloadedApplication({
+        "bind": f"{args.host}:{args.port}",
+        "workers": args.workers,
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "graceful_timeout": args.drain_seconds,
+        "timeout": args.drain_seconds + 30,
+        "keepalive": 5,
+    }).run()
+
+
+def run_uvicorn(args):
+    import uvicorn
+    uvicorn.run(
+        "api_server:app",
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        timeout_graceful_shutdown=args.drain_seconds,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API server with multiple workers")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)))
+    parser.add_argument("--drain-seconds", type=int, default=int(os.getenv("SHUTDOWN_DRAIN_SECONDS", "120")),
+                        help="How long to wait for in-flight LLM calls on shutdown")
+    parser.add_argument("--job-workers", type=int, default=int(os.getenv("JOB_WORKERS", "1")),
+                        help="Background job worker processes (0 to run them separately)")
+    args = parser.parse_args()
+
+    os.environ["SHUTDOWN_DRAIN_SECONDS"] = str(args.drain_seconds)
+    if args.workers > 1:
+        os.environ.setdefault("RESPONSE_CACHE_BACKEND", "sqlite")
+
+    job_workers = None
+    if args.job_workers > 0:
+        job_workers = subprocess.Popen(
+            [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "job_worker.py"),
+             "--processes", str(args.job_workers)]
+        )
+    try:
+        try:
+            import gunicorn  # noqa: F401
+        except ImportError:
+            run_uvicorn(args)
+        else:
+            run_gunicorn(args)
+    finally:
+        if job_workers is not None:
+            job_workers.terminate()
+            job_workers.wait(timeout=args.drain_seconds)
+
+
+if __name__ == "__main__":
+    main()
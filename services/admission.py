@@ -0,0 +1,241 @@
+"""
+Admission control for the LLM-backed API endpoints
+
+Every agent call passes through here before it is handed to a worker thread:
+
+- A token bucket per client (X-API-Key header, else client IP) limits the
+  request rate; over-limit calls get 429 with Retry-After.
+- Each priority class has a fixed number of concurrent slots and a bounded
+  wait queue; when the queue is full calls get 503 with Retry-After instead
+  of blocking until the client times out.
+- While a call waits or runs, the client connection is polled. If the client
+  disconnects, the call leaves the queue or its generation is cancelled
+  (see request_context), so capacity goes only to requests someone is still
+  waiting for.
+- A call still queued when its request's deadline passes stops waiting and
+  runs without a slot: the agent skips the LLM and answers from data.
+
+Buckets and queues are per process: behind serve.py --workers N a client
+gets N times RATE_LIMIT_PER_MINUTE and each class N times its slots.
+"""
+import asyncio
+import contextvars
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Any
+
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from services import request_context
+
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "30"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "10"))
+# Buckets idle for this long are full again and can be dropped
+BUCKET_IDLE_SECONDS = 600
+
+# Concurrent calls and queued calls allowed per priority class
+PRIORITY_CLASSES = {
+    "interactive": {
+        "concurrency": int(os.getenv("ADMISSION_INTERACTIVE_CONCURRENCY", "4")),
+        "queue": int(os.getenv("ADMISSION_INTERACTIVE_QUEUE", "16")),
+    },
+    "standard": {
+        "concurrency": int(os.getenv("ADMISSION_STANDARD_CONCURRENCY", "2")),
+        "queue": int(os.getenv("ADMISSION_STANDARD_QUEUE", "8")),
+    },
+}
+
+DISCONNECT_POLL_SECONDS = 0.5
+
+# Status nginx uses for "client closed request"; the client never sees it
+CLIENT_CLOSED_REQUEST = 499
+
+
+def client_key(request: Request) -> str:
+    """Rate-limit identity of a request: its API key, else the client IP"""
+    api_key = request.headers.get("x-api-key")
+    if api_key:
+        return f"key:{api_key}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+class TokenBucketLimiter:
+    """Token bucket per client key, refilled continuously"""
+
+    def __init__(self, per_minute: float, burst: float):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.monotonic()
+
+    def acquire(self, key: str) -> float:
+        """Take a token for key; returns 0 on success, else seconds until one is available"""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_prune > BUCKET_IDLE_SECONDS:
+                self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < BUCKET_IDLE_SECONDS}
+                self._last_prune = now
+            tokens, updated_at = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                return 0.0
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate if self.rate > 0 else 60.0
+
+
+class PriorityClass:
+    """Fixed concurrency slots plus a bounded wait queue"""
+
+    def __init__(self, name: str, concurrency: int, queue: int):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.max_queue = max(0, queue)
+        self.running = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.expired = 0
+        # Moving average of how long an admitted call holds its slot
+        self.avg_service_seconds = 5.0
+        self._slots = None
+
+    def slots(self) -> asyncio.Semaphore:
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        return self._slots
+
+    def retry_after(self) -> int:
+        """Seconds until the queue is likely to have drained"""
+        backlog = self.waiting + self.running
+        return max(1, math.ceil(backlog / self.concurrency * self.avg_service_seconds))
+
+    def observe(self, seconds: float):
+        self.avg_service_seconds = 0.8 * self.avg_service_seconds + 0.2 * seconds
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "running": self.running,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+            "cancelled": self.cancelled,
+            "expired": self.expired,
+            "avg_service_seconds": round(self.avg_service_seconds, 3),
+        }
+
+
+class AdmissionController:
+    """Rate limits, queues and runs agent calls on behalf of API endpoints"""
+
+    def __init__(self, limiter: TokenBucketLimiter, classes: Dict[str, Dict[str, int]]):
+        self.limiter = limiter
+        self.classes = {name: PriorityClass(name, **config) for name, config in classes.items()}
+        self.rate_limited = 0
+
+    def check_rate(self, request: Request):
+        """Raise 429 if the client is over its rate limit"""
+        wait = self.limiter.acquire(client_key(request))
+        if wait > 0:
+            self.rate_limited += 1
+            raise HTTPException(
+                status_code=429, detail="Rate limit exceeded",
+                headers={"Retry-After": str(max(1, math.ceil(wait)))},
+            )
+
+    async def run(self, request: Request, priority: str, func: Callable, *args, queue: bool = True):
+        """Admit a call and run func(*args) in a worker thread
+
+        With queue=False the call is only rate limited (used for calls that
+        never reach the LLM).
+        """
+        self.check_rate(request)
+        if not queue:
+            return await run_in_threadpool(func, *args)
+
+        cls = self.classes[priority]
+        if cls.waiting + cls.running >= cls.concurrency + cls.max_queue:
+            cls.rejected += 1
+            raise HTTPException(
+                status_code=503, detail="Server busy, try again later",
+                headers={"Retry-After": str(cls.retry_after())},
+            )
+
+        cls.waiting += 1
+        acquire = asyncio.ensure_future(cls.slots().acquire())
+        expired = False
+        try:
+            while True:
+                done, _ = await asyncio.wait({acquire}, timeout=DISCONNECT_POLL_SECONDS)
+                if done:
+                    break
+                if await request.is_disconnected():
+                    cls.cancelled += 1
+                    raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client disconnected")
+                remaining = request_context.remaining_seconds()
+                if remaining is not None and remaining <= 0:
+                    expired = True
+                    break
+        except BaseException:
+            # Give the slot back if it was granted while we were leaving
+            if not acquire.cancel() and not acquire.exception():
+                cls.slots().release()
+            raise
+        finally:
+            cls.waiting -= 1
+
+        if expired:
+            if not acquire.cancel() and not acquire.exception():
+                cls.slots().release()
+            # Out of time for a generation: the agent answers from data, which needs no slot
+            cls.expired += 1
+            return await run_in_threadpool(func, *args)
+
+        cls.running += 1
+        started_at = time.perf_counter()
+        try:
+            return await self._run_cancellable(request, cls, func, *args)
+        finally:
+            cls.running -= 1
+            cls.observe(time.perf_counter() - started_at)
+            cls.slots().release()
+
+    async def _run_cancellable(self, request: Request, cls: PriorityClass, func: Callable, *args):
+        cancel_event = threading.Event()
+        token = request_context.bind_cancel_event(cancel_event)
+        try:
+            context = contextvars.copy_context()
+        finally:
+            request_context.reset_cancel_event(token)
+
+        task = asyncio.ensure_future(run_in_threadpool(context.run, func, *args))
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                cancel_event.set()
+                cls.cancelled += 1
+                # Hold the slot until the worker thread has actually stopped
+                await asyncio.wait({task})
+                raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client disconnected")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_limit": {"per_minute": RATE_LIMIT_PER_MINUTE, "burst": RATE_LIMIT_BURST,
+                           "rejected": self.rate_limited},
+            "classes": {name: cls.stats() for name, cls in self.classes.items()},
+        }
+
+
+controller = AdmissionController(TokenBucketLimiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST), PRIORITY_CLASSES)
+
+
+async def run(request: Request, priority: str, func: Callable, *args, queue: bool = True):
+    """Admit and run a call through the shared controller"""
+    return await controller.run(request, priority, func, *args, queue=queue)
@@ -0,0 +1,257 @@
+"""
+Tourism analytics with pre-aggregated rollups
+
+Itinerary requests are ingested as events. Each event incrementally updates
+small rollup tables (visitors per day, per district, per POI and per
+month/tourism type) in SQLite, so the /api/analytics dashboard is served
+from pre-aggregated rows regardless of how many events were ingested.
+
+Requests hand their trip to record_trip_later(), which only queues it; a
+background thread does the SQLite write, off the request path.
+"""
+import json
+import os
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Any
+
+# Add data directory to path to import our data loader
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
+from data_loader import jharkhand_data
+
+ANALYTICS_DB_PATH = os.getenv("ANALYTICS_DB_PATH", os.path.join("var", "analytics.db"))
+# Visitor-nights per day that partner stays can host; used for the occupancy KPI
+ANALYTICS_DAILY_CAPACITY = int(os.getenv("ANALYTICS_DAILY_CAPACITY", "200"))
+
+GENERIC_POI_SUFFIXES = ["falls", "dam", "temple", "national park"]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    day TEXT NOT NULL,
+    month TEXT,
+    tourism_type TEXT,
+    visitors INTEGER NOT NULL,
+    duration INTEGER NOT NULL,
+    revenue REAL NOT NULL,
+    poi_ids TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    day TEXT PRIMARY KEY,
+    trips INTEGER NOT NULL DEFAULT 0,
+    visitors INTEGER NOT NULL DEFAULT 0,
+    visitor_days INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS location_rollup (
+    district TEXT PRIMARY KEY,
+    visitors INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS place_rollup (
+    poi_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    visitors INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS month_type_rollup (
+    month TEXT NOT NULL,
+    tourism_type TEXT NOT NULL,
+    trips INTEGER NOT NULL DEFAULT 0,
+    visitors INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (month, tourism_type)
+);
+"""
+
+
+def parse_group_size(num_people: Any) -> int:
+    """Number of visitors from a group size label such as '2', '4-6' or '10+'"""
+    numbers = [int(n) for n in re.findall(r"\d+", str(num_people or "1"))]
+    if not numbers:
+        return 1
+    return max(1, round(sum(numbers) / len(numbers)))
+
+
+def parse_daily_budget(budget_range: Any) -> float:
+    """Midpoint of a daily budget label such as 'Mid-Range (₹1500-3000/day)'"""
+    numbers = [int(n) for n in re.findall(r"\d+", str(budget_range or ""))]
+    if not numbers:
+        return 0.0
+    return sum(numbers) / len(numbers)
+
+
+def build_poi_aliases() -> Dict[str, List[str]]:
+    """Lower-case names that identify each POI in free text"""
+    aliases = {}
+    for poi in jharkhand_data.load_pois()['pois']:
+        name = poi['name'].lower()
+        names = {name, name.split(',')[0].strip()}
+        for base in list(names):
+            for suffix in GENERIC_POI_SUFFIXES:
+                if base.endswith(" " + suffix):
+                    names.add(base[:-len(suffix) - 1])
+        aliases[poi['id']] = sorted(names, key=len, reverse=True)
+    return aliases
+
+
+class AnalyticsStore:
+    """SQLite-backed event store with incrementally maintained rollups"""
+
+    def __init__(self, db_path: str = ANALYTICS_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._poi_aliases = None
+        self._pois = None
+
+    def connection(self) -> sqlite3.Connection:
+        """Per-thread, per-process connection (WAL mode so readers never block the writer)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def resolve_poi_ids(self, *texts: str) -> List[str]:
+        """POI ids mentioned in any of the given texts"""
+        if self._poi_aliases is None:
+            self._poi_aliases = build_poi_aliases()
+            self._pois = {poi['id']: poi for poi in jharkhand_data.load_pois()['pois']}
+        haystack = " ".join(t.lower() for t in texts if t)
+        return [poi_id for poi_id, names in self._poi_aliases.items()
+                if any(re.search(r"\b" + re.escape(n) + r"\b", haystack) for n in names)]
+
+    def record_trip(self, preferences: Dict[str, Any], itinerary: str = "", ts: Optional[float] = None):
+        """Ingest one itinerary request and update all rollups in a single transaction"""
+        ts = ts or time.time()
+        day = date.fromtimestamp(ts).isoformat()
+        month = (preferences.get('month') or 'unknown').lower()
+        tourism_type = preferences.get('tourism_type') or 'Unknown'
+        visitors = parse_group_size(preferences.get('num_people'))
+        duration = max(1, int(preferences.get('duration') or 1))
+        revenue = parse_daily_budget(preferences.get('budget_range')) * visitors * duration
+        poi_ids = self.resolve_poi_ids(preferences.get('destination', ''), itinerary)
+        districts = sorted({self._pois[poi_id]['district'] for poi_id in poi_ids})
+
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                "INSERT INTO events (ts, day, month, tourism_type, visitors, duration, revenue, poi_ids) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (ts, day, month, tourism_type, visitors, duration, revenue, json.dumps(poi_ids)),
+            )
+            conn.execute(
+                "INSERT INTO daily_rollup (day, trips, visitors, visitor_days, revenue) VALUES (?, 1, ?, ?, ?) "
+                "ON CONFLICT(day) DO UPDATE SET trips = trips + 1, visitors = visitors + excluded.visitors, "
+                "visitor_days = visitor_days + excluded.visitor_days, revenue = revenue + excluded.revenue",
+                (day, visitors, visitors * duration, revenue),
+            )
+            conn.execute(
+                "INSERT INTO month_type_rollup (month, tourism_type, trips, visitors) VALUES (?, ?, 1, ?) "
+                "ON CONFLICT(month, tourism_type) DO UPDATE SET trips = trips + 1, "
+                "visitors = visitors + excluded.visitors",
+                (month, tourism_type, visitors),
+            )
+            conn.executemany(
+                "INSERT INTO place_rollup (poi_id, name, visitors) VALUES (?, ?, ?) "
+                "ON CONFLICT(poi_id) DO UPDATE SET visitors = visitors + excluded.visitors",
+                [(poi_id, self._pois[poi_id]['name'], visitors) for poi_id in poi_ids],
+            )
+            conn.executemany(
+                "INSERT INTO location_rollup (district, visitors) VALUES (?, ?) "
+                "ON CONFLICT(district) DO UPDATE SET visitors = visitors + excluded.visitors",
+                [(district, visitors) for district in districts],
+            )
+
+    def dashboard(self, top_n: int = 8, trend_days: int = 30) -> Dict[str, Any]:
+        """Dashboard payload ({kpis, topLocations, topPlaces, trends}) from the rollups"""
+        conn = self.connection()
+        trips, visitors, visitor_days, revenue = conn.execute(
+            "SELECT COALESCE(SUM(trips), 0), COALESCE(SUM(visitors), 0), "
+            "COALESCE(SUM(visitor_days), 0), COALESCE(SUM(revenue), 0) FROM daily_rollup"
+        ).fetchone()
+
+        since = (date.today() - timedelta(days=trend_days - 1)).isoformat()
+        daily = dict(conn.execute(
+            "SELECT day, visitors FROM daily_rollup WHERE day >= ? ORDER BY day", (since,)
+        ).fetchall())
+        recent_visitor_days = conn.execute(
+            "SELECT COALESCE(SUM(visitor_days), 0) FROM daily_rollup WHERE day >= ?", (since,)
+        ).fetchone()[0]
+        occupancy = min(100.0, 100.0 * recent_visitor_days / (ANALYTICS_DAILY_CAPACITY * trend_days))
+
+        trends = []
+        for offset in range(trend_days):
+            day = (date.today() - timedelta(days=trend_days - 1 - offset)).isoformat()
+            trends.append({"date": day, "visitors": daily.get(day, 0)})
+
+        return {
+            "kpis": {
+                "totalVisitors": visitors,
+                "avgStay": visitor_days / visitors if visitors else 0,
+                "revenue": revenue,
+                "occupancy": occupancy,
+                "trips": trips,
+            },
+            "topLocations": [
+                {"name": name, "visitors": count} for name, count in conn.execute(
+                    "SELECT district, visitors FROM location_rollup ORDER BY visitors DESC LIMIT ?", (top_n,))
+            ],
+            "topPlaces": [
+                {"name": name, "visitors": count} for name, count in conn.execute(
+                    "SELECT name, visitors FROM place_rollup ORDER BY visitors DESC LIMIT ?", (top_n,))
+            ],
+            "trends": trends,
+        }
+
+    def counts_by_month_and_type(self) -> List[Dict[str, Any]]:
+        """Trips and visitors per (month, tourism type)"""
+        rows = self.connection().execute(
+            "SELECT month, tourism_type, trips, visitors FROM month_type_rollup ORDER BY month, tourism_type"
+        )
+        return [{"month": m, "tourism_type": t, "trips": n, "visitors": v} for m, t, n, v in rows]
+
+
+store = AnalyticsStore()
+
+
+# Trips waiting for the background writer: (preferences, itinerary, arrival time)
+_pending: "queue.Queue" = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _write_loop():
+    while True:
+        preferences, itinerary, ts = _pending.get()
+        try:
+            store.record_trip(preferences, itinerary, ts)
+        except Exception as e:
+            print(f"Analytics error: {e}")
+        finally:
+            _pending.task_done()
+
+
+def record_trip_later(preferences: Dict[str, Any], itinerary: str = ""):
+    """Queue a trip for ingestion; the rollups are updated by a background thread"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                _writer = threading.Thread(target=_write_loop, name="analytics-writer", daemon=True)
+                _writer.start()
+    _pending.put((dict(preferences), itinerary, time.time()))
+
+
+def flush(timeout: Optional[float] = None) -> bool:
+    """Wait until every queued trip is written; returns False on timeout"""
+    with _pending.all_tasks_done:
+        return _pending.all_tasks_done.wait_for(lambda: not _pending.unfinished_tasks, timeout)
@@ -0,0 +1,216 @@
+"""
+Pool of Ollama backends for agent generations
+
+OLLAMA_BACKENDS lists the inference servers (comma separated; defaults to
+OLLAMA_BASE_URL). Every generation is sent to one of them:
+
+- a backend whose circuit is open (see circuit_breaker) is ejected from the
+  pool until its health probe succeeds again;
+- among the rest, one that already has the model in memory is preferred, and
+  a session (X-Session-Id, else the client) stays on the backend it last
+  used for a model, so Ollama can reuse the prompt's KV cache;
+- either preference only holds while that backend has at most
+  BACKEND_AFFINITY_SLACK more calls outstanding than the least busy one;
+- otherwise the least busy backend wins: fewest outstanding calls
+  ("least_outstanding") or lowest latency EWMA scaled by outstanding calls
+  ("ewma"), as set by BACKEND_ROUTING.
+
+A background health check asks every backend which models it has loaded
+(GET /api/ps); failed checks count towards ejecting the backend even when it
+gets no traffic. scripts/stub_ollama.py runs local stand-in servers for
+trying this out without a GPU.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Sequence
+
+import requests
+
+from services.circuit_breaker import CircuitBreaker, LLMUnavailable
+
+OLLAMA_BACKENDS = [
+    url.strip().rstrip("/")
+    for url in os.getenv("OLLAMA_BACKENDS", os.getenv("OLLAMA_BASE_URL", "http://127.0.0.1:11434")).split(",")
+    if url.strip()
+]
+
+# "least_outstanding" or "ewma"
+BACKEND_ROUTING = os.getenv("BACKEND_ROUTING", "least_outstanding")
+
+# Weight of the newest latency sample in a backend's EWMA
+BACKEND_EWMA_ALPHA = float(os.getenv("BACKEND_EWMA_ALPHA", "0.3"))
+
+# How much busier than the least busy backend a warm or sticky backend may be and still be preferred
+BACKEND_AFFINITY_SLACK = int(os.getenv("BACKEND_AFFINITY_SLACK", "1"))
+
+BACKEND_HEALTH_INTERVAL_SECONDS = float(os.getenv("BACKEND_HEALTH_INTERVAL_SECONDS", "10"))
+
+HEALTH_PROBE_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_HEALTH_PROBE_TIMEOUT_SECONDS", "2"))
+
+# Sessions remembered for sticky routing (least recently used are forgotten first)
+MAX_SESSIONS = 10000
+
+
+def model_key(model: str) -> str:
+    """Ollama model name with its implicit ':latest' tag"""
+    return model if ":" in model else f"{model}:latest"
+
+
+class Backend:
+    """One Ollama server: its circuit, load and the models it has in memory"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.breaker = CircuitBreaker(url, self.probe)
+        self.outstanding = 0
+        self.ewma: Optional[float] = None
+        self.calls = 0
+        self.errors = 0
+        self.loaded_models = set()
+        self._clients = {}
+
+    def probe(self) -> bool:
+        """Health probe: True if the server answers its model listing"""
+        response = requests.get(f"{self.url}/api/tags", timeout=HEALTH_PROBE_TIMEOUT_SECONDS)
+        return response.status_code == 200
+
+    def refresh_loaded_models(self):
+        """Ask the server which models are currently in memory"""
+        response = requests.get(f"{self.url}/api/ps", timeout=HEALTH_PROBE_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        self.loaded_models = {model_key(model["name"]) for model in response.json().get("models", [])}
+
+    def client(self, model: str, timeout: Optional[float] = None, **options):
+        """Shared chat client for a model on this backend (a new one when a timeout is given)"""
+        from langchain_community.chat_models import ChatOllama
+        if timeout is not None:
+            return ChatOllama(model=model, base_url=self.url, timeout=timeout, **options)
+        if model not in self._clients:
+            self._clients[model] = ChatOllama(model=model, base_url=self.url, **options)
+        return self._clients[model]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "circuit": self.breaker.stats(),
+            "outstanding": self.outstanding,
+            "latency_ewma": round(self.ewma, 3) if self.ewma is not None else None,
+            "calls": self.calls,
+            "errors": self.errors,
+            "loaded_models": sorted(self.loaded_models),
+        }
+
+
+class BackendPool:
+    """Health-aware load balancing over a list of Ollama backends"""
+
+    def __init__(self, urls: List[str], routing: str = BACKEND_ROUTING):
+        if not urls:
+            raise ValueError("At least one Ollama backend is required")
+        self.backends = [Backend(url) for url in urls]
+        self.routing = routing if routing in ("least_outstanding", "ewma") else "least_outstanding"
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._health_checker = None
+
+    def is_down(self) -> bool:
+        """True when every backend's circuit is open"""
+        return all(backend.breaker.is_open() for backend in self.backends)
+
+    def _cost(self, backend: Backend) -> tuple:
+        if self.routing == "ewma":
+            return (backend.ewma or 0.0) * (backend.outstanding + 1), backend.outstanding
+        return backend.outstanding, backend.ewma or 0.0
+
+    def _ordered(self, model: str, session: Optional[str], exclude: Sequence[Backend]) -> List[Backend]:
+        """Candidate backends, best first"""
+        candidates = [b for b in self.backends if b not in exclude and not b.breaker.is_open()]
+        if not candidates:
+            return []
+        limit = min(b.outstanding for b in candidates) + BACKEND_AFFINITY_SLACK
+        sticky = self._sessions.get(f"{session}|{model}") if session else None
+        key = model_key(model)
+        return sorted(candidates, key=lambda b: (
+            not (b is sticky and b.outstanding <= limit),
+            not (key in b.loaded_models and b.outstanding <= limit),
+            self._cost(b),
+        ))
+
+    def acquire(self, model: str, session: Optional[str] = None, exclude: Sequence[Backend] = ()) -> Backend:
+        """Pick a backend for a generation and count it as outstanding there
+
+        Raises LLMUnavailable when no backend's circuit allows a call.
+        """
+        self.start_health_checks()
+        with self._lock:
+            ordered = self._ordered(model, session, exclude)
+        for backend in ordered:
+            if backend.breaker.allow():
+                with self._lock:
+                    backend.outstanding += 1
+                return backend
+        raise LLMUnavailable("No LLM backend is available (all circuits open)")
+
+    def succeeded(self, backend: Backend, model: str, session: Optional[str], latency: float):
+        backend.breaker.record_success()
+        with self._lock:
+            backend.outstanding -= 1
+            backend.calls += 1
+            backend.ewma = latency if backend.ewma is None else (
+                BACKEND_EWMA_ALPHA * latency + (1 - BACKEND_EWMA_ALPHA) * backend.ewma)
+            backend.loaded_models.add(model_key(model))
+            if session:
+                self._sessions[f"{session}|{model}"] = backend
+                self._sessions.move_to_end(f"{session}|{model}")
+                while len(self._sessions) > MAX_SESSIONS:
+                    self._sessions.popitem(last=False)
+
+    def failed(self, backend: Backend):
+        backend.breaker.record_failure()
+        with self._lock:
+            backend.outstanding -= 1
+            backend.calls += 1
+            backend.errors += 1
+
+    def released(self, backend: Backend):
+        """A call that ended without telling us anything about the backend (e.g. cancelled)"""
+        backend.breaker.release()
+        with self._lock:
+            backend.outstanding -= 1
+
+    def start_health_checks(self):
+        if self._health_checker is not None:
+            return
+        with self._lock:
+            if self._health_checker is None:
+                self._health_checker = threading.Thread(target=self._health_loop, name="backend-health", daemon=True)
+                self._health_checker.start()
+
+    def check_health(self):
+        """Refresh every live backend's loaded models; the outcome counts towards its circuit"""
+        for backend in self.backends:
+            # Ejected backends are watched by their circuit's own probe
+            if backend.breaker.is_open():
+                continue
+            try:
+                backend.refresh_loaded_models()
+            except Exception:
+                backend.breaker.record_failure()
+            else:
+                # Otherwise a failed probe every few hours would add up to an ejection
+                backend.breaker.record_healthy()
+
+    def _health_loop(self):
+        while True:
+            self.check_health()
+            time.sleep(BACKEND_HEALTH_INTERVAL_SECONDS)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "routing": self.routing,
+                "sessions": len(self._sessions),
+                "backends": [backend.stats() for backend in self.backends],
+            }
@@ -0,0 +1,292 @@
+"""
+Batch itinerary jobs for tour operators
+
+A batch is a list of preference sets. Identical preference sets (after
+normalization) are generated once and their result is fanned out to every
+index that asked for it. Progress lives in SQLite, so:
+
+- results can be streamed (NDJSON) while the batch runs, and a client that
+  disconnects can resume from the last cursor it saw;
+- worker threads in every server process claim pending items from the same
+  database, bounded by BATCH_MAX_PARALLEL per process;
+- items left running by a process that died are picked up again on restart.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Callable, Dict, List, Optional, Any
+
+from services import response_cache
+
+BATCH_DB_PATH = os.getenv("BATCH_DB_PATH", os.path.join("var", "batch_jobs.db"))
+BATCH_MAX_PARALLEL = int(os.getenv("BATCH_MAX_PARALLEL", "2"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "200"))
+# Finished batches are deleted after this long
+BATCH_RETENTION_SECONDS = int(os.getenv("BATCH_RETENTION_SECONDS", str(7 * 86400)))
+
+STREAM_POLL_SECONDS = 0.5
+IDLE_POLL_SECONDS = 2.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    total INTEGER NOT NULL,
+    unique_count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batch_items (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    item_key TEXT NOT NULL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE TABLE IF NOT EXISTS batch_results (
+    job_id TEXT NOT NULL,
+    item_key TEXT NOT NULL,
+    preferences TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    owner TEXT,
+    result TEXT,
+    error TEXT,
+    completed_seq INTEGER,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (job_id, item_key)
+);
+CREATE INDEX IF NOT EXISTS batch_results_status ON batch_results (status, updated_at);
+CREATE INDEX IF NOT EXISTS batch_results_seq ON batch_results (job_id, completed_seq);
+"""
+
+
+def owner_id() -> str:
+    return str(os.getpid())
+
+
+def process_alive(pid: str) -> bool:
+    try:
+        os.kill(int(pid), 0)
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+class BatchStore:
+    """SQLite-backed batch jobs, shared by all server workers"""
+
+    def __init__(self, db_path: str = BATCH_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        """Per-thread, per-process connection (WAL mode so readers never block the writer)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def create(self, preferences_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Store a new batch, deduplicating identical preference sets"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        keys = [response_cache.cache_key("itinerary", prefs) for prefs in preferences_list]
+        unique = {}
+        for key, prefs in zip(keys, preferences_list):
+            unique.setdefault(key, prefs)
+
+        conn = self.connection()
+        with conn:
+            self._purge(conn, now)
+            conn.execute("INSERT INTO batch_jobs (id, created_at, total, unique_count) VALUES (?, ?, ?, ?)",
+                         (job_id, now, len(keys), len(unique)))
+            conn.executemany("INSERT INTO batch_items (job_id, idx, item_key) VALUES (?, ?, ?)",
+                             [(job_id, idx, key) for idx, key in enumerate(keys)])
+            conn.executemany(
+                "INSERT INTO batch_results (job_id, item_key, preferences, updated_at) VALUES (?, ?, ?, ?)",
+                [(job_id, key, json.dumps(prefs, ensure_ascii=False), now) for key, prefs in unique.items()],
+            )
+        return {"job_id": job_id, "total": len(keys), "unique": len(unique)}
+
+    def _purge(self, conn: sqlite3.Connection, now: float):
+        expired = [row[0] for row in conn.execute(
+            "SELECT id FROM batch_jobs WHERE created_at < ?", (now - BATCH_RETENTION_SECONDS,))]
+        for table, column in [("batch_results", "job_id"), ("batch_items", "job_id"), ("batch_jobs", "id")]:
+            conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(job_id,) for job_id in expired])
+
+    def recover(self):
+        """Return items claimed by processes that no longer exist to the queue"""
+        conn = self.connection()
+        owners = [row[0] for row in conn.execute(
+            "SELECT DISTINCT owner FROM batch_results WHERE status = 'running'")]
+        dead = [owner for owner in owners if not process_alive(owner)]
+        with conn:
+            conn.executemany("UPDATE batch_results SET status = 'pending', owner = NULL WHERE status = 'running' "
+                             "AND owner = ?", [(owner,) for owner in dead])
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically claim the oldest pending item for this process"""
+        conn = self.connection()
+        with conn:
+            row = conn.execute(
+                "UPDATE batch_results SET status = 'running', owner = ?, updated_at = ? "
+                "WHERE rowid = (SELECT rowid FROM batch_results WHERE status = 'pending' "
+                "ORDER BY updated_at LIMIT 1) RETURNING job_id, item_key, preferences",
+                (owner_id(), time.time()),
+            ).fetchone()
+        if row is None:
+            return None
+        return {"job_id": row[0], "item_key": row[1], "preferences": json.loads(row[2])}
+
+    def complete(self, job_id: str, item_key: str, result: Optional[Dict[str, Any]], error: Optional[str] = None):
+        conn = self.connection()
+        with conn:
+            # Take the write lock before reading the sequence so cursors are never reused
+            conn.execute("BEGIN IMMEDIATE")
+            seq = conn.execute("SELECT COALESCE(MAX(completed_seq), 0) + 1 FROM batch_results "
+                               "WHERE job_id = ?", (job_id,)).fetchone()[0]
+            conn.execute(
+                "UPDATE batch_results SET status = ?, result = ?, error = ?, completed_seq = ?, updated_at = ? "
+                "WHERE job_id = ? AND item_key = ?",
+                ("failed" if error else "done", json.dumps(result, ensure_ascii=False) if result else None,
+                 error, seq, time.time(), job_id, item_key),
+            )
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        conn = self.connection()
+        job = conn.execute("SELECT created_at, total, unique_count FROM batch_jobs WHERE id = ?",
+                           (job_id,)).fetchone()
+        if job is None:
+            return None
+        counts = dict(conn.execute(
+            "SELECT status, COUNT(*) FROM batch_results WHERE job_id = ? GROUP BY status", (job_id,)))
+        finished = counts.get("done", 0) + counts.get("failed", 0)
+        return {
+            "job_id": job_id,
+            "created_at": job[0],
+            "total": job[1],
+            "unique": job[2],
+            "pending": counts.get("pending", 0),
+            "running": counts.get("running", 0),
+            "done": counts.get("done", 0),
+            "failed": counts.get("failed", 0),
+            "status": "done" if finished == job[2] else "running",
+        }
+
+    def results_after(self, job_id: str, cursor: int) -> List[Dict[str, Any]]:
+        """Finished results (one per input index) with completion cursor greater than cursor"""
+        rows = self.connection().execute(
+            "SELECT r.completed_seq, i.idx, r.status, r.result, r.error FROM batch_results r "
+            "JOIN batch_items i ON i.job_id = r.job_id AND i.item_key = r.item_key "
+            "WHERE r.job_id = ? AND r.completed_seq > ? ORDER BY r.completed_seq, i.idx",
+            (job_id, cursor),
+        )
+        results = []
+        for seq, idx, status, result, error in rows:
+            line = {"cursor": seq, "index": idx, "status": status}
+            if result:
+                line["result"] = json.loads(result)
+            if error:
+                line["error"] = error
+            results.append(line)
+        return results
+
+
+class BatchRunner:
+    """Worker threads that generate pending batch items"""
+
+    def __init__(self, store: BatchStore, run_item: Callable[[Dict[str, Any]], Dict[str, Any]],
+                 parallel: int = BATCH_MAX_PARALLEL):
+        self.store = store
+        self.run_item = run_item
+        self.parallel = max(1, parallel)
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self.store.recover()
+        for i in range(self.parallel):
+            thread = threading.Thread(target=self._work, name=f"batch-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self):
+        """Wake idle workers after new items were queued"""
+        self._wake.set()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake.set()
+
+    def _work(self):
+        while not self._stop_event.is_set():
+            try:
+                item = self.store.claim()
+            except sqlite3.Error as e:
+                print(f"Batch worker error: {e}")
+                item = None
+            if item is None:
+                self._wake.wait(IDLE_POLL_SECONDS)
+                self._wake.clear()
+                continue
+            self.process(item)
+
+    def process(self, item: Dict[str, Any]):
+        try:
+            result = self.run_item(item["preferences"])
+        except Exception as e:
+            result = {"warning": str(e)}
+        if result.get("itinerary"):
+            self.store.complete(item["job_id"], item["item_key"], result)
+        else:
+            self.store.complete(item["job_id"], item["item_key"], None, result.get("warning") or "Empty itinerary")
+
+
+async def stream_results(job_id: str, cursor: int = 0) -> AsyncIterator[str]:
+    """NDJSON lines for a batch: each finished index, then a final status line"""
+    while True:
+        # Read the status first: if it says done, the results query below sees every item
+        status = await asyncio.to_thread(store.status, job_id)
+        lines = await asyncio.to_thread(store.results_after, job_id, cursor)
+        for line in lines:
+            cursor = line["cursor"]
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+        if status is None or status["status"] == "done":
+            yield json.dumps({**(status or {"job_id": job_id, "status": "missing"}), "cursor": cursor}) + "\n"
+            return
+        if not lines:
+            await asyncio.sleep(STREAM_POLL_SECONDS)
+
+
+store = BatchStore()
+runner = None
+
+
+def start(run_item: Callable[[Dict[str, Any]], Dict[str, Any]]) -> BatchRunner:
+    """Start this process's batch workers (once per process)"""
+    global runner
+    if runner is None:
+        runner = BatchRunner(store, run_item)
+        runner.start()
+    return runner
+
+
+def stop():
+    if runner is not None:
+        runner.stop()
+
+
+def submit(preferences_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Create a batch and wake the workers"""
+    job = store.create(preferences_list)
+    if runner is not None:
+        runner.notify()
+    return job
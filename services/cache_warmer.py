@@ -0,0 +1,171 @@
+"""
+Background cache warmer for popular trip bundles
+
+Mines the request log for the most requested (agent, preferences)
+combinations and pre-generates their outputs into the response cache while
+the LLM backend is idle. Entries are refreshed shortly before they expire,
+so peak-hour requests for popular trips become cache hits. A popular
+itinerary also warms the recommendation and weather endpoints for its
+destination, with the preferences those endpoints build
+(endpoint_preferences), since that is the key they look up.
+"""
+import os
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Any, Tuple
+
+from agents import (
+    generate_itinerary,
+    cultural_recommender,
+    food_culture_recommender,
+    recommend_activities,
+    weather_forecaster,
+)
+from services import endpoint_preferences, model_router, request_log, response_cache
+
+# Agents the warmer can pre-generate: name -> (agent function, output key)
+WARM_AGENTS = {
+    "itinerary": (generate_itinerary.generate_itinerary, "itinerary"),
+    "activities": (recommend_activities.recommend_activities, "activity_suggestions"),
+    "cultural": (cultural_recommender.cultural_recommender, "cultural_recommendations"),
+    "food_culture": (food_culture_recommender.food_culture_recommender, "food_culture_info"),
+    "weather": (weather_forecaster.weather_forecaster, "weather_forecast"),
+}
+
+# A popular itinerary also warms the follow-up endpoints for its destination
+BUNDLE_AGENTS = ["activities", "cultural", "food_culture", "weather"]
+
+
+def bundle(agent: str, preferences: Dict[str, Any]) -> List[Tuple[str, Dict[str, Any]]]:
+    """(agent, preferences) to warm for a popular combination"""
+    tasks = [(agent, preferences)]
+    if agent == "itinerary" and preferences.get("destination"):
+        tasks += [(name, endpoint_preferences.BY_AGENT[name](preferences["destination"])) for name in BUNDLE_AGENTS]
+    return tasks
+
+CACHE_WARMER_TOP_N = int(os.getenv("CACHE_WARMER_TOP_N", "20"))
+CACHE_WARMER_INTERVAL_SECONDS = int(os.getenv("CACHE_WARMER_INTERVAL_SECONDS", "300"))
+CACHE_WARMER_LOOKBACK_DAYS = int(os.getenv("CACHE_WARMER_LOOKBACK_DAYS", "14"))
+# Only warm after this long without live requests
+CACHE_WARMER_IDLE_SECONDS = int(os.getenv("CACHE_WARMER_IDLE_SECONDS", "60"))
+# Refresh entries that expire within this margin
+CACHE_WARMER_REFRESH_MARGIN_SECONDS = int(os.getenv("CACHE_WARMER_REFRESH_MARGIN_SECONDS", "1800"))
+# Pause between generations so live traffic can grab the backend
+CACHE_WARMER_PAUSE_SECONDS = float(os.getenv("CACHE_WARMER_PAUSE_SECONDS", "2"))
+
+
+def initial_state(preferences: Dict[str, Any]) -> Dict[str, Any]:
+    """Graph state for running an agent on a preference set"""
+    return {
+        "preferences_text": "",
+        "preferences": preferences,
+        "itinerary": "",
+        "activity_suggestions": "",
+        "useful_links": [],
+        "weather_forecast": "",
+        "packing_list": "",
+        "food_culture_info": "",
+        "safety_constraints": "",
+        "chat_history": [],
+        "user_question": "",
+        "chat_response": "",
+    }
+
+
+def top_combinations(top_n: int = CACHE_WARMER_TOP_N, lookback_days: int = CACHE_WARMER_LOOKBACK_DAYS,
+                     path: Optional[str] = None) -> List[Tuple[str, Dict[str, Any], int]]:
+    """Most requested (agent, preferences) combinations in the request log"""
+    since = time.time() - lookback_days * 86400
+    counts = Counter()
+    examples = {}
+    for record in request_log.read(path):
+        preferences = record.get("preferences")
+        if not preferences or record.get("ts", 0) < since:
+            continue
+        for agent in record.get("agents", {}):
+            if agent not in WARM_AGENTS:
+                continue
+            key = response_cache.cache_key(agent, preferences)
+            counts[key] += 1
+            examples[key] = (agent, preferences)
+    return [(*examples[key], count) for key, count in counts.most_common(top_n)]
+
+
+def has_spare_capacity() -> bool:
+    """True when the LLM backend is idle enough to spend a generation on warming"""
+    if response_cache.seconds_since_last_request() < CACHE_WARMER_IDLE_SECONDS:
+        return False
+    if model_router.router.pool.is_down():
+        return False
+    return model_router.router.in_flight() <= max(0, model_router.MAX_PARALLEL - 2)
+
+
+class CacheWarmer(threading.Thread):
+    """Daemon thread that keeps popular bundles warm in the response cache"""
+
+    def __init__(self):
+        super().__init__(name="cache-warmer", daemon=True)
+        self._stop_event = threading.Event()
+        self.warmed = 0
+
+    def plan(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Popular combinations that are missing from the cache or about to expire"""
+        tasks = []
+        seen = set()
+        for agent, preferences, _ in top_combinations():
+            for name, task_preferences in bundle(agent, preferences):
+                key = response_cache.cache_key(name, task_preferences)
+                if key in seen:
+                    continue
+                seen.add(key)
+                expires_in = response_cache.cache.expires_in(name, task_preferences)
+                if expires_in is None or expires_in < CACHE_WARMER_REFRESH_MARGIN_SECONDS:
+                    tasks.append((name, task_preferences))
+        return tasks
+
+    def warm(self, agent: str, preferences: Dict[str, Any]) -> bool:
+        """Generate one agent output into the cache"""
+        func, output_key = WARM_AGENTS[agent]
+        try:
+            result = func(initial_state(preferences))
+        except Exception as e:
+            print(f"Cache warmer error ({agent}): {e}")
+            return False
+        if result.get(output_key) and not result.get("warning") and not result.get("fallback"):
+            response_cache.cache.set(agent, preferences, result)
+            self.warmed += 1
+            return True
+        return False
+
+    def run_once(self):
+        for agent, preferences in self.plan():
+            # Yield to live traffic; the remaining tasks are retried next cycle
+            if self._stop_event.is_set() or not has_spare_capacity():
+                return
+            self.warm(agent, preferences)
+            self._stop_event.wait(CACHE_WARMER_PAUSE_SECONDS)
+
+    def run(self):
+        while not self._stop_event.wait(CACHE_WARMER_INTERVAL_SECONDS):
+            self.run_once()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+warmer = None
+
+
+def start() -> CacheWarmer:
+    """Start the background warmer (once per process)"""
+    global warmer
+    if warmer is None:
+        warmer = CacheWarmer()
+        warmer.start()
+    return warmer
+
+
+def stop():
+    if warmer is not None:
+        warmer.stop()
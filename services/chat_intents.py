@@ -0,0 +1,406 @@
+"""
+Intent classifier that answers factual chat questions from the datasets
+
+Many chat questions are lookups: "what is the entry fee for Hundru Falls",
+"do I need a permit for Betla", "which festivals are in November", "what is
+the police number". Sending them to the LLM costs a generation slot and
+seconds of latency for an answer the data already has. In front of the chat
+agent:
+
+- place, festival, month and season names are found with one regex each
+  and replaced by placeholders (<poi>, <festival>, <month>), so the model
+  learns "entry fee for <poi>" rather than one example per place;
+- a few high-precision rules (emergency numbers) decide outright;
+- otherwise a small multinomial logistic regression over unigram and bigram
+  features, trained at load time from data/chat_intents.json, picks the
+  intent;
+- an answer is rendered from the data only when the prediction is confident
+  (CHAT_INTENT_MIN_CONFIDENCE) and every slot the intent needs was found,
+  e.g. a place for "best_time" (a festival answer needs a festival name or
+  word, not just a month). Everything else, including long or open-ended
+  questions, still goes to the LLM.
+
+Classification and rendering take well under a millisecond, and results are
+memoised per question.
+"""
+import json
+import os
+import re
+import sys
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Any
+
+import numpy as np
+
+# Add data directory to path to import our data loader
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
+from data_loader import MONTHS, jharkhand_data
+from data_records import jharkhand_records
+
+from services import event_calendar
+
+INTENTS_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'chat_intents.json')
+
+# Answer factual questions from data; set CHAT_FAST_PATH=0 to send every question to the LLM
+CHAT_FAST_PATH = os.getenv("CHAT_FAST_PATH", "1") == "1"
+
+# Lowest predicted probability for which a question is answered from data
+CHAT_INTENT_MIN_CONFIDENCE = float(os.getenv("CHAT_INTENT_MIN_CONFIDENCE", "0.7"))
+
+# Longer questions are rarely simple lookups and always go to the LLM
+CHAT_INTENT_MAX_WORDS = 25
+
+OPEN_ENDED = "open_ended"
+
+# Slots an intent needs before it can be answered from data
+REQUIRED_SLOTS = {
+    "best_time": ("poi",),
+    "visit_info": ("poi",),
+}
+
+# Words dropped from POI names to get the short name people use ("Hundru Falls" -> "hundru")
+GENERIC_NAME_WORDS = {"falls", "national", "park", "dam", "temple", "tribal", "research", "institute", "museum", "&"}
+
+MONTH_ABBREVIATIONS = {month[:3]: month for month in MONTHS if month != "may"}
+MONTH_ABBREVIATIONS["sept"] = "september"
+
+# A month alone ("where can I stay in October") is not a festival question
+FESTIVAL_WORDS = re.compile(r"\b(festivals?|fairs?|melas?|jatras?|celebrat\w*|utsavs?)\b")
+
+EMERGENCY_RULE = re.compile(
+    r"\b(emergency|helpline|ambulance)\b|\b(police|forest department)\b.*\b(number|contact|call|dial|phone)\b")
+
+TRAINING_EPOCHS = 300
+LEARNING_RATE = 0.5
+L2_PENALTY = 1e-3
+
+
+def _alternation(names: List[str]) -> str:
+    # Longest first, so "betla national park" wins over "betla"
+    return "|".join(re.escape(name) for name in sorted(set(names), key=len, reverse=True))
+
+
+class Entities:
+    """Regexes that find POI, festival, month and season names in a question"""
+
+    def __init__(self):
+        self.poi_aliases: Dict[str, str] = {}
+        for poi in jharkhand_data.load_pois().get('pois', []):
+            name = poi['name'].lower()
+            district = (poi.get('district') or "").lower()
+            aliases = {name, poi['id'].replace("_", " ")}
+            aliases.update(part.strip() for part in name.split(","))
+            aliases.add(" ".join(word for word in poi['id'].split("_") if word != district))
+            core = " ".join(word for word in name.split(",")[0].split() if word not in GENERIC_NAME_WORDS)
+            aliases.add(core)
+            for alias in aliases:
+                # Skip names made only of generic words ("temple", "national park")
+                if len(alias) >= 4 and not set(alias.split()) <= GENERIC_NAME_WORDS:
+                    self.poi_aliases.setdefault(alias, poi['id'])
+
+        self.festival_aliases: Dict[str, str] = {}
+        for festival in jharkhand_data.load_tribal_culture().get('cultural_festivals', []):
+            name = festival['name'].lower()
+            self.festival_aliases[name] = festival['name']
+            self.festival_aliases[name.split()[0]] = festival['name']
+
+        # Permit rules for places that are not POIs ("village visits", "Dalma wildlife sanctuary")
+        self.permit_aliases: Dict[str, Tuple[str, str]] = {}
+        permits = jharkhand_data.load_safety_constraints().get('permit_requirements', {})
+        for group, places in permits.items():
+            for key in places:
+                words = key.split("_")
+                aliases = {" ".join(words), words[0]}
+                if len(words) > 2:
+                    aliases.add(" ".join(words[1:]))
+                for alias in aliases:
+                    if not set(alias.split()) <= GENERIC_NAME_WORDS:
+                        self.permit_aliases.setdefault(alias, (group, key))
+
+        self.seasons: Dict[str, List[str]] = {}
+        for month in MONTHS:
+            season = jharkhand_data.get_season_for_month(month)
+            if season:
+                self.seasons.setdefault(season.replace("_", " "), []).append(month)
+                self.seasons.setdefault(season.replace("_", "-"), []).append(month)
+
+        self.poi_pattern = re.compile(rf"\b({_alternation(list(self.poi_aliases))})\b")
+        self.permit_pattern = re.compile(rf"\b({_alternation(list(self.permit_aliases))})s?\b")
+        self.festival_pattern = re.compile(rf"\b({_alternation(list(self.festival_aliases))})\b")
+        # "may" is only a month after a preposition ("in May"), not in "may I"
+        months = [month for month in MONTHS if month != "may"] + list(MONTH_ABBREVIATIONS)
+        self.month_pattern = re.compile(
+            rf"\b({_alternation(months + list(self.seasons))})\b|\b(?:in|during|of|this|next|by)\s+(may)\b")
+
+    def extract(self, text: str) -> Tuple[str, Dict[str, Any]]:
+        """Question text with entities replaced by placeholders, and the entities found"""
+        slots: Dict[str, Any] = {}
+
+        def poi(match):
+            slots.setdefault("poi", self.poi_aliases[match.group(1)])
+            return " <poi> "
+
+        def festival(match):
+            slots.setdefault("festival", self.festival_aliases[match.group(1)])
+            return " <festival> "
+
+        def month(match):
+            word = match.group(1) or match.group(2)
+            months = self.seasons.get(word) or [MONTH_ABBREVIATIONS.get(word, word)]
+            slots.setdefault("months", [])
+            slots["months"].extend(m for m in months if m not in slots["months"])
+            return match.group(0).replace(word, " <month> ")
+
+        text = self.poi_pattern.sub(poi, text)
+        permit = self.permit_pattern.search(text)
+        if permit:
+            slots["permit"] = self.permit_aliases[permit.group(1)]
+        text = self.festival_pattern.sub(festival, text)
+        text = self.month_pattern.sub(month, text)
+        return text, slots
+
+
+def tokens(text: str) -> List[str]:
+    return re.findall(r"<[a-z]+>|[a-z0-9]+", text)
+
+
+def features(words: List[str]) -> List[str]:
+    """Unigram and bigram features, with sentence boundaries"""
+    padded = ["<s>"] + words + ["</s>"]
+    return words + [f"{a} {b}" for a, b in zip(padded, padded[1:])]
+
+
+class IntentModel:
+    """Multinomial logistic regression over sparse n-gram features"""
+
+    def __init__(self, examples: Dict[str, List[str]], entities: Entities):
+        self.intents = list(examples)
+        samples = [(entities.extract(normalize(text))[0], label)
+                   for label, texts in examples.items() for text in texts]
+        self.vocabulary: Dict[str, int] = {}
+        for text, _ in samples:
+            for feature in features(tokens(text)):
+                self.vocabulary.setdefault(feature, len(self.vocabulary))
+
+        x = np.zeros((len(samples), len(self.vocabulary)))
+        y = np.zeros((len(samples), len(self.intents)))
+        for row, (text, label) in enumerate(samples):
+            x[row, self.indices(text)] = 1.0
+            y[row, self.intents.index(label)] = 1.0
+
+        # Full-batch gradient descent; the training set is a few dozen sentences
+        self.weights = np.zeros((len(self.vocabulary), len(self.intents)))
+        self.bias = np.zeros(len(self.intents))
+        for _ in range(TRAINING_EPOCHS):
+            error = softmax(x @ self.weights + self.bias) - y
+            self.weights -= LEARNING_RATE * (x.T @ error / len(samples) + L2_PENALTY * self.weights)
+            self.bias -= LEARNING_RATE * error.mean(axis=0)
+
+    def indices(self, text: str) -> List[int]:
+        return sorted({self.vocabulary[f] for f in features(tokens(text)) if f in self.vocabulary})
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """Most likely intent and its probability"""
+        scores = self.weights[self.indices(text)].sum(axis=0) + self.bias
+        probabilities = softmax(scores)
+        best = int(np.argmax(probabilities))
+        return self.intents[best], float(probabilities[best])
+
+
+def softmax(scores: np.ndarray) -> np.ndarray:
+    exp = np.exp(scores - scores.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def normalize(question: str) -> str:
+    return " ".join(re.sub(r"[^\w&<>\s-]", " ", (question or "").lower()).split())
+
+
+@dataclass(frozen=True)
+class IntentMatch:
+    intent: str
+    confidence: float
+    answer: Optional[str] = None
+    source: str = "model"
+
+    @property
+    def answered(self) -> bool:
+        return self.answer is not None
+
+
+class IntentClassifier:
+    """Entity extraction, rules and the intent model, built once"""
+
+    def __init__(self):
+        with open(INTENTS_PATH, 'r', encoding='utf-8') as f:
+            examples = json.load(f)['intents']
+        self.entities = Entities()
+        self.model = IntentModel(examples, self.entities)
+
+    def classify(self, question: str, destination: str = "", month: str = "") -> IntentMatch:
+        text = normalize(question)
+        if not text or len(text.split()) > CHAT_INTENT_MAX_WORDS:
+            return IntentMatch(OPEN_ENDED, 1.0, source="rule")
+
+        placeholders, slots = self.entities.extract(text)
+        if EMERGENCY_RULE.search(text):
+            intent, confidence, source = "emergency", 1.0, "rule"
+        else:
+            intent, confidence = self.model.predict(placeholders)
+            source = "model"
+        if intent == OPEN_ENDED or confidence < CHAT_INTENT_MIN_CONFIDENCE:
+            return IntentMatch(intent, round(confidence, 3), source=source)
+
+        # The trip's own destination and month fill slots the question leaves out
+        if "poi" not in slots and destination:
+            _, context = self.entities.extract(normalize(destination))
+            if "poi" in context:
+                slots["poi"] = context["poi"]
+        if intent == "festivals" and "months" not in slots and "festival" not in slots and month:
+            if month.lower() in MONTHS:
+                slots["months"] = [month.lower()]
+        if any(slot not in slots for slot in REQUIRED_SLOTS.get(intent, ())):
+            return IntentMatch(intent, round(confidence, 3), source=source)
+        if intent == "festivals" and "festival" not in slots and not FESTIVAL_WORDS.search(text):
+            return IntentMatch(intent, round(confidence, 3), source=source)
+
+        answer = ANSWERS[intent](slots)
+        return IntentMatch(intent, round(confidence, 3), answer, source)
+
+
+def month_list(months) -> str:
+    """Month names as ranges: "October to March, May" """
+    ranges = event_calendar.month_ranges([month.lower() for month in months])
+    parts = []
+    for first, last in ranges:
+        first_name, last_name = MONTHS[first - 1].capitalize(), MONTHS[last - 1].capitalize()
+        parts.append(first_name if first == last else f"{first_name} to {last_name}")
+    return ", ".join(parts)
+
+
+def _poi(poi_id: str) -> Dict[str, Any]:
+    return jharkhand_data.get_poi_by_id(poi_id) or {}
+
+
+def answer_emergency(slots: Dict[str, Any]) -> str:
+    contacts = jharkhand_data.get_emergency_contacts()
+    lines = [f"- {name.replace('_', ' ').capitalize()}: {number}" for name, number in contacts.items()]
+    return "Emergency contacts in Jharkhand:\n" + "\n".join(lines)
+
+
+def _permit_text(place: str, permit: Dict[str, Any]) -> str:
+    if not permit.get('permit_required'):
+        text = f"No permit is needed for {place}."
+        if permit.get('booking_method') and permit['booking_method'] != "N/A":
+            text += f" {permit['booking_method']}."
+    else:
+        text = (f"{place} needs an {permit.get('permit_type', 'entry permit').lower()} "
+                f"({permit.get('cost', 'fee varies')}, valid {permit.get('validity', '1 day')}). "
+                f"Booking: {permit.get('booking_method', 'Forest Department office')} "
+                f"(advance: {permit.get('booking_advance', 'not required')}).")
+    if permit.get('restrictions'):
+        text += " Rules: " + "; ".join(permit['restrictions']) + "."
+    if permit.get('safety_requirements'):
+        text += " Safety: " + "; ".join(permit['safety_requirements']) + "."
+    return text
+
+
+def answer_permit(slots: Dict[str, Any]) -> str:
+    requirements = jharkhand_data.load_safety_constraints().get('permit_requirements', {})
+    if "poi" in slots:
+        poi = _poi(slots["poi"])
+        for group in requirements.values():
+            if slots["poi"] in group:
+                return _permit_text(poi.get('name', slots["poi"]), group[slots["poi"]])
+        if not poi.get('permit_required'):
+            fee = poi.get('entry_fee') or 0
+            return f"No permit is needed for {poi.get('name')}" + (f"; the entry fee is ₹{fee}." if fee else ".")
+    if "permit" in slots:
+        group, key = slots["permit"]
+        return _permit_text(key.replace('_', ' ').title(), requirements[group][key])
+    # No specific place: every permit rule in the data
+    return "\n".join(
+        f"- {_permit_text(key.replace('_', ' ').title(), permit)}"
+        for group in requirements.values() for key, permit in group.items())
+
+
+def answer_best_time(slots: Dict[str, Any]) -> str:
+    poi = _poi(slots["poi"])
+    name = poi.get('name', slots["poi"])
+    best, avoid = poi.get('best_season') or [], poi.get('avoid_season') or []
+    if slots.get("months"):
+        months = slots["months"]
+        asked = month_list(months)
+        if all(month in best for month in months):
+            verdict = f"Yes, {asked} is a good time to visit {name}."
+        elif any(month in avoid for month in months):
+            verdict = f"{name} is best avoided in {month_list([m for m in months if m in avoid])}."
+        else:
+            verdict = f"{name} can be visited in {asked}, but it is not the peak season."
+        return verdict + (f" The best months are {month_list(best)}." if best else "")
+    text = f"The best time to visit {name} is {month_list(best)}." if best else f"{name} can be visited all year."
+    if avoid:
+        text += f" Avoid {month_list(avoid)}."
+    return text
+
+
+def answer_festivals(slots: Dict[str, Any]) -> str:
+    if "festival" in slots:
+        for festival in jharkhand_data.load_tribal_culture().get('cultural_festivals', []):
+            if festival['name'] == slots["festival"]:
+                locations = ", ".join(festival.get('best_locations', []))
+                return (f"{festival['name']} is celebrated in {festival.get('month')} "
+                        f"for {festival.get('duration', 'several days')}"
+                        + (f", best seen in {locations}" if locations else "")
+                        + f". {festival.get('description', '')}.")
+    if slots.get("months"):
+        found = {festival.name: festival for month in slots["months"]
+                 for festival in jharkhand_records.festivals_by_month(month)}
+        if not found:
+            return f"There are no major tribal festivals in our data for {month_list(slots['months'])}."
+        return "\n".join(f"- {f.name} ({f.month}): {f.description}" for f in found.values())
+    festivals = jharkhand_data.load_tribal_culture().get('cultural_festivals', [])
+    return "Major tribal festivals of Jharkhand:\n" + "\n".join(
+        f"- {f['name']} ({f.get('month')}): {f.get('description', '')}" for f in festivals)
+
+
+def answer_visit_info(slots: Dict[str, Any]) -> str:
+    poi = _poi(slots["poi"])
+    fee = poi.get('entry_fee') or 0
+    text = (f"{poi.get('name')} is open {poi.get('opening_hours', 'daily')}. "
+            + (f"Entry fee: ₹{fee} per person." if fee else "Entry is free."))
+    if poi.get('permit_required'):
+        text += " A permit is also required; ask me about the permit for details."
+    return text
+
+
+ANSWERS = {
+    "emergency": answer_emergency,
+    "permit": answer_permit,
+    "best_time": answer_best_time,
+    "festivals": answer_festivals,
+    "visit_info": answer_visit_info,
+}
+
+
+_classifier = None
+_classifier_lock = threading.Lock()
+
+
+def classifier() -> IntentClassifier:
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                _classifier = IntentClassifier()
+    return _classifier
+
+
+@lru_cache(maxsize=4096)
+def match(question: str, destination: str = "", month: str = "") -> IntentMatch:
+    """Intent of a chat question, with an answer from data when it is a confident factual lookup"""
+    if not CHAT_FAST_PATH:
+        return IntentMatch(OPEN_ENDED, 0.0, source="disabled")
+    return classifier().classify(question, destination or "", month or "")
@@ -0,0 +1,121 @@
+"""
+Circuit breaker for the LLM backend
+
+After a run of consecutive failures the breaker opens and calls fail
+immediately with LLMUnavailable instead of each waiting out a connection
+timeout. While open, a background thread probes the backend's health; once a
+probe succeeds a single trial call is let through (half-open), and its
+outcome closes or re-opens the breaker.
+"""
+import os
+import threading
+import time
+from typing import Callable, Dict, Any
+
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "3"))
+CIRCUIT_PROBE_INTERVAL_SECONDS = float(os.getenv("CIRCUIT_PROBE_INTERVAL_SECONDS", "5"))
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class LLMUnavailable(Exception):
+    """Raised instead of calling the LLM backend while its circuit is open"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a background health probe"""
+
+    def __init__(self, name: str, probe: Callable[[], bool],
+                 failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 probe_interval: float = CIRCUIT_PROBE_INTERVAL_SECONDS):
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = max(1, failure_threshold)
+        self.probe_interval = probe_interval
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._prober = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Whether a call may go to the backend now"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def check(self):
+        """Raise LLMUnavailable if the circuit does not allow a call"""
+        if not self.allow():
+            raise LLMUnavailable(f"LLM backend {self.name} is unavailable (circuit open)")
+
+    def is_open(self) -> bool:
+        return self.state == OPEN
+
+    def record_success(self):
+        with self._lock:
+            self.state = CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+                self._open()
+
+    def record_healthy(self):
+        """A health check passed: failures so far were not consecutive
+
+        An open or half-open circuit is left to its probe and trial call.
+        """
+        with self._lock:
+            if self.state == CLOSED:
+                self.failures = 0
+
+    def release(self):
+        """Forget a trial call that ended without telling us anything (e.g. cancelled)"""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _open(self):
+        if self.state != OPEN:
+            self.state = OPEN
+            self.opened_at = time.time()
+        if self._prober is None or not self._prober.is_alive():
+            self._prober = threading.Thread(target=self._probe_loop, name=f"circuit-probe-{self.name}", daemon=True)
+            self._prober.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            try:
+                healthy = self.probe()
+            except Exception:
+                healthy = False
+            with self._lock:
+                if self.state != OPEN:
+                    return
+                if healthy:
+                    self.state = HALF_OPEN
+                    return
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.failures,
+                "open_for_seconds": round(time.time() - self.opened_at, 1) if self.opened_at else 0.0,
+                "rejected": self.rejected,
+            }
@@ -0,0 +1,149 @@
+"""
+Offline weather climatology for trip planning
+
+Forecasts for a trip weeks away cannot come from a live weather API, and
+the demo data it used to fall back to ignored both the city and the travel
+month. This engine answers from monthly normals instead:
+
+- data/climatology.json holds normals (max/min temperature, rainfall,
+  humidity) for stations across Jharkhand;
+- values for any other place are interpolated by inverse distance weighting
+  over the nearest stations, using district and POI coordinates;
+- seasonal_constraints.json adds the qualitative conditions of the season.
+
+Every district and POI is interpolated once at load time, so an outlook is
+a dict lookup (and memoised per location and month). Live API data is only
+blended in by the weather agent when the trip is close enough for it to
+matter.
+"""
+import calendar
+import json
+import math
+import os
+import sys
+import threading
+from functools import lru_cache
+from typing import Dict, Optional, Tuple, Any
+
+import numpy as np
+
+# Add data directory to path to import our data loader
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
+from data_loader import MONTHS, jharkhand_data
+
+from services import event_calendar
+
+CLIMATOLOGY_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'climatology.json')
+FIELDS = ("t_max_c", "t_min_c", "rainfall_mm", "humidity_pct")
+# Interpolate from this many nearest stations, weighted by 1 / distance ** IDW_POWER
+IDW_NEIGHBOURS = 4
+IDW_POWER = 2.0
+DEFAULT_LOCATION = "Ranchi"
+EARTH_RADIUS_KM = 6371.0
+
+
+class Climatology:
+    """Station normals with inverse-distance interpolation"""
+
+    def __init__(self, stations: Dict[str, Dict[str, Any]]):
+        self.names = list(stations)
+        self.coordinates = np.radians([[s['latitude'], s['longitude']] for s in stations.values()])
+        # (stations, months, fields)
+        self.normals = np.array([[s[field] for field in FIELDS] for s in stations.values()],
+                                dtype=np.float64).transpose(0, 2, 1)
+        self._places: Dict[str, Tuple[np.ndarray, str, float]] = {}
+        for name, (lat, lon) in event_calendar.place_coordinates().items():
+            self._places[name] = self.interpolate(lat, lon)
+
+    def distances_km(self, lat: float, lon: float) -> np.ndarray:
+        lat, lon = math.radians(lat), math.radians(lon)
+        a = (np.sin((self.coordinates[:, 0] - lat) / 2) ** 2
+             + math.cos(lat) * np.cos(self.coordinates[:, 0]) * np.sin((self.coordinates[:, 1] - lon) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+    def interpolate(self, lat: float, lon: float) -> Tuple[np.ndarray, str, float]:
+        """(12, fields) normals at a point, plus the nearest station and its distance"""
+        distances = self.distances_km(lat, lon)
+        nearest = int(np.argmin(distances))
+        if distances[nearest] < 1.0:
+            return self.normals[nearest], self.names[nearest], float(distances[nearest])
+        neighbours = np.argsort(distances)[:IDW_NEIGHBOURS]
+        weights = 1.0 / distances[neighbours] ** IDW_POWER
+        values = np.tensordot(weights / weights.sum(), self.normals[neighbours], axes=1)
+        return values, self.names[nearest], float(distances[nearest])
+
+    def at_place(self, location: str) -> Optional[Tuple[np.ndarray, str, float]]:
+        """Normals for a district or POI named in a location string"""
+        location = (location or "").lower().strip()
+        if location in self._places:
+            return self._places[location]
+        coordinates = event_calendar.resolve_location(location)
+        if coordinates is None:
+            return None
+        return self.interpolate(*coordinates)
+
+
+_climatology = None
+_climatology_lock = threading.Lock()
+
+
+def climatology() -> Climatology:
+    global _climatology
+    if _climatology is None:
+        with _climatology_lock:
+            if _climatology is None:
+                with open(CLIMATOLOGY_PATH, 'r', encoding='utf-8') as f:
+                    _climatology = Climatology(json.load(f)['stations'])
+    return _climatology
+
+
+def season_conditions(month: str) -> Tuple[str, Dict[str, Any]]:
+    season = jharkhand_data.get_season_for_month(month) or ""
+    seasons = jharkhand_data.load_seasonal_constraints().get('seasons', {})
+    return season, seasons.get(season, {}).get('weather_conditions', {})
+
+
+@lru_cache(maxsize=4096)
+def outlook(location: str, month: str) -> Dict[str, Any]:
+    """Climate normals for a place and month (shared between callers; do not modify)
+
+    Unknown places fall back to Ranchi.
+    """
+    month = month.lower() if month and month.lower() in MONTHS else 'october'
+    engine = climatology()
+    place = engine.at_place(location)
+    resolved = place is not None
+    if place is None:
+        place = engine.at_place(DEFAULT_LOCATION)
+    values, station, distance = place
+    t_max, t_min, rainfall, humidity = values[MONTHS.index(month)]
+    season, conditions = season_conditions(month)
+    return {
+        "location": location if resolved else f"{DEFAULT_LOCATION} (default)",
+        "month": calendar.month_name[MONTHS.index(month) + 1],
+        "season": season,
+        "source": "climatology",
+        "temperature_c": {"max": round(float(t_max), 1), "min": round(float(t_min), 1)},
+        "rainfall_mm": round(float(rainfall)),
+        "humidity_pct": round(float(humidity)),
+        "nearest_station": station,
+        "nearest_station_km": round(distance, 1),
+        "conditions": conditions,
+    }
+
+
+def coordinates(location: str) -> Tuple[float, float]:
+    """Coordinates for a live weather lookup (Ranchi when the place is unknown)"""
+    return (event_calendar.resolve_location(location)
+            or event_calendar.resolve_location(DEFAULT_LOCATION))
+
+
+def blend(normals: Dict[str, Any], live: Dict[str, Any]) -> Dict[str, Any]:
+    """Normals with live observations added, and how far today deviates from the normal"""
+    blended = {**normals, "source": "climatology+live", "current": live.get("current", {}),
+               "forecast": live.get("forecast", [])}
+    current = live.get("current", {}).get("temperature")
+    if current is not None:
+        mean = (normals["temperature_c"]["max"] + normals["temperature_c"]["min"]) / 2
+        blended["anomaly_c"] = round(current - mean, 1)
+    return blended
@@ -0,0 +1,71 @@
+"""
+Preference sets the single-agent API endpoints build from their request
+
+/api/culture_recommendations, /api/food_recommendations,
+/api/activities_recommendations and /api/weather_forecast take a place (and
+for weather a date), not a full trip, and fill in the other preferences with
+fixed defaults. Those preferences are the response cache key, so the cache
+warmer builds them here the same way to pre-generate entries those endpoints
+will actually look up.
+"""
+from datetime import date
+from typing import Callable, Dict, Optional, Any
+
+from services import event_calendar
+
+DEFAULT_MONTH = "October"
+DEFAULT_BUDGET_RANGE = "Mid-Range (₹1500-3000/day)"
+DEFAULT_MOBILITY = "Moderate (Light walking)"
+
+
+def cultural(destination: str) -> Dict[str, Any]:
+    return {
+        "destination": destination,
+        "month": DEFAULT_MONTH,
+        "tribal_interest": "Medium",
+        "mobility_level": DEFAULT_MOBILITY,
+        "budget_range": DEFAULT_BUDGET_RANGE,
+        "special_interests": [],
+    }
+
+
+def food_culture(destination: str) -> Dict[str, Any]:
+    return {
+        "destination": destination,
+        "month": DEFAULT_MONTH,
+        "budget_range": DEFAULT_BUDGET_RANGE,
+        "tribal_interest": "Medium",
+        "special_interests": ["Local cuisine & cooking"],
+    }
+
+
+def activities(destination: str) -> Dict[str, Any]:
+    return {
+        "destination": destination,
+        "month": DEFAULT_MONTH,
+        "tourism_type": "Mixed Experience",
+        "tribal_interest": "Medium",
+        "mobility_level": DEFAULT_MOBILITY,
+        "budget_range": DEFAULT_BUDGET_RANGE,
+        "special_interests": [],
+    }
+
+
+def weather(location: str, travel_date: Optional[date] = None) -> Dict[str, Any]:
+    """The month comes from the travel date, else the default month"""
+    return {
+        "destination": location,
+        "month": event_calendar.month_name(travel_date) if travel_date else DEFAULT_MONTH,
+        "start_date": travel_date.isoformat() if travel_date else None,
+        "tourism_type": "Mixed Experience",
+        "mobility_level": DEFAULT_MOBILITY,
+    }
+
+
+# Response cache agent name -> preferences its endpoint requests for a destination
+BY_AGENT: Dict[str, Callable[[str], Dict[str, Any]]] = {
+    "cultural": cultural,
+    "food_culture": food_culture,
+    "activities": activities,
+    "weather": weather,
+}
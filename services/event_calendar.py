@@ -0,0 +1,283 @@
+"""
+Calendar of festivals, workshops and attraction opening times
+
+The data describes timing as free text ("August-September", "October to
+March", "6:00 AM - 6:00 PM (Closed on Mondays)"). Here it is normalised
+into yearly date ranges and daily time windows, expanded into dated
+occurrences and stored in an interval tree, so "what is on between date A
+and B near X" is a tree lookup plus a distance check instead of a scan of
+every record with string matching.
+"""
+import calendar
+import math
+import os
+import re
+import sys
+import threading
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple, Any
+
+# Add data directory to path to import our data loader
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
+from data_loader import MONTHS, jharkhand_data, month_span
+
+EVENT_KINDS = ("festival", "workshop", "attraction")
+DEFAULT_RADIUS_KM = float(os.getenv("EVENT_RADIUS_KM", "100"))
+EARTH_RADIUS_KM = 6371.0
+# Longest date range a single query may cover
+MAX_QUERY_DAYS = 366
+
+TIME_PATTERN = re.compile(r"(\d{1,2}):(\d{2})\s*([AP]M)", re.IGNORECASE)
+WEEKDAYS = [day.lower() for day in calendar.day_name]
+
+
+def parse_date(value: str) -> date:
+    """Parse a YYYY-MM-DD date (raises ValueError)"""
+    return date.fromisoformat(value.strip())
+
+
+def month_name(value: date) -> str:
+    return calendar.month_name[value.month]
+
+
+def month_ranges(months: Sequence[str]) -> List[Tuple[int, int]]:
+    """Contiguous (first, last) month numbers, 1-based, for a set of months; ranges may wrap the year"""
+    active = [month in months for month in MONTHS]
+    if all(active):
+        return [(1, 12)]
+    ranges = []
+    for i in range(12):
+        # A range starts at an active month whose predecessor is inactive
+        if active[i] and not active[i - 1]:
+            j = i
+            while active[(j + 1) % 12]:
+                j += 1
+            ranges.append((i + 1, j % 12 + 1))
+    return ranges
+
+
+def parse_hours(text: str) -> Dict[str, Any]:
+    """Daily time window and closing days from an opening hours string"""
+    text = text or ""
+    if "24/7" in text or "24 hours" in text.lower():
+        window = {"open": "00:00", "close": "24:00"}
+    else:
+        times = []
+        for hour, minute, meridiem in TIME_PATTERN.findall(text):
+            hour = int(hour) % 12 + (12 if meridiem.upper() == "PM" else 0)
+            times.append(f"{hour:02d}:{minute}")
+        window = {"open": times[0], "close": times[1]} if len(times) >= 2 else {}
+    closed = [day for day in WEEKDAYS if f"closed on {day}" in text.lower()]
+    if closed:
+        window["closed_on"] = closed
+    return window
+
+
+class IntervalTree:
+    """Static interval tree over closed [start, end] integer intervals
+
+    Intervals are kept sorted by start in an implicit balanced tree (the
+    middle element of each slice is its root) with the maximum end of every
+    subtree, so an overlap query visits O(log n + k) nodes.
+    """
+
+    def __init__(self, intervals: List[Tuple[int, int, Any]]):
+        self.items = sorted(intervals, key=lambda item: (item[0], item[1]))
+        self.max_end = [0] * len(self.items)
+        self._build(0, len(self.items))
+
+    def _build(self, lo: int, hi: int) -> int:
+        if lo >= hi:
+            return -math.inf
+        mid = (lo + hi) // 2
+        self.max_end[mid] = max(self.items[mid][1], self._build(lo, mid), self._build(mid + 1, hi))
+        return self.max_end[mid]
+
+    def __len__(self):
+        return len(self.items)
+
+    def overlapping(self, start: int, end: int) -> List[Tuple[int, int, Any]]:
+        """Intervals overlapping [start, end], ordered by start"""
+        found = []
+        stack = [(0, len(self.items))]
+        while stack:
+            lo, hi = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            if self.max_end[mid] < start:
+                continue
+            stack.append((lo, mid))
+            item = self.items[mid]
+            if item[0] <= end:
+                if item[1] >= start:
+                    found.append(item)
+                stack.append((mid + 1, hi))
+        found.sort(key=lambda item: (item[0], item[1]))
+        return found
+
+
+def haversine_km(a: Tuple[float, float], b: Tuple[float, float]) -> float:
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(h))
+
+
+@lru_cache(maxsize=1)
+def place_coordinates() -> Dict[str, Tuple[float, float]]:
+    """Lower-cased district and POI names -> coordinates"""
+    places = {name.lower(): (info['latitude'], info['longitude'])
+              for name, info in jharkhand_data.load_districts()['districts'].items()}
+    for poi in jharkhand_data.load_pois()['pois']:
+        if poi.get('latitude') is not None:
+            places[poi['name'].lower()] = (poi['latitude'], poi['longitude'])
+    return places
+
+
+def normalize_events() -> List[Dict[str, Any]]:
+    """Recurring events with month ranges, locations and time windows"""
+    places = place_coordinates()
+
+    def coordinates(locations):
+        return [places[location.lower()] for location in locations if location.lower() in places]
+
+    events = []
+    for festival in jharkhand_data.load_tribal_culture().get('cultural_festivals', []):
+        months = month_span(festival.get('month', ''))
+        events.append({
+            "kind": "festival",
+            "name": festival['name'],
+            "description": festival.get('description', ''),
+            "locations": festival.get('best_locations', []),
+            "coordinates": coordinates(festival.get('best_locations', [])),
+            "months": month_ranges(months),
+            "duration": festival.get('duration', ''),
+        })
+    for workshop in jharkhand_data.get_handicraft_workshops():
+        months = month_span(workshop.get('season', '')) or MONTHS
+        events.append({
+            "kind": "workshop",
+            "name": workshop['name'],
+            "description": workshop.get('description', ''),
+            "locations": [workshop['location']],
+            "coordinates": coordinates([workshop['location']]),
+            "months": month_ranges(months),
+            "duration": workshop.get('duration', ''),
+            "cost": workshop.get('cost', ''),
+            "booking_required": workshop.get('booking_required', False),
+        })
+    for poi in jharkhand_data.load_pois()['pois']:
+        events.append({
+            "kind": "attraction",
+            "name": poi['name'],
+            "description": poi.get('description', ''),
+            "locations": [poi['district']],
+            "coordinates": [(poi['latitude'], poi['longitude'])] if poi.get('latitude') is not None else [],
+            "months": month_ranges(poi.get('best_season') or MONTHS),
+            "hours": parse_hours(poi.get('opening_hours', '')),
+            "entry_fee": poi.get('entry_fee', 0),
+        })
+    return events
+
+
+def occurrences(event: Dict[str, Any], year: int) -> List[Tuple[date, date]]:
+    """Dated occurrences of an event's month ranges that start in a year"""
+    dates = []
+    for first, last in event['months']:
+        end_year = year + 1 if last < first else year
+        dates.append((date(year, first, 1), date(end_year, last, calendar.monthrange(end_year, last)[1])))
+    return dates
+
+
+class EventCalendar:
+    """Event occurrences for a span of years, indexed by date"""
+
+    def __init__(self, events: List[Dict[str, Any]], first_year: int, last_year: int):
+        intervals = []
+        for event in events:
+            for year in range(first_year, last_year + 1):
+                for start, end in occurrences(event, year):
+                    intervals.append((start.toordinal(), end.toordinal(), event))
+        self.tree = IntervalTree(intervals)
+
+    def between(self, start: date, end: date, origin: Optional[Tuple[float, float]] = None,
+                radius_km: float = DEFAULT_RADIUS_KM, kinds: Sequence[str] = EVENT_KINDS) -> List[Dict[str, Any]]:
+        results = []
+        for first, last, event in self.tree.overlapping(start.toordinal(), end.toordinal()):
+            if event['kind'] not in kinds:
+                continue
+            distance = None
+            if origin is not None:
+                if not event['coordinates']:
+                    continue
+                distance = min(haversine_km(origin, point) for point in event['coordinates'])
+                if distance > radius_km:
+                    continue
+            result = {key: value for key, value in event.items() if key not in ("coordinates", "months")}
+            result["starts"] = date.fromordinal(first).isoformat()
+            result["ends"] = date.fromordinal(last).isoformat()
+            if distance is not None:
+                result["distance_km"] = round(distance, 1)
+            results.append(result)
+        return results
+
+
+_events = None
+_events_lock = threading.Lock()
+
+
+def events() -> List[Dict[str, Any]]:
+    global _events
+    if _events is None:
+        with _events_lock:
+            if _events is None:
+                _events = normalize_events()
+    return _events
+
+
+@lru_cache(maxsize=8)
+def calendar_for(first_year: int, last_year: int) -> EventCalendar:
+    return EventCalendar(events(), first_year, last_year)
+
+
+def resolve_location(location: str) -> Optional[Tuple[float, float]]:
+    """Coordinates of the district or POI named in a location string"""
+    location = (location or "").lower().strip()
+    if not location:
+        return None
+    places = place_coordinates()
+    if location in places:
+        return places[location]
+    # Longest name first so "Hazaribagh National Park" beats "Hazaribagh"
+    for name in sorted(places, key=len, reverse=True):
+        if name in location:
+            return places[name]
+    return None
+
+
+def events_between(start: date, end: date, location: Optional[str] = None, radius_km: float = DEFAULT_RADIUS_KM,
+                   kinds: Sequence[str] = EVENT_KINDS) -> List[Dict[str, Any]]:
+    """Events overlapping [start, end], optionally within radius_km of a location
+
+    Raises ValueError for an inverted or too long range, or an unknown location.
+    """
+    if end < start:
+        raise ValueError("end date is before start date")
+    if (end - start).days > MAX_QUERY_DAYS:
+        raise ValueError(f"date range is longer than {MAX_QUERY_DAYS} days")
+    origin = None
+    if location:
+        origin = resolve_location(location)
+        if origin is None:
+            raise ValueError(f"Unknown location: {location}")
+    # Occurrences that wrap the new year start in the previous year
+    return calendar_for(start.year - 1, end.year).between(start, end, origin, radius_km, kinds)
+
+
+def trip_events(preferences: Dict[str, Any], kinds: Sequence[str] = ("festival", "workshop")) -> List[Dict[str, Any]]:
+    """Festivals and workshops during a trip with a start_date, near its destination when it is known"""
+    start = parse_date(preferences['start_date'])
+    end = start + timedelta(days=max(1, int(preferences.get('duration') or 1)) - 1)
+    location = preferences.get('destination') if resolve_location(preferences.get('destination')) else None
+    return events_between(start, end, location, kinds=kinds)
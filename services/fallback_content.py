@@ -0,0 +1,189 @@
+"""
+Data-only agent responses for when the LLM backend is unavailable
+
+Each renderer builds a markdown answer straight from jharkhand_data (seasonal
+POIs, festivals, permits, emergency contacts, ...) so requests still get
+useful content in milliseconds while the circuit breaker is open.
+"""
+import os
+import sys
+from typing import Dict, List, Any
+
+# Add data directory to path to import our data loader
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
+from data_loader import jharkhand_data
+
+from services import climatology, event_calendar, inventory, poi_ranker
+
+NOTICE = "> ⚠️ Our AI planner is temporarily unavailable, so this is a standard guide built from our destination data."
+
+
+def bullet_list(items: List[str]) -> str:
+    return "\n".join(f"- {item}" for item in items if item)
+
+
+def month_of(preferences: Dict[str, Any]) -> str:
+    return (preferences.get('month') or 'October').lower()
+
+
+def seasonal_pois(preferences: Dict[str, Any], limit: int = 8) -> List[Dict[str, Any]]:
+    """POIs open in the travel month, best fit with the tourism type and destination first"""
+    return poi_ranker.rank_pois(preferences, month_of(preferences), focused=False, limit=limit)
+
+
+def poi_line(poi: Dict[str, Any]) -> str:
+    activities = ", ".join(poi.get('activities', [])[:4])
+    fee = poi.get('entry_fee')
+    return (f"**{poi['name']}** ({poi['district']}) - {poi['description']} "
+            f"Activities: {activities}. Entry: {f'₹{fee}' if fee else 'Free'}.")
+
+
+def festivals_section(preferences: Dict[str, Any]) -> str:
+    if preferences.get('start_date'):
+        events = event_calendar.trip_events(preferences)
+        if not events:
+            return ""
+        return "### Festivals & Workshops During Your Trip\n" + bullet_list(
+            [f"**{e['name']}** ({', '.join(e['locations'])}, {e['starts']} to {e['ends']}) - {e['description']}"
+             for e in events]
+        )
+    festivals = jharkhand_data.get_tribal_festivals_by_month(month_of(preferences))
+    if not festivals:
+        return ""
+    return "### Festivals This Month\n" + bullet_list(
+        [f"**{f['name']}** - {f.get('description', '')}" for f in festivals]
+    )
+
+
+def permits_section(preferences: Dict[str, Any]) -> str:
+    permit = jharkhand_data.get_permit_requirements(
+        preferences.get('destination', ''), preferences.get('tourism_type', '')
+    )
+    if not permit:
+        return "### Permits\n- No special permit is listed for this destination; carry a valid photo ID."
+    lines = [
+        f"{permit.get('permit_type', 'Permit')}: {permit.get('cost', 'see local office')}, "
+        f"valid {permit.get('validity', 'N/A')}, book {permit.get('booking_advance', 'in advance')} ahead "
+        f"({permit.get('booking_method', 'local office')})"
+    ]
+    return "### Permits\n" + bullet_list(lines + permit.get('restrictions', []) + permit.get('safety_requirements', []))
+
+
+def emergency_section() -> str:
+    contacts = jharkhand_data.get_emergency_contacts()
+    return "### Emergency Contacts\n" + bullet_list(
+        [f"{name.replace('_', ' ').title()}: {number}" for name, number in contacts.items()]
+    )
+
+
+def seasonal_section(preferences: Dict[str, Any]) -> str:
+    month = month_of(preferences)
+    info = jharkhand_data.get_seasonal_recommendations(month)
+    if not info:
+        return ""
+    lines = [f"Best for: {', '.join(info.get('best_for', []))}",
+             f"Avoid: {', '.join(info.get('avoid', []))}"]
+    if info.get('special_events'):
+        lines.append(f"Events: {', '.join(info['special_events'])}")
+    return f"### {month.title()} ({info.get('season', '').replace('_', '-')})\n" + bullet_list(lines)
+
+
+def render_itinerary(preferences: Dict[str, Any]) -> str:
+    days = max(1, int(preferences.get('duration') or 3))
+    pois = seasonal_pois(preferences, limit=days * 2)
+    plan = []
+    for day in range(days):
+        stops = pois[day * 2:day * 2 + 2] or pois[:1]
+        plan.append(f"**Day {day + 1}**\n" + bullet_list([poi_line(poi) for poi in stops]))
+    sections = [
+        NOTICE,
+        f"## {days}-Day Jharkhand Plan ({month_of(preferences).title()})",
+        "\n\n".join(plan),
+        seasonal_section(preferences),
+        festivals_section(preferences),
+        permits_section(preferences),
+        emergency_section(),
+    ]
+    return "\n\n".join(s for s in sections if s)
+
+
+def render_activities(preferences: Dict[str, Any]) -> str:
+    sections = [
+        NOTICE,
+        "## Suggested Activities",
+        bullet_list([poi_line(poi) for poi in seasonal_pois(preferences)]),
+        seasonal_section(preferences),
+    ]
+    return "\n\n".join(s for s in sections if s)
+
+
+def render_cultural(preferences: Dict[str, Any]) -> str:
+    workshops = inventory.available(inventory.WORKSHOP, jharkhand_data.get_handicraft_workshops(), preferences)[:4]
+    homestays = inventory.available(inventory.HOMESTAY, jharkhand_data.get_homestay_options(), preferences)[:3]
+    etiquette = jharkhand_data.get_cultural_etiquette().get('general_guidelines', [])
+    sections = [
+        NOTICE,
+        "## Cultural Experiences",
+        festivals_section(preferences),
+        "### Handicraft Workshops\n" + bullet_list(
+            [f"**{w['name']}** ({w['location']}) - {w.get('craft_type', '')}" for w in workshops]),
+        "### Homestays\n" + bullet_list(
+            [f"**{h['name']}** ({h['location']}, {h['community']}) - {h.get('description', '')}" for h in homestays]),
+        "### Etiquette\n" + bullet_list(etiquette),
+    ]
+    return "\n\n".join(s for s in sections if s)
+
+
+def render_food_culture(preferences: Dict[str, Any]) -> str:
+    dishes = jharkhand_data.get_traditional_dishes()[:8]
+    markets = jharkhand_data.get_food_markets()[:4]
+    sections = [
+        NOTICE,
+        "## Jharkhand Food Guide",
+        "### Dishes to Try\n" + bullet_list([f"**{d['name']}** - {d.get('description', '')}" for d in dishes]),
+        "### Food Markets\n" + bullet_list(
+            [f"**{m['name']}** ({m['location']}) - best {m.get('best_time', 'any time')}" for m in markets]),
+    ]
+    return "\n\n".join(s for s in sections if s)
+
+
+def climate_section(preferences: Dict[str, Any]) -> str:
+    normals = climatology.outlook(preferences.get('destination') or 'Ranchi', month_of(preferences))
+    temperature = normals['temperature_c']
+    return f"### Typical {normals['month']} Weather\n" + bullet_list([
+        f"Temperature: {temperature['min']:.0f}-{temperature['max']:.0f}°C",
+        f"Rainfall: about {normals['rainfall_mm']} mm in the month",
+        f"Humidity: around {normals['humidity_pct']}%",
+    ])
+
+
+def render_weather(preferences: Dict[str, Any]) -> str:
+    info = jharkhand_data.get_seasonal_recommendations(month_of(preferences))
+    sections = [
+        NOTICE,
+        f"## Weather Outlook for {preferences.get('destination') or 'Jharkhand'}",
+        climate_section(preferences),
+        seasonal_section(preferences),
+        "### Pack\n" + bullet_list(info.get('packing', [])) if info.get('packing') else "",
+    ]
+    return "\n\n".join(s for s in sections if s)
+
+
+def render_chat(preferences: Dict[str, Any]) -> str:
+    return ("Sorry, our AI assistant is temporarily unavailable. Please try again in a few minutes.\n\n"
+            + emergency_section())
+
+
+RENDERERS = {
+    "itinerary": render_itinerary,
+    "activities": render_activities,
+    "cultural": render_cultural,
+    "food_culture": render_food_culture,
+    "weather": render_weather,
+    "chat": render_chat,
+}
+
+
+def render(agent: str, preferences: Dict[str, Any]) -> str:
+    """Data-only markdown response for an agent"""
+    return RENDERERS[agent](preferences or {})
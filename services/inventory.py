@@ -0,0 +1,416 @@
+"""
+Capacity-aware inventory for homestays, workshops and guides
+
+The agents used to recommend every homestay, workshop and guide service to
+every traveller, whether or not it had room left. Here each of them has a
+capacity per date, and travellers hold units of it:
+
+- a homestay has rooms per night (its guest capacity over
+  INVENTORY_GUESTS_PER_ROOM), a workshop seats per day (its group_size)
+  and a guide service guides per day (INVENTORY_GUIDES_PER_SERVICE); a
+  place is closed outside its season;
+- holds and releases run in the inventory SQLite database (WAL mode) with
+  optimistic concurrency: the used units per date are read without a
+  lock, and written back in one short transaction only if the row
+  versions are unchanged, retrying on conflict; a hold that is not
+  confirmed within INVENTORY_HOLD_SECONDS expires, and its units are
+  given back before any new hold is refused;
+- reads go through an in-process snapshot of the used units, refreshed
+  only when the database changed (PRAGMA data_version) or a hold expired,
+  so filtering recommendations by availability costs a few dict lookups.
+"""
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Any
+
+# Add data directory to path to import our data loader
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
+from data_loader import jharkhand_data, month_span
+
+from services import event_calendar, trip_budget
+
+INVENTORY_DB_PATH = os.getenv("INVENTORY_DB_PATH", os.path.join("var", "inventory.db"))
+INVENTORY_HOLD_SECONDS = int(os.getenv("INVENTORY_HOLD_SECONDS", "900"))
+# The data gives guest capacity and group sizes, but not rooms or the number of guides
+INVENTORY_GUESTS_PER_ROOM = int(os.getenv("INVENTORY_GUESTS_PER_ROOM", "2"))
+INVENTORY_GUIDES_PER_SERVICE = int(os.getenv("INVENTORY_GUIDES_PER_SERVICE", "4"))
+# Travellers per guide
+GROUP_PER_GUIDE = 8
+
+# Write attempts before a hold gives up on conflicting writers
+MAX_ATTEMPTS = 5
+MAX_HOLD_DAYS = 30
+
+HOMESTAY = "homestay"
+WORKSHOP = "workshop"
+GUIDE = "guide"
+KINDS = (HOMESTAY, WORKSHOP, GUIDE)
+
+HELD = "held"
+CONFIRMED = "confirmed"
+RELEASED = "released"
+EXPIRED = "expired"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    resource TEXT NOT NULL,
+    day TEXT NOT NULL,
+    used INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    PRIMARY KEY (resource, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS holds (
+    id TEXT PRIMARY KEY,
+    resource TEXT NOT NULL,
+    start_day TEXT NOT NULL,
+    days INTEGER NOT NULL,
+    units INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    expires_at REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS holds_expiry ON holds (status, expires_at);
+"""
+
+
+class Unavailable(Exception):
+    """Not enough capacity left on a date, or the place is closed then"""
+
+
+class _Conflict(Exception):
+    """A row changed between the read and the write"""
+
+
+def resource_key(kind: str, name: str) -> str:
+    return f"{kind}:{name}"
+
+
+def units_needed(kind: str, people: int) -> int:
+    """Rooms, seats or guides a group of people takes"""
+    if kind == HOMESTAY:
+        return math.ceil(people / INVENTORY_GUESTS_PER_ROOM)
+    if kind == GUIDE:
+        return math.ceil(people / GROUP_PER_GUIDE)
+    return people
+
+
+def trip_days(start: date, days: int) -> List[date]:
+    return [start + timedelta(days=offset) for offset in range(days)]
+
+
+def trip_of(preferences: Dict[str, Any]) -> Optional[Tuple[List[date], int]]:
+    """(days, largest group size) of a trip, or None when it has no valid start_date"""
+    if not preferences.get('start_date'):
+        return None
+    try:
+        start = event_calendar.parse_date(preferences['start_date'])
+    except ValueError:
+        return None
+    dates = trip_days(start, min(max(1, int(preferences.get('duration') or 1)), MAX_HOLD_DAYS))
+    return dates, trip_budget.group_size(preferences.get('num_people') or 1)[1]
+
+
+class Resource:
+    """A bookable homestay, workshop or guide service and its daily capacity"""
+
+    def __init__(self, kind: str, name: str, capacity: int, months: Sequence[str]):
+        self.kind = kind
+        self.name = name
+        self.key = resource_key(kind, name)
+        self.capacity = capacity
+        # Months it operates in; all year when the data does not say
+        self.months = frozenset(months)
+
+    def capacity_on(self, day: date) -> int:
+        if self.months and event_calendar.month_name(day).lower() not in self.months:
+            return 0
+        return self.capacity
+
+
+def load_resources() -> Dict[str, Resource]:
+    """Resources keyed by resource_key, with capacities from the data"""
+    tribal = jharkhand_data.load_tribal_culture()
+    resources = []
+    for homestay in tribal.get('homestay_options', []):
+        guests = trip_budget.group_size(homestay.get('capacity'))[1]
+        resources.append(Resource(HOMESTAY, homestay['name'], units_needed(HOMESTAY, guests),
+                                  month_span(homestay.get('season', ''))))
+    for workshop in tribal.get('handicraft_workshops', []):
+        resources.append(Resource(WORKSHOP, workshop['name'], trip_budget.group_size(workshop.get('group_size'))[1],
+                                  month_span(workshop.get('season', ''))))
+    for guide in tribal.get('local_guides', []):
+        resources.append(Resource(GUIDE, guide['name'], INVENTORY_GUIDES_PER_SERVICE, []))
+    return {resource.key: resource for resource in resources}
+
+
+class Inventory:
+    """Holds and availability over the SQLite inventory database"""
+
+    def __init__(self, db_path: str = INVENTORY_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._resources: Optional[Dict[str, Resource]] = None
+        # Snapshot of used units: resource key -> ISO day -> used
+        self._snapshot: Dict[str, Dict[str, int]] = {}
+        self._snapshot_lock = threading.Lock()
+        self._stale = True
+        self._next_expiry = math.inf
+
+    def connection(self) -> sqlite3.Connection:
+        """Per-thread, per-process connection (WAL mode so readers never block the writer)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+            self._local.data_version = None
+            self._stale = True
+        return conn
+
+    def resources(self) -> Dict[str, Resource]:
+        if self._resources is None:
+            self._resources = load_resources()
+        return self._resources
+
+    def resource(self, kind: str, name: str) -> Optional[Resource]:
+        return self.resources().get(resource_key(kind, name))
+
+    # Reads
+
+    def snapshot(self) -> Dict[str, Dict[str, int]]:
+        """Used units per resource and day from today on, re-read only when the database changed"""
+        conn = self.connection()
+        # data_version changes when another connection (thread or process) commits
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version != self._local.data_version or self._stale or time.time() >= self._next_expiry:
+            with self._snapshot_lock:
+                if time.time() >= self._next_expiry:
+                    self.expire()
+                self._local.data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+                # Cleared before the read, so a write during it marks the new snapshot stale again
+                self._stale = False
+                today = date.today().isoformat()
+                snapshot: Dict[str, Dict[str, int]] = {}
+                for resource, day, used in conn.execute(
+                        "SELECT resource, day, used FROM usage WHERE day >= ? AND used > 0", (today,)):
+                    snapshot.setdefault(resource, {})[day] = used
+                next_expiry = conn.execute("SELECT MIN(expires_at) FROM holds WHERE status = ?",
+                                           (HELD,)).fetchone()[0]
+                self._snapshot = snapshot
+                self._next_expiry = next_expiry if next_expiry is not None else math.inf
+        return self._snapshot
+
+    def free_units(self, resource: Resource, days: Iterable[date]) -> Dict[str, int]:
+        """Units left per day"""
+        used = self.snapshot().get(resource.key, {})
+        free = {}
+        for day in days:
+            key = day.isoformat()
+            free[key] = max(resource.capacity_on(day) - used.get(key, 0), 0)
+        return free
+
+    def availability(self, start: date, days: int, people: int = 1,
+                     kinds: Sequence[str] = KINDS) -> List[Dict[str, Any]]:
+        """Every resource of the kinds with its units left per day and whether the group fits"""
+        dates = trip_days(start, days)
+        result = []
+        for resource in self.resources().values():
+            if resource.kind not in kinds:
+                continue
+            free = self.free_units(resource, dates)
+            needed = units_needed(resource.kind, people)
+            result.append({
+                "kind": resource.kind,
+                "name": resource.name,
+                "capacity": resource.capacity,
+                "units_needed": needed,
+                "free": free,
+                "available_days": [day for day, units in free.items() if units >= needed],
+            })
+        return result
+
+    def filter_available(self, kind: str, records: Sequence[Any], preferences: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Records or data dicts that have room for the group on every day of the trip
+
+        Without a start_date the trip has no dates to check, so nothing is
+        filtered out; unknown records are kept as they are.
+        """
+        trip = trip_of(preferences)
+        if trip is None:
+            return tuple(records)
+        dates, people = trip
+        kept = []
+        for record in records:
+            name = record['name'] if isinstance(record, dict) else record.name
+            resource = self.resource(kind, name)
+            if resource is None or self.fits(resource, dates, people):
+                kept.append(record)
+        return tuple(kept)
+
+    def fits(self, resource: Resource, dates: Sequence[date], people: int) -> bool:
+        return min(self.free_units(resource, dates).values()) >= units_needed(resource.kind, people)
+
+    def availability_key(self, preferences: Dict[str, Any]) -> str:
+        """The places with room for the trip's group on its dates ("" for an undated trip)
+
+        Agents put exactly these places in their prompts, so the response
+        cache keys dated answers on it.
+        """
+        trip = trip_of(preferences)
+        if trip is None:
+            return ""
+        dates, people = trip
+        return ",".join(sorted(key for key, resource in self.resources().items()
+                               if self.fits(resource, dates, people)))
+
+    # Writes
+
+    def hold(self, kind: str, name: str, start: date, days: int, people: int) -> Dict[str, Any]:
+        """Hold capacity for a group on consecutive days (raises Unavailable, KeyError for unknown places)"""
+        resource = self.resource(kind, name)
+        if resource is None:
+            raise KeyError(resource_key(kind, name))
+        if not 1 <= days <= MAX_HOLD_DAYS:
+            raise ValueError(f"days must be between 1 and {MAX_HOLD_DAYS}")
+        if start < date.today():
+            raise ValueError("Cannot hold capacity in the past")
+        units = units_needed(kind, people)
+        dates = trip_days(start, days)
+        keys = [day.isoformat() for day in dates]
+        conn = self.connection()
+        for _ in range(MAX_ATTEMPTS):
+            # Read without a lock ...
+            seen = {day: (used, version) for day, used, version in conn.execute(
+                f"SELECT day, used, version FROM usage WHERE resource = ? AND day IN ({','.join('?' * len(keys))})",
+                (resource.key, *keys))}
+            short = [key for day, key in zip(dates, keys)
+                     if resource.capacity_on(day) - seen.get(key, (0, 0))[0] < units]
+            if short:
+                # Lapsed holds still count in usage until they are expired; free them and look again
+                if self.expire():
+                    continue
+                raise Unavailable(f"{name} has no room for {plural_units(kind, units)} on {short[0]}")
+            # ... and write only if nobody changed those rows in between
+            now = time.time()
+            hold_id = uuid.uuid4().hex
+            try:
+                with conn:
+                    conn.execute("BEGIN IMMEDIATE")
+                    for key in keys:
+                        if key in seen:
+                            changed = conn.execute(
+                                "UPDATE usage SET used = used + ?, version = version + 1 "
+                                "WHERE resource = ? AND day = ? AND version = ?",
+                                (units, resource.key, key, seen[key][1])).rowcount
+                        else:
+                            changed = conn.execute(
+                                "INSERT OR IGNORE INTO usage (resource, day, used, version) VALUES (?, ?, ?, 1)",
+                                (resource.key, key, units)).rowcount
+                        if not changed:
+                            raise _Conflict()
+                    conn.execute(
+                        "INSERT INTO holds (id, resource, start_day, days, units, status, expires_at, created_at, "
+                        "updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (hold_id, resource.key, keys[0], days, units, HELD, now + INVENTORY_HOLD_SECONDS, now, now),
+                    )
+            except _Conflict:
+                continue
+            self._stale = True
+            return self.get(hold_id)
+        raise Unavailable(f"{name} is being booked by others right now; try again")
+
+    def confirm(self, hold_id: str) -> Optional[Dict[str, Any]]:
+        """Turn a live hold into a booking that does not expire (None if it is unknown or has lapsed)"""
+        conn = self.connection()
+        now = time.time()
+        with conn:
+            changed = conn.execute(
+                "UPDATE holds SET status = ?, expires_at = NULL, updated_at = ? "
+                "WHERE id = ? AND status = ? AND expires_at > ?",
+                (CONFIRMED, now, hold_id, HELD, now)).rowcount
+        return self.get(hold_id) if changed else None
+
+    def release(self, hold_id: str) -> Optional[Dict[str, Any]]:
+        """Give back a hold's or booking's capacity (None if it is unknown or already released)"""
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            released = self._release(conn, hold_id, (HELD, CONFIRMED), RELEASED)
+        if not released:
+            return None
+        self._stale = True
+        return self.get(hold_id)
+
+    def expire(self) -> int:
+        """Release holds that were not confirmed in time"""
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            expired = [row[0] for row in conn.execute(
+                "SELECT id FROM holds WHERE status = ? AND expires_at <= ?", (HELD, time.time()))]
+            for hold_id in expired:
+                self._release(conn, hold_id, (HELD,), EXPIRED)
+        if expired:
+            self._stale = True
+        return len(expired)
+
+    def _release(self, conn: sqlite3.Connection, hold_id: str, statuses: Tuple[str, ...], status: str) -> bool:
+        """Inside a write transaction: mark the hold and return its units to each day"""
+        row = conn.execute(
+            f"UPDATE holds SET status = ?, expires_at = NULL, updated_at = ? "
+            f"WHERE id = ? AND status IN ({','.join('?' * len(statuses))}) RETURNING resource, start_day, days, units",
+            (status, time.time(), hold_id, *statuses)).fetchone()
+        if row is None:
+            return False
+        resource, start_day, days, units = row
+        keys = [day.isoformat() for day in trip_days(event_calendar.parse_date(start_day), days)]
+        conn.executemany(
+            "UPDATE usage SET used = MAX(used - ?, 0), version = version + 1 WHERE resource = ? AND day = ?",
+            [(units, resource, key) for key in keys])
+        return True
+
+    def get(self, hold_id: str) -> Optional[Dict[str, Any]]:
+        row = self.connection().execute(
+            "SELECT resource, start_day, days, units, status, expires_at, created_at FROM holds WHERE id = ?",
+            (hold_id,)).fetchone()
+        if row is None:
+            return None
+        resource, start_day, days, units, status, expires_at, created_at = row
+        kind, name = resource.split(":", 1)
+        hold = {
+            "hold_id": hold_id,
+            "kind": kind,
+            "name": name,
+            "start_date": start_day,
+            "days": days,
+            "units": units,
+            "status": status,
+            "created_at": created_at,
+        }
+        if expires_at is not None:
+            hold["expires_at"] = expires_at
+        return hold
+
+
+def plural_units(kind: str, units: int) -> str:
+    word = {HOMESTAY: "room", WORKSHOP: "seat", GUIDE: "guide"}[kind]
+    return trip_budget.plural(units, word)
+
+
+inventory = Inventory()
+
+
+def available(kind: str, records: Sequence[Any], preferences: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Records of a kind with room for the trip's group on its dates"""
+    return inventory.filter_available(kind, records, preferences)
@@ -0,0 +1,301 @@
+"""
+Durable background job queue for long-running generations
+
+Jobs are rows in a local SQLite database (WAL mode), so they survive server
+restarts and can be worked off by separate worker processes (job_worker.py)
+instead of holding an HTTP connection open for the whole generation.
+
+- Submitting a job whose preference hash matches a queued, running or
+  still-fresh finished job returns the existing job instead of a new one.
+- A worker claims a job with a lease and renews it while the job runs; jobs
+  whose lease lapses (worker died) are claimed again.
+- Failed attempts are retried with exponential backoff up to
+  JOB_MAX_ATTEMPTS; results are kept for JOB_RESULT_TTL_SECONDS.
+"""
+import asyncio
+import json
+import os
+import random
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import AsyncIterator, Callable, Dict, Optional, Any
+
+from services import response_cache
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join("var", "jobs.db"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_BACKOFF_SECONDS = float(os.getenv("JOB_BACKOFF_SECONDS", "30"))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", str(24 * 3600)))
+
+POLL_SECONDS = 1.0
+PURGE_INTERVAL_SECONDS = 300
+SSE_KEEPALIVE_SECONDS = 15
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    dedupe_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    run_after REAL NOT NULL,
+    lease_expires_at REAL,
+    owner TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, run_after);
+CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, status);
+"""
+
+# Job kind -> handler taking the payload and returning a result dict.
+# A result carrying "warning" or "fallback" counts as a failed attempt.
+HANDLERS: Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]] = {}
+# Job kind -> hook called with (payload, result) once, when the job succeeds;
+# side effects that must not repeat on retried attempts belong here
+ON_SUCCESS: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], None]] = {}
+
+
+def register(kind: str, handler: Callable[[Dict[str, Any]], Dict[str, Any]],
+             on_success: Optional[Callable[[Dict[str, Any], Dict[str, Any]], None]] = None):
+    """Register the handler that runs jobs of a kind, and optionally its success hook"""
+    HANDLERS[kind] = handler
+    if on_success is not None:
+        ON_SUCCESS[kind] = on_success
+
+
+def backoff_seconds(attempts: int) -> float:
+    """Delay before the next attempt: exponential with jitter"""
+    return JOB_BACKOFF_SECONDS * (2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+
+
+class JobQueue:
+    """SQLite-backed job queue shared by the API and worker processes"""
+
+    def __init__(self, db_path: str = JOB_DB_PATH):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        """Per-thread, per-process connection (WAL mode so readers never block the writer)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def submit(self, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job, or return the live job for the same kind and preferences"""
+        dedupe_key = response_cache.cache_key(kind, payload.get("preferences", payload))
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            existing = conn.execute(
+                "SELECT id FROM jobs WHERE dedupe_key = ? AND (status IN (?, ?) OR "
+                "(status = ? AND expires_at > ?)) ORDER BY created_at DESC LIMIT 1",
+                (dedupe_key, QUEUED, RUNNING, SUCCEEDED, now),
+            ).fetchone()
+            if existing:
+                return {**self.get(existing[0]), "deduplicated": True}
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, kind, dedupe_key, payload, status, max_attempts, run_after, "
+                "created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, dedupe_key, json.dumps(payload, ensure_ascii=False), QUEUED,
+                 JOB_MAX_ATTEMPTS, now, now, now),
+            )
+        return {**self.get(job_id), "deduplicated": False}
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Public view of a job (result included once it succeeded)"""
+        row = self.connection().execute(
+            "SELECT kind, status, attempts, max_attempts, run_after, result, error, created_at, updated_at, "
+            "expires_at FROM jobs WHERE id = ?", (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        kind, status, attempts, max_attempts, run_after, result, error, created_at, updated_at, expires_at = row
+        job = {
+            "job_id": job_id,
+            "kind": kind,
+            "status": status,
+            "attempts": attempts,
+            "max_attempts": max_attempts,
+            "created_at": created_at,
+            "updated_at": updated_at,
+        }
+        if status == QUEUED and run_after > time.time():
+            job["retry_at"] = run_after
+        if error:
+            job["error"] = error
+        if result:
+            job["result"] = json.loads(result)
+            job["expires_at"] = expires_at
+        return job
+
+    def claim(self, owner: str) -> Optional[Dict[str, Any]]:
+        """Lease the next runnable job (queued and due, or running with a lapsed lease)"""
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            row = conn.execute(
+                "UPDATE jobs SET status = ?, owner = ?, attempts = attempts + 1, lease_expires_at = ?, "
+                "updated_at = ? WHERE id = (SELECT id FROM jobs WHERE (status = ? AND run_after <= ?) "
+                "OR (status = ? AND lease_expires_at < ?) ORDER BY run_after LIMIT 1) "
+                "RETURNING id, kind, payload, attempts, max_attempts",
+                (RUNNING, owner, now + JOB_LEASE_SECONDS, now, QUEUED, now, RUNNING, now),
+            ).fetchone()
+        if row is None:
+            return None
+        job_id, kind, payload, attempts, max_attempts = row
+        return {"job_id": job_id, "kind": kind, "payload": json.loads(payload),
+                "attempts": attempts, "max_attempts": max_attempts}
+
+    def renew(self, job_id: str, owner: str):
+        conn = self.connection()
+        with conn:
+            conn.execute("UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND owner = ? AND status = ?",
+                         (time.time() + JOB_LEASE_SECONDS, job_id, owner, RUNNING))
+
+    def succeed(self, job_id: str, owner: str, result: Dict[str, Any]) -> bool:
+        """Store the result; False if another worker has taken over the lease"""
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_expires_at = NULL, updated_at = ?, "
+                "expires_at = ? WHERE id = ? AND owner = ?",
+                (SUCCEEDED, json.dumps(result, ensure_ascii=False), now, now + JOB_RESULT_TTL_SECONDS,
+                 job_id, owner),
+            ).rowcount > 0
+
+    def fail(self, job: Dict[str, Any], owner: str, error: str):
+        """Record a failed attempt: retry later with backoff, or give up"""
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            if job["attempts"] < job["max_attempts"]:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, run_after = ?, lease_expires_at = NULL, "
+                    "updated_at = ? WHERE id = ? AND owner = ?",
+                    (QUEUED, error, now + backoff_seconds(job["attempts"]), now, job["job_id"], owner),
+                )
+            else:
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, lease_expires_at = NULL, updated_at = ?, "
+                    "expires_at = ? WHERE id = ? AND owner = ?",
+                    (FAILED, error, now, now + JOB_RESULT_TTL_SECONDS, job["job_id"], owner),
+                )
+
+    def purge_expired(self) -> int:
+        """Delete finished jobs whose results have expired"""
+        conn = self.connection()
+        with conn:
+            return conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND expires_at < ?",
+                                (SUCCEEDED, FAILED, time.time())).rowcount
+
+    def counts(self) -> Dict[str, int]:
+        return dict(self.connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+
+class JobWorker:
+    """Claims and runs jobs until stopped; one per worker process"""
+
+    def __init__(self, queue: JobQueue):
+        self.queue = queue
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop_event = threading.Event()
+        self._last_purge = 0.0
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            if time.time() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                self.queue.purge_expired()
+                self._last_purge = time.time()
+            job = self.queue.claim(self.owner)
+            if job is None:
+                self._stop_event.wait(POLL_SECONDS)
+                continue
+            self.process(job)
+
+    def process(self, job: Dict[str, Any]):
+        handler = HANDLERS.get(job["kind"])
+        if handler is None:
+            self.queue.fail({**job, "attempts": job["max_attempts"]}, self.owner, f"Unknown job kind: {job['kind']}")
+            return
+        if job["attempts"] > job["max_attempts"]:
+            # Re-claimed after its workers kept dying mid-run
+            self.queue.fail(job, self.owner, "Job lease expired too many times")
+            return
+
+        # Keep the lease alive while a long generation runs
+        done = threading.Event()
+
+        def heartbeat():
+            while not done.wait(JOB_LEASE_SECONDS / 3):
+                self.queue.renew(job["job_id"], self.owner)
+
+        threading.Thread(target=heartbeat, name="job-heartbeat", daemon=True).start()
+        try:
+            result = handler(job["payload"])
+        except Exception as e:
+            self.queue.fail(job, self.owner, str(e))
+            return
+        finally:
+            done.set()
+        if result.get("warning") or result.get("fallback"):
+            self.queue.fail(job, self.owner, result.get("warning") or "LLM backend unavailable")
+        elif self.queue.succeed(job["job_id"], self.owner, result) and job["kind"] in ON_SUCCESS:
+            try:
+                ON_SUCCESS[job["kind"]](job["payload"], result)
+            except Exception as e:
+                print(f"Job {job['job_id']} success hook failed: {e}")
+
+
+async def events(job_id: str) -> AsyncIterator[str]:
+    """Server-sent events with the job's state on every change, until it finishes"""
+    last = None
+    idle = 0.0
+    while True:
+        job = await asyncio.to_thread(queue.get, job_id)
+        if job is None:
+            yield "event: error\ndata: {\"error\": \"Unknown job\"}\n\n"
+            return
+        state = (job["status"], job["attempts"], job["updated_at"])
+        if state != last:
+            last = state
+            idle = 0.0
+            yield f"event: {job['status']}\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+            if job["status"] in (SUCCEEDED, FAILED):
+                return
+        elif idle >= SSE_KEEPALIVE_SECONDS:
+            idle = 0.0
+            yield ": keepalive\n\n"
+        await asyncio.sleep(POLL_SECONDS)
+        idle += POLL_SECONDS
+
+
+queue = JobQueue()
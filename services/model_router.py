@@ -0,0 +1,448 @@
+"""
+Model routing for agent LLM calls
+
+Each agent (and optionally each request class of an agent) is routed to a
+model tier. Short, simple generations (chat replies, packing notes, safety
+summaries) go to a small quantized model and itineraries go to the larger
+one. When the queue in front of the large model gets long, calls degrade to
+the small model until those long waits age out. Latency and output stats are recorded per route.
+
+Generations are streamed so that a call whose request has been cancelled
+(the HTTP client disconnected) stops between chunks, closing the connection
+to Ollama and freeing the model for requests someone is still waiting for.
+
+Calls are spread over a pool of Ollama backends (see backend_pool), each
+behind its own circuit breaker. A call that fails on one backend is retried
+once on another; when every backend is down calls fail immediately with
+LLMUnavailable so agents can serve data-only fallbacks.
+
+Calls carry the request's deadline (passed by the agent from the graph
+state, else the request context). The generation cap (num_predict) is the
+agent's token cap or what the remaining time allows at the model's measured
+decode speed, whichever is smaller; a budget-limited prompt is told how long
+the answer may be, and decoding stops just before the deadline, returning
+what was generated so far. Answers cut off by the deadline or by a
+budget-limited num_predict are flagged as truncated. When too
+little time is left to generate anything useful the call raises
+DeadlineExceeded, which agents treat like an outage: they answer from data.
+
+Every call asks Ollama to keep its model resident for OLLAMA_KEEP_ALIVE, and
+preload() loads a tier's model on every backend with a one-token generation
+at startup.
+LangChain is imported with the first client, not with this module.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Any
+import requests
+
+from services import request_context, request_log
+from services.backend_pool import OLLAMA_BACKENDS, Backend, BackendPool, model_key
+from services.circuit_breaker import LLMUnavailable
+
+MODEL_TIERS = {
+    "small": os.getenv("OLLAMA_SMALL_MODEL", "llama3.2:1b"),
+    "large": os.getenv("OLLAMA_LARGE_MODEL", "llama3.2"),
+}
+
+# Default tier per agent. "agent:request_class" keys take precedence over "agent".
+DEFAULT_ROUTES = {
+    "itinerary": "large",
+    "itinerary:day_trip": "small",
+    "activities": "large",
+    "cultural": "large",
+    "food_culture": "large",
+    "weather": "small",
+    "packing_list": "small",
+    "safety": "small",
+    "chat": "small",
+}
+
+# Concurrent generations allowed per tier and backend before callers start queueing
+MAX_PARALLEL = int(os.getenv("OLLAMA_MAX_PARALLEL", "2"))
+
+# Other backends a failed generation is retried on
+FAILOVER_ATTEMPTS = int(os.getenv("OLLAMA_FAILOVER_ATTEMPTS", "1"))
+
+# Degrade large-tier calls to the small tier when the p95 queue wait exceeds this
+DEGRADE_P95_WAIT_SECONDS = float(os.getenv("MODEL_DEGRADE_P95_WAIT_SECONDS", "10"))
+
+WINDOW_SIZE = 200
+# Queue waits older than this stop counting, so a degraded large tier is tried again once its queue is quiet
+DEGRADE_WINDOW_SECONDS = float(os.getenv("MODEL_DEGRADE_WINDOW_SECONDS", "60"))
+
+# How long Ollama keeps a model loaded after a call (Ollama duration string, or seconds)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+# Loading a model that is not resident can take a while on a cold machine
+PRELOAD_TIMEOUT_SECONDS = float(os.getenv("OLLAMA_PRELOAD_TIMEOUT_SECONDS", "120"))
+
+# Longest generation per agent in tokens; GENERATION_TOKEN_CAPS ('chat=256,itinerary=3000') overrides
+DEFAULT_TOKEN_CAPS = {
+    "itinerary": 2048,
+    "activities": 1024,
+    "cultural": 1024,
+    "food_culture": 1024,
+    "weather": 512,
+    "packing_list": 256,
+    "safety": 256,
+    "chat": 384,
+}
+DEFAULT_TOKEN_CAP = 1024
+
+# Decode speed assumed for a model until calls have measured it
+DEFAULT_TOKENS_PER_SECOND = float(os.getenv("OLLAMA_TOKENS_PER_SECOND", "15"))
+TOKEN_RATE_ALPHA = 0.3
+
+# Time kept back from a deadline for prompt processing and for the agent to finish its answer
+DEADLINE_RESERVE_SECONDS = float(os.getenv("DEADLINE_RESERVE_SECONDS", "1.5"))
+# Decoding stops this long before the deadline
+DEADLINE_STOP_SECONDS = 0.5
+# A generation shorter than this is not worth starting; agents answer from data instead
+MIN_GENERATION_TOKENS = int(os.getenv("MIN_GENERATION_TOKENS", "48"))
+
+
+class DeadlineExceeded(LLMUnavailable):
+    """Raised when the request's deadline leaves too little time for a generation"""
+
+
+class Generation(str):
+    """Generated text; truncated is True when the deadline cut it off"""
+    truncated = False
+
+
+def truncation(result: str) -> Dict[str, bool]:
+    """{'truncated': True} for a generation the deadline cut off, else {} (to merge into agent results)"""
+    return {"truncated": True} if getattr(result, "truncated", False) else {}
+
+
+def parse_routes(spec: str) -> Dict[str, str]:
+    """Parse a MODEL_ROUTES spec such as 'chat=small,itinerary:day_trip=large'"""
+    routes = {}
+    for entry in spec.split(","):
+        if "=" in entry:
+            key, tier = entry.split("=", 1)
+            routes[key.strip()] = tier.strip()
+    return routes
+
+
+def with_length_hint(messages: List[Any], num_predict: int) -> List[Any]:
+    """Messages with the last one asking for an answer that fits in num_predict tokens"""
+    last = messages[-1]
+    words = max(20, int(num_predict * 0.75))
+    hint = f"\n\nTime is short: keep the whole answer under {words} words."
+    return list(messages[:-1]) + [last.__class__(content=f"{last.content}{hint}")]
+
+
+def percentile(values, fraction: float) -> float:
+    """Nearest-rank percentile of a sequence of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))
+    return ordered[index]
+
+
+class ModelRouter:
+    """Routes agent generations to model tiers and records per-route stats"""
+
+    def __init__(self, tiers: Dict[str, str], routes: Dict[str, str], pool: BackendPool,
+                 token_caps: Optional[Dict[str, int]] = None):
+        self.tiers = tiers
+        self.routes = routes
+        self.pool = pool
+        self.token_caps = token_caps or DEFAULT_TOKEN_CAPS
+        self._token_rates = {}
+        self._deadline_misses = {}
+        slots = MAX_PARALLEL * len(pool.backends)
+        self._slots = {tier: threading.BoundedSemaphore(slots) for tier in tiers}
+        # tier -> (time.monotonic() at dequeue, seconds waited)
+        self._waits = {tier: deque(maxlen=WINDOW_SIZE) for tier in tiers}
+        self._stats = {}
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def get_client(self, backend: Backend, model: str, timeout: Optional[float] = None):
+        """Get a chat client for a model on a backend (shared unless it needs its own timeout)"""
+        with self._lock:
+            return backend.client(model, timeout, keep_alive=OLLAMA_KEEP_ALIVE)
+
+    def preload(self, tier: str) -> Dict[str, Any]:
+        """Load a tier's model into every backend's memory with a one-token generation
+
+        Raises if no backend could load it.
+        """
+        model = self.tiers[tier]
+        self.pool.start_health_checks()
+        loaded, error = {}, None
+        for backend in self.pool.backends:
+            self.get_client(backend, model)
+            started_at = time.perf_counter()
+            try:
+                response = requests.post(
+                    f"{backend.url}/api/generate",
+                    json={"model": model, "prompt": "Hi", "stream": False,
+                          "keep_alive": OLLAMA_KEEP_ALIVE, "options": {"num_predict": 1}},
+                    timeout=PRELOAD_TIMEOUT_SECONDS,
+                )
+                response.raise_for_status()
+            except Exception as e:
+                error = e
+                continue
+            backend.loaded_models.add(model_key(model))
+            # Ollama reports durations in nanoseconds
+            body = response.json()
+            loaded[backend.url] = {
+                "seconds": round(time.perf_counter() - started_at, 3),
+                "load_seconds": round(body.get("load_duration", 0) / 1e9, 3),
+            }
+        if not loaded:
+            raise error
+        return {"model": model, "backends": loaded}
+
+    def in_flight(self) -> int:
+        """Number of generations currently queued or running"""
+        with self._lock:
+            return self._in_flight
+
+    def drain(self, timeout: float) -> bool:
+        """Wait for in-flight generations to finish; returns False on timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+
+    def _recent_waits(self, tier: str) -> List[float]:
+        # Caller holds self._lock. While calls are degraded the large tier records no new waits,
+        # so without dropping old ones its p95 would stay high for good.
+        waits = self._waits[tier]
+        cutoff = time.monotonic() - DEGRADE_WINDOW_SECONDS
+        while waits and waits[0][0] < cutoff:
+            waits.popleft()
+        return [wait for _, wait in waits]
+
+    def p95_wait(self, tier: str) -> float:
+        """95th percentile queue wait (seconds) for a tier over the last DEGRADE_WINDOW_SECONDS"""
+        with self._lock:
+            return percentile(self._recent_waits(tier), 0.95)
+
+    def select_tier(self, agent: str, request_class: Optional[str] = None) -> tuple:
+        """Pick the tier for a call; returns (tier, degraded)"""
+        tier = None
+        if request_class:
+            tier = self.routes.get(f"{agent}:{request_class}")
+        tier = tier or self.routes.get(agent, "small")
+        if tier not in self.tiers:
+            tier = "small"
+        if tier == "large" and self.p95_wait("large") > DEGRADE_P95_WAIT_SECONDS:
+            return "small", True
+        return tier, False
+
+    def tokens_per_second(self, model: str) -> float:
+        """Measured decode speed of a model (EWMA), or the configured default"""
+        return self._token_rates.get(model, DEFAULT_TOKENS_PER_SECOND)
+
+    def token_budget(self, agent: str, model: str, deadline: Optional[float]) -> int:
+        """num_predict for a call: the agent's cap, or what the time left allows
+
+        Raises DeadlineExceeded when that is less than MIN_GENERATION_TOKENS.
+        """
+        cap = self.token_caps.get(agent, DEFAULT_TOKEN_CAP)
+        remaining = request_context.remaining_seconds(deadline)
+        if remaining is None:
+            return cap
+        budget = int((remaining - DEADLINE_RESERVE_SECONDS) * self.tokens_per_second(model))
+        if budget < MIN_GENERATION_TOKENS:
+            raise DeadlineExceeded(f"{max(0.0, remaining):.1f}s left before the deadline, too little to generate")
+        return min(cap, budget)
+
+    def invoke(self, agent: str, messages: List[Any], request_class: Optional[str] = None,
+               deadline: Optional[float] = None) -> Generation:
+        """Run a generation for an agent on its routed model and return the text
+
+        deadline is a time.time() value; without one the request's deadline applies.
+        """
+        if self.pool.is_down():
+            raise LLMUnavailable("No LLM backend is available (all circuits open)")
+        if deadline is None:
+            deadline = request_context.current_deadline()
+        tier, degraded = self.select_tier(agent, request_class)
+        model = self.tiers[tier]
+        session = request_context.current_session()
+
+        queued_at = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            remaining = request_context.remaining_seconds(deadline)
+            wait = None if remaining is None else max(0.0, remaining - DEADLINE_RESERVE_SECONDS)
+            if not self._slots[tier].acquire(timeout=wait):
+                self._deadline_missed(agent)
+                raise DeadlineExceeded("Deadline passed while waiting for a free model slot")
+            try:
+                started_at = time.perf_counter()
+                with self._lock:
+                    self._waits[tier].append((time.monotonic(), started_at - queued_at))
+                try:
+                    num_predict = self.token_budget(agent, model, deadline)
+                except DeadlineExceeded:
+                    self._deadline_missed(agent)
+                    raise
+                limited = num_predict < self.token_caps.get(agent, DEFAULT_TOKEN_CAP)
+                if limited:
+                    messages = with_length_hint(messages, num_predict)
+                message, stopped = self._generate_on_pool(model, session, messages, agent, request_class,
+                                                          degraded, started_at, num_predict, deadline)
+            finally:
+                self._slots[tier].release()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if self._in_flight == 0:
+                    self._idle.notify_all()
+        # Ollama reports token counts, the decode time (ns) and why it stopped in the response metadata
+        metadata = getattr(message, "response_metadata", None) or {}
+        content = Generation(message.content)
+        content.truncated = stopped or (limited and metadata.get("done_reason") == "length")
+        request_log.record_tokens(agent, model, metadata.get("prompt_eval_count"), metadata.get("eval_count"))
+        self._observe_rate(model, metadata.get("eval_count"), metadata.get("eval_duration"))
+        self._record(agent, request_class, model, degraded, started_at, content, content.truncated)
+        return content
+
+    def _generate_on_pool(self, model, session, messages, agent, request_class, degraded, started_at,
+                          num_predict, deadline):
+        """Generate on the best backend, failing over to another one if it errors"""
+        tried = []
+        while True:
+            # Backends may have gone down while this call was queued
+            backend = self.pool.acquire(model, session, exclude=tried)
+            tried.append(backend)
+            call_started_at = time.perf_counter()
+            remaining = request_context.remaining_seconds(deadline)
+            # Waiting for the next chunk must not outlast the deadline either
+            client = self.get_client(backend, model, None if remaining is None else max(1.0, remaining))
+            try:
+                result = self._generate(client, messages, num_predict, deadline)
+            except (request_context.GenerationCancelled, DeadlineExceeded):
+                self.pool.released(backend)
+                raise
+            except Exception as e:
+                remaining = request_context.remaining_seconds(deadline)
+                if remaining is not None and remaining <= DEADLINE_STOP_SECONDS:
+                    # Our own timeout ran out; that says nothing about the backend
+                    self.pool.released(backend)
+                    self._deadline_missed(agent)
+                    raise DeadlineExceeded("Deadline passed during generation") from e
+                self.pool.failed(backend)
+                self._record(agent, request_class, model, degraded, started_at, None)
+                if len(tried) > FAILOVER_ATTEMPTS or len(tried) == len(self.pool.backends) or self.pool.is_down():
+                    raise
+                continue
+            self.pool.succeeded(backend, model, session, time.perf_counter() - call_started_at)
+            return result
+
+    def _generate(self, client, messages: List[Any], num_predict: int, deadline: Optional[float]):
+        """Stream a generation, giving up between chunks if the request was cancelled
+
+        Returns (message, stopped): stopped is True when decoding was cut off
+        at the deadline.
+        """
+        if request_context.is_cancelled():
+            raise request_context.GenerationCancelled()
+        message, stopped = None, False
+        stream = client.stream(messages, options={"num_predict": num_predict})
+        try:
+            for chunk in stream:
+                if request_context.is_cancelled():
+                    raise request_context.GenerationCancelled()
+                message = chunk if message is None else message + chunk
+                remaining = request_context.remaining_seconds(deadline)
+                if remaining is not None and remaining <= DEADLINE_STOP_SECONDS:
+                    stopped = True
+                    break
+        finally:
+            stream.close()
+        if message is None:
+            if stopped:
+                raise DeadlineExceeded("Deadline passed before the model produced any output")
+            raise RuntimeError("Model returned an empty stream")
+        return message, stopped
+
+    def _observe_rate(self, model: str, eval_count: Optional[int], eval_duration: Optional[int]):
+        if not eval_count or not eval_duration:
+            return
+        rate = eval_count / (eval_duration / 1e9)
+        with self._lock:
+            previous = self._token_rates.get(model)
+            self._token_rates[model] = rate if previous is None else (
+                TOKEN_RATE_ALPHA * rate + (1 - TOKEN_RATE_ALPHA) * previous)
+
+    def _deadline_missed(self, agent: str):
+        with self._lock:
+            self._deadline_misses[agent] = self._deadline_misses.get(agent, 0) + 1
+
+    def _record(self, agent, request_class, model, degraded, started_at, content, truncated=False):
+        latency = time.perf_counter() - started_at
+        route = f"{agent}:{request_class or 'default'}->{model}"
+        with self._lock:
+            stats = self._stats.setdefault(route, {
+                "calls": 0, "errors": 0, "degraded": 0, "truncated": 0, "empty_responses": 0,
+                "output_chars": 0, "latencies": deque(maxlen=WINDOW_SIZE),
+            })
+            stats["calls"] += 1
+            stats["degraded"] += int(degraded)
+            if content is None:
+                stats["errors"] += 1
+                return
+            stats["truncated"] += int(truncated)
+            stats["latencies"].append(latency)
+            stats["output_chars"] += len(content)
+            stats["empty_responses"] += int(not content.strip())
+
+    def route_stats(self) -> Dict[str, Any]:
+        """Latency and quality stats per route, plus queue waits per tier"""
+        with self._lock:
+            routes = {}
+            for route, stats in self._stats.items():
+                latencies = list(stats["latencies"])
+                succeeded = stats["calls"] - stats["errors"]
+                routes[route] = {
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "degraded": stats["degraded"],
+                    "truncated": stats["truncated"],
+                    "empty_rate": stats["empty_responses"] / succeeded if succeeded else 0.0,
+                    "avg_output_chars": stats["output_chars"] / succeeded if succeeded else 0.0,
+                    "latency_p50": percentile(latencies, 0.5),
+                    "latency_p95": percentile(latencies, 0.95),
+                }
+            waits = {tier: percentile(self._recent_waits(tier), 0.95) for tier in self._waits}
+            token_rates = {model: round(rate, 1) for model, rate in self._token_rates.items()}
+            deadline_misses = dict(self._deadline_misses)
+        return {"tiers": self.tiers, "routes": routes, "queue_wait_p95": waits, "tokens_per_second": token_rates,
+                "deadline_exceeded": deadline_misses, "backends": self.pool.stats()}
+
+
+router = ModelRouter(
+    MODEL_TIERS,
+    {**DEFAULT_ROUTES, **parse_routes(os.getenv("MODEL_ROUTES", ""))},
+    BackendPool(OLLAMA_BACKENDS),
+    {**DEFAULT_TOKEN_CAPS,
+     **{agent: int(cap) for agent, cap in parse_routes(os.getenv("GENERATION_TOKEN_CAPS", "")).items()}},
+)
+
+
+def invoke(agent: str, messages: List[Any], request_class: Optional[str] = None,
+           deadline: Optional[float] = None) -> Generation:
+    """Run a generation for an agent through the shared router"""
+    return router.invoke(agent, messages, request_class, deadline)
+
+
+def preload() -> Dict[str, Any]:
+    """Load every tier's model into memory (each distinct model once)"""
+    loaded = {}
+    for tier, model in router.tiers.items():
+        if all(result["model"] != model for result in loaded.values()):
+            loaded[tier] = router.preload(tier)
+    return loaded
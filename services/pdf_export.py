@@ -0,0 +1,329 @@
+"""
+PDF export of a trip: itinerary and every agent section
+
+Rendering a PDF takes long enough to stall whoever waits for it, so it never
+runs on the Streamlit script thread or an API worker:
+
+- documents are rendered in a process pool (spawned processes, so forking
+  a threaded server is never an issue); callers get a future;
+- a rendered PDF is stored under PDF_EXPORT_DIR by the hash of its
+  content, so exporting the same trip again is a file lookup, and
+  concurrent exports of the same content share one render;
+- text is set in TrueType fonts: a Unicode font for Latin text and a
+  Devanagari font for Hindi, switched per run of script within a line
+  (fpdf 1.7.2 cannot fall back between fonts by itself, nor shape
+  Devanagari conjuncts). Fonts are taken from PDF_FONT_PATH and
+  PDF_HINDI_FONT_PATH, or the first of FONT_CANDIDATES found; without
+  any, the PDF falls back to the core Helvetica font (Latin-1 only).
+"""
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, Optional, Tuple, Any
+
+PDF_EXPORT_DIR = os.getenv("PDF_EXPORT_DIR", os.path.join("var", "exports"))
+PDF_EXPORT_WORKERS = int(os.getenv("PDF_EXPORT_WORKERS", "2"))
+# Rendered PDFs kept on disk; the least recently used are removed first
+PDF_EXPORT_MAX_FILES = int(os.getenv("PDF_EXPORT_MAX_FILES", "200"))
+
+# Bump when the layout changes, so cached PDFs are rendered again
+RENDER_VERSION = 1
+CHUNK_SIZE = 64 * 1024
+
+FONT_CANDIDATES = {
+    "regular": [
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        "/usr/share/fonts/TTF/DejaVuSans.ttf",
+        "/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf",
+        "/usr/share/fonts/truetype/freefont/FreeSans.ttf",
+        "/Library/Fonts/Arial Unicode.ttf",
+        "C:/Windows/Fonts/arial.ttf",
+    ],
+    "bold": [
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+        "/usr/share/fonts/TTF/DejaVuSans-Bold.ttf",
+        "/usr/share/fonts/truetype/noto/NotoSans-Bold.ttf",
+        "/usr/share/fonts/truetype/freefont/FreeSansBold.ttf",
+        "C:/Windows/Fonts/arialbd.ttf",
+    ],
+    "hindi": [
+        "/usr/share/fonts/truetype/noto/NotoSansDevanagari-Regular.ttf",
+        "/usr/share/fonts/opentype/noto/NotoSansDevanagari-Regular.ttf",
+        "/usr/share/fonts/truetype/lohit-devanagari/Lohit-Devanagari.ttf",
+        "/usr/share/fonts/truetype/freefont/FreeSans.ttf",
+        "C:/Windows/Fonts/Nirmala.ttf",
+        "C:/Windows/Fonts/mangal.ttf",
+    ],
+}
+FONT_ENV = {"regular": "PDF_FONT_PATH", "bold": "PDF_BOLD_FONT_PATH", "hindi": "PDF_HINDI_FONT_PATH"}
+
+# State key -> section title, in document order
+SECTIONS = [
+    ("itinerary", "Itinerary"),
+    ("activity_suggestions", "Tribal & Cultural Activities"),
+    ("weather_forecast", "Weather & Seasonal Conditions"),
+    ("packing_list", "Packing Guide"),
+    ("food_culture_info", "Local Cuisine & Cultural Etiquette"),
+    ("safety_constraints", "Safety Guidelines & Permit Requirements"),
+    ("useful_links", "Local Resources & Contacts"),
+]
+
+DEVANAGARI_RUN = re.compile(r"([\u0900-\u097F\uA8E0-\uA8FF\u1CD0-\u1CFF]+)")
+# Emoji, pictographs and joiners: none of the fonts have them
+UNSUPPORTED_CHARS = re.compile("[\U00010000-\U0010FFFF\u2600-\u27BF\u2B00-\u2BFF\uFE0F\u200D]")
+MARKDOWN_EMPHASIS = re.compile(r"(\*\*|__|`)")
+MARKDOWN_LINK = re.compile(r"\[([^\]]+)\]\(([^)]+)\)")
+
+
+def find_fonts() -> Dict[str, Optional[str]]:
+    """TTF path per font role (regular, bold, hindi), or None when none is installed"""
+    fonts = {}
+    for role, candidates in FONT_CANDIDATES.items():
+        configured = os.getenv(FONT_ENV[role])
+        paths = [configured] if configured else candidates
+        fonts[role] = next((path for path in paths if os.path.exists(path)), None)
+    return fonts
+
+
+def section_text(value: Any) -> str:
+    if isinstance(value, list):
+        # useful_links: [{"title": ..., "link": ...}]
+        return "\n".join(f"- {item.get('title', '')}: {item.get('link', '')}" if isinstance(item, dict)
+                         else f"- {item}" for item in value)
+    return str(value or "").strip()
+
+
+def document(state: Dict[str, Any]) -> Dict[str, Any]:
+    """What goes into the PDF: a title and the non-empty sections of the state"""
+    preferences = state.get('preferences') or {}
+    title = "Jharkhand Eco-Cultural Itinerary"
+    if preferences.get('destination'):
+        title += f": {preferences['destination']}"
+    details = [f"{preferences['duration']} days" if preferences.get('duration') else "",
+               preferences.get('month', ''), preferences.get('num_people') and f"{preferences['num_people']} people"]
+    sections = [(heading, section_text(state.get(key))) for key, heading in SECTIONS]
+    return {
+        "title": title,
+        "subtitle": ", ".join(detail for detail in details if detail),
+        "sections": [[heading, text] for heading, text in sections if text],
+    }
+
+
+def content_key(doc: Dict[str, Any], fonts: Dict[str, Optional[str]]) -> str:
+    payload = json.dumps([RENDER_VERSION, fonts, doc], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+# Rendering (runs in the pool processes)
+
+def _init_worker(font_cache_dir: str):
+    import fpdf
+    # Parsed font metrics go to our own directory, not next to the system fonts
+    os.makedirs(font_cache_dir, exist_ok=True)
+    fpdf.set_global("FPDF_CACHE_MODE", 2)
+    fpdf.set_global("FPDF_CACHE_DIR", font_cache_dir)
+
+
+class _Writer:
+    """Markdown-ish text onto an FPDF page, switching fonts between Latin and Devanagari runs"""
+
+    def __init__(self, pdf, fonts: Dict[str, Optional[str]]):
+        self.pdf = pdf
+        self.unicode = fonts["regular"] is not None
+        if self.unicode:
+            pdf.add_font("body", "", fonts["regular"], uni=True)
+            pdf.add_font("body", "B", fonts["bold"] or fonts["regular"], uni=True)
+            if fonts["hindi"]:
+                pdf.add_font("hindi", "", fonts["hindi"], uni=True)
+        self.family = "body" if self.unicode else "helvetica"
+        self.hindi = "hindi" if self.unicode and fonts["hindi"] else self.family
+
+    def clean(self, text: str) -> str:
+        text = UNSUPPORTED_CHARS.sub("", text)
+        text = MARKDOWN_LINK.sub(r"\1 (\2)", MARKDOWN_EMPHASIS.sub("", text))
+        if not self.unicode:
+            text = text.replace("\u2022", "-").replace("\u20b9", "Rs. ")
+            text = text.encode("latin-1", "replace").decode("latin-1")
+        return text
+
+    def line(self, text: str, size: float, bold: bool = False, indent: float = 0.0):
+        height = size * 0.5
+        self.pdf.set_x(self.pdf.l_margin + indent)
+        for run in DEVANAGARI_RUN.split(self.clean(text)):
+            if not run:
+                continue
+            if DEVANAGARI_RUN.fullmatch(run):
+                self.pdf.set_font(self.hindi, "", size)
+            else:
+                self.pdf.set_font(self.family, "B" if bold else "", size)
+            # Text the font has no glyphs for measures 0, and a 0-wide cell would stretch to the margin
+            if self.pdf.get_string_width(run) > 0:
+                self.pdf.write(height, run)
+        self.pdf.ln(height)
+
+    def markdown(self, text: str):
+        for raw in text.splitlines():
+            stripped = raw.strip()
+            if not stripped or set(stripped) <= set("-=*_|: "):
+                # Blank lines, rules and table separators
+                self.pdf.ln(2)
+                continue
+            heading = re.match(r"(#{1,6})\s*(.*)", stripped)
+            bullet = re.match(r"([-*+]|\d+[.)])\s+(.*)", stripped)
+            if heading:
+                self.pdf.ln(1)
+                self.line(heading.group(2), 14 - 1.5 * min(len(heading.group(1)), 4), bold=True)
+            elif bullet:
+                marker = "\u2022" if bullet.group(1) in "-*+" else bullet.group(1)
+                depth = min((len(raw) - len(raw.lstrip())) // 2, 3)
+                self.line(f"{marker} {bullet.group(2)}", 10, indent=4 + 4 * depth)
+            else:
+                self.line(stripped, 10)
+
+
+def render(doc: Dict[str, Any], fonts: Dict[str, Optional[str]], path: str) -> str:
+    """Render a document to path (written atomically) and return the path"""
+    from fpdf import FPDF
+
+    pdf = FPDF(format="A4")
+    pdf.set_auto_page_break(True, margin=15)
+    pdf.set_title(doc["title"] if fonts["regular"] else doc["title"].encode("latin-1", "replace").decode("latin-1"))
+    pdf.add_page()
+    writer = _Writer(pdf, fonts)
+    writer.line(doc["title"], 18, bold=True)
+    if doc["subtitle"]:
+        writer.line(doc["subtitle"], 11)
+    for heading, text in doc["sections"]:
+        pdf.ln(4)
+        writer.line(heading, 15, bold=True)
+        pdf.ln(1)
+        writer.markdown(text)
+
+    temporary = f"{path}.{os.getpid()}.tmp"
+    pdf.output(temporary, "F")
+    os.replace(temporary, path)
+    return path
+
+
+# Export service (runs in the API or Streamlit process)
+
+class PdfExporter:
+    """Renders PDFs in a process pool and keeps them on disk by content hash"""
+
+    def __init__(self, directory: str = PDF_EXPORT_DIR, workers: int = PDF_EXPORT_WORKERS):
+        self.directory = directory
+        self.workers = workers
+        self.fonts = find_fonts()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Content key -> future of the render in progress
+        self._inflight: Dict[str, Future] = {}
+
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(os.path.join(self.directory, "fonts"),),
+            )
+        return self._pool
+
+    def key(self, state: Dict[str, Any]) -> str:
+        return content_key(document(state), self.fonts)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.pdf")
+
+    def submit(self, state: Dict[str, Any]) -> Future:
+        """Future of (content key, PDF path); already done when the PDF is cached"""
+        doc = document(state)
+        key = content_key(doc, self.fonts)
+        path = self.path(key)
+        with self._lock:
+            if os.path.exists(path):
+                # Mark as recently used for eviction
+                os.utime(path)
+                done: Future = Future()
+                done.set_result((key, path))
+                return done
+            if key in self._inflight:
+                return self._inflight[key]
+            os.makedirs(self.directory, exist_ok=True)
+            try:
+                rendered = self.pool().submit(render, doc, self.fonts, path)
+            except BrokenProcessPool:
+                # A worker died (out of memory, killed); start a new pool
+                self._pool = None
+                rendered = self.pool().submit(render, doc, self.fonts, path)
+            result: Future = Future()
+            self._inflight[key] = result
+
+        def finished(future: Future):
+            with self._lock:
+                self._inflight.pop(key, None)
+            error = future.exception()
+            if error is not None:
+                result.set_exception(error)
+                return
+            self.evict()
+            result.set_result((key, path))
+
+        rendered.add_done_callback(finished)
+        return result
+
+    async def export(self, state: Dict[str, Any]) -> Tuple[str, str]:
+        """(content key, PDF path), awaited without holding up the event loop"""
+        return await asyncio.wrap_future(self.submit(state))
+
+    def evict(self):
+        """Remove the least recently used PDFs beyond PDF_EXPORT_MAX_FILES"""
+        try:
+            files = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".pdf")]
+        except OSError:
+            return
+        if len(files) <= PDF_EXPORT_MAX_FILES:
+            return
+        files.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in files[:len(files) - PDF_EXPORT_MAX_FILES]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def stats(self) -> Dict[str, Any]:
+        try:
+            cached = sum(1 for entry in os.scandir(self.directory) if entry.name.endswith(".pdf"))
+        except OSError:
+            cached = 0
+        return {"cached": cached, "rendering": len(self._inflight), "fonts": self.fonts}
+
+
+def iter_file(path: str) -> Iterator[bytes]:
+    """Chunks of a file; it is opened now, so eviction cannot remove it under a response"""
+    handle = open(path, "rb")
+
+    def chunks() -> Iterator[bytes]:
+        with handle:
+            while True:
+                chunk = handle.read(CHUNK_SIZE)
+                if not chunk:
+                    return
+                yield chunk
+
+    return chunks()
+
+
+exporter = PdfExporter()
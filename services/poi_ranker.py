@@ -0,0 +1,279 @@
+"""
+Vectorised POI and cultural activity ranking
+
+POIs are encoded once into a feature matrix (category one-hot, difficulty,
+entry fee, tribal heritage flag and activity tags) plus a month availability
+mask and coordinates. A traveller's preferences become two weight vectors:
+a focus vector (does the POI match the tourism type at all?) and a score
+vector (how well does it fit tourism type, mobility, budget and special
+interests?). Both are applied with a single matrix product, so ranking cost
+stays flat per request even with tens of thousands of POIs, and the matrix
+is shared read-only by every request.
+
+Activity tags are matched per word, so "Nature photography" and
+"Photography" both count as photography.
+"""
+import math
+import os
+import re
+import sys
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple, Any
+
+import numpy as np
+
+# Add data directory to path to import our data loader
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
+from data_loader import jharkhand_data
+
+MONTHS = [
+    'january', 'february', 'march', 'april', 'may', 'june',
+    'july', 'august', 'september', 'october', 'november', 'december'
+]
+
+DIFFICULTY_LEVELS = {'easy': 0.0, 'moderate': 0.5, 'challenging': 1.0}
+
+# Score lost per 100 km between a POI and the requested destination
+DISTANCE_WEIGHT = float(os.getenv("POI_DISTANCE_WEIGHT", "0.5"))
+EARTH_RADIUS_KM = 6371.0
+
+WORD_PATTERN = re.compile(r"[a-z]+")
+STOPWORDS = {'and', 'the', 'visit', 'viewing', 'local', 'tour'}
+
+# Feature weights per tourism type; "focus" features decide whether a POI
+# belongs to the tourism type at all (Mixed Experience has none: every POI fits)
+TOURISM_FOCUS = {
+    "Eco-Tourism & Nature": {"category:nature": 1.0},
+    "Tribal Culture & Heritage": {"category:cultural": 1.0, "tribal": 1.0},
+    "Pilgrimage & Spiritual": {"category:religious": 1.0},
+    "Adventure & Trekking": {"difficulty": 1.0},
+    "Photography & Wildlife": {"tag:photography": 1.0, "category:nature": 1.0},
+}
+TOURISM_WEIGHTS = {
+    "Eco-Tourism & Nature": {"category:nature": 3.0, "tag:nature": 1.0, "tag:bird": 0.5},
+    "Tribal Culture & Heritage": {"category:cultural": 3.0, "tribal": 3.0, "tag:cultural": 1.0},
+    "Pilgrimage & Spiritual": {"category:religious": 3.0, "tag:temple": 1.0, "tag:pilgrimage": 1.0},
+    "Adventure & Trekking": {"difficulty": 3.0, "tag:trekking": 1.5, "tag:safari": 1.0, "tag:sports": 1.0},
+    "Photography & Wildlife": {"tag:photography": 3.0, "tag:wildlife": 2.0, "tag:bird": 1.0,
+                               "category:nature": 1.0},
+}
+# Keyed by the first word of the mobility level label
+MOBILITY_WEIGHTS = {
+    "easy": {"difficulty": -3.0},
+    "moderate": {"difficulty": -0.5},
+    "active": {"difficulty": 0.5},
+    "adventure": {"difficulty": 1.5},
+}
+# Keyed by the first word of the budget range label
+BUDGET_WEIGHTS = {
+    "budget": {"fee": -1.5},
+    "mid": {"fee": -0.5},
+}
+SPECIAL_INTEREST_WEIGHTS = {
+    "Tribal festivals & ceremonies": {"tribal": 1.0, "category:cultural": 0.5},
+    "Handicraft workshops": {"tribal": 0.5, "tag:market": 0.5},
+    "Wildlife photography": {"tag:wildlife": 1.0, "tag:photography": 1.0, "tag:bird": 0.5},
+    "Local cuisine & cooking": {"tag:market": 1.0},
+    "Traditional music & dance": {"tribal": 1.0, "tag:cultural": 0.5},
+    "Nature photography": {"tag:photography": 1.0, "category:nature": 0.5, "tag:sunrise": 0.5},
+    "Spiritual experiences": {"category:religious": 1.0, "tag:ceremonies": 0.5},
+    "Adventure activities": {"tag:trekking": 1.0, "tag:safari": 0.5, "tag:sports": 0.5},
+}
+
+
+def activity_tags(activity: str) -> List[str]:
+    """Word tags of an activity ("Nature photography" -> nature, photography)"""
+    return [word for word in WORD_PATTERN.findall(activity.lower()) if word not in STOPWORDS]
+
+
+def first_word(label: str) -> str:
+    words = WORD_PATTERN.findall((label or '').lower())
+    return words[0] if words else ''
+
+
+class POIIndex:
+    """Feature matrix over a POI list, built once and shared by all requests"""
+
+    def __init__(self, pois: List[Dict[str, Any]]):
+        self.pois = pois
+        categories = sorted({poi['category'] for poi in pois})
+        tags = sorted({tag for poi in pois for activity in poi.get('activities', [])
+                       for tag in activity_tags(activity)})
+        names = ["difficulty", "fee", "tribal"] + [f"category:{c}" for c in categories] + [f"tag:{t}" for t in tags]
+        self.columns = {name: i for i, name in enumerate(names)}
+
+        self.features = np.zeros((len(pois), len(names)), dtype=np.float32)
+        self.season = np.zeros((len(pois), len(MONTHS)), dtype=bool)
+        self.coordinates = np.full((len(pois), 2), np.nan)
+        max_fee = max([poi.get('entry_fee') or 0 for poi in pois] + [1])
+        for row, poi in enumerate(pois):
+            self.features[row, self.columns["difficulty"]] = DIFFICULTY_LEVELS.get(poi.get('difficulty_level'), 0.5)
+            self.features[row, self.columns["fee"]] = math.log1p(poi.get('entry_fee') or 0) / math.log1p(max_fee)
+            heritage = f"{poi.get('description', '')} {poi.get('cultural_significance', '')}".lower()
+            self.features[row, self.columns["tribal"]] = float('tribal' in heritage)
+            self.features[row, self.columns[f"category:{poi['category']}"]] = 1.0
+            for activity in poi.get('activities', []):
+                for tag in activity_tags(activity):
+                    self.features[row, self.columns[f"tag:{tag}"]] = 1.0
+            for month in poi.get('best_season', []):
+                if month in MONTHS:
+                    self.season[row, MONTHS.index(month)] = True
+            if poi.get('latitude') is not None and poi.get('longitude') is not None:
+                self.coordinates[row] = np.radians([poi['latitude'], poi['longitude']])
+
+        # Destination lookup for the distance term: POI names and districts
+        self.places = {}
+        for row, poi in enumerate(pois):
+            if not np.isnan(self.coordinates[row, 0]):
+                self.places.setdefault(poi['name'].lower(), row)
+                self.places.setdefault(poi.get('district', '').lower(), row)
+        self.places.pop('', None)
+
+    def vector(self, weights: Dict[str, float]) -> np.ndarray:
+        """Weight vector over the feature columns (features missing from the data are ignored)"""
+        vector = np.zeros(len(self.columns), dtype=np.float32)
+        for name, weight in weights.items():
+            if name in self.columns:
+                vector[self.columns[name]] += weight
+        return vector
+
+    def origin(self, destination: str) -> Optional[np.ndarray]:
+        """Coordinates of the POI or district named in a destination string"""
+        destination = (destination or '').lower()
+        for place, row in self.places.items():
+            if place in destination:
+                return self.coordinates[row]
+        return None
+
+    def distances_km(self, origin: np.ndarray) -> np.ndarray:
+        """Haversine distance from origin to every POI (0 where a POI has no coordinates)"""
+        lat, lon = self.coordinates[:, 0], self.coordinates[:, 1]
+        a = (np.sin((lat - origin[0]) / 2) ** 2
+             + np.cos(origin[0]) * np.cos(lat) * np.sin((lon - origin[1]) / 2) ** 2)
+        return np.nan_to_num(2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a)))
+
+    def rank(self, weights: np.ndarray, month: Optional[str] = None, origin: Optional[np.ndarray] = None,
+             focused: bool = True, limit: Optional[int] = None) -> List[int]:
+        """Row indices ordered by score; weights is a (features, 2) matrix of focus and score vectors"""
+        focus, scores = (self.features @ weights).T
+        candidates = np.ones(len(self.pois), dtype=bool)
+        if month in MONTHS:
+            candidates &= self.season[:, MONTHS.index(month)]
+        if focused and weights[:, 0].any():
+            candidates &= focus > 0
+        if origin is not None:
+            scores = scores - DISTANCE_WEIGHT * self.distances_km(origin) / 100.0
+
+        rows = np.flatnonzero(candidates)
+        if limit is not None and limit < len(rows):
+            rows = rows[np.argpartition(-scores[rows], limit - 1)[:limit]]
+        # Highest score first, data order breaks ties
+        return rows[np.lexsort((rows, -scores[rows]))].tolist()
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def poi_index() -> POIIndex:
+    """Shared index over the loaded POI data"""
+    global _index
+    pois = jharkhand_data.load_pois()['pois']
+    if _index is None or _index.pois is not pois:
+        with _index_lock:
+            if _index is None or _index.pois is not pois:
+                _index = POIIndex(pois)
+    return _index
+
+
+@lru_cache(maxsize=1024)
+def preference_weights(tourism_type: str, mobility: str, budget: str, interests: Tuple[str, ...]) -> np.ndarray:
+    """(features, 2) matrix of focus and score weight vectors for a preference combination"""
+    index = poi_index()
+    score = index.vector(TOURISM_WEIGHTS.get(tourism_type, {}))
+    score += index.vector(MOBILITY_WEIGHTS.get(mobility, {}))
+    score += index.vector(BUDGET_WEIGHTS.get(budget, {}))
+    for interest in interests:
+        score += index.vector(SPECIAL_INTEREST_WEIGHTS.get(interest, {}))
+    weights = np.stack([index.vector(TOURISM_FOCUS.get(tourism_type, {})), score], axis=1)
+    weights.setflags(write=False)
+    return weights
+
+
+def rank_pois(preferences: Dict[str, Any], month: Optional[str] = None, focused: bool = True,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """POIs open in the month, best match for the preferences first
+
+    With focused=True only POIs matching the tourism type are returned;
+    otherwise the tourism type only affects the order.
+    """
+    index = poi_index()
+    weights = preference_weights(
+        preferences.get('tourism_type') or 'Mixed Experience',
+        first_word(preferences.get('mobility_level')),
+        first_word(preferences.get('budget_range')),
+        tuple(sorted(preferences.get('special_interests') or [])),
+    )
+    rows = index.rank(
+        weights,
+        month=(month or preferences.get('month') or '').lower(),
+        origin=index.origin(preferences.get('destination')),
+        focused=focused,
+        limit=limit,
+    )
+    return [index.pois[row] for row in rows]
+
+
+# Cultural activities: minimum tribal interest level that unlocks each one and
+# the special interests it serves
+INTEREST_LEVELS = ["Low", "Medium", "High", "Very High"]
+CULTURAL_ACTIVITIES = [
+    ("Tribal village homestays", "High", []),
+    ("Traditional music and dance performances", "High", ["Traditional music & dance"]),
+    ("Cultural storytelling sessions", "High", []),
+    ("Traditional medicine workshops", "High", []),
+    ("Sacred grove visits", "High", ["Spiritual experiences"]),
+    ("Community-based tourism activities", "High", []),
+    ("Handicraft workshops", "Medium", ["Handicraft workshops"]),
+    ("Local market visits", "Medium", ["Local cuisine & cooking"]),
+    ("Cultural museum visits", "Medium", []),
+    ("Traditional cooking classes", "Medium", ["Local cuisine & cooking"]),
+    ("Tribal festival participation", None, ["Tribal festivals & ceremonies"]),
+    ("Artisan workshop visits", None, ["Handicraft workshops"]),
+    ("Traditional performance attendance", None, ["Traditional music & dance"]),
+    ("Traditional cooking experiences", None, ["Local cuisine & cooking"]),
+]
+CULTURAL_INTERESTS = sorted({interest for _, _, interests in CULTURAL_ACTIVITIES for interest in interests})
+
+
+def _cultural_matrix() -> np.ndarray:
+    """Rows: activities; columns: interest levels that unlock them, then special interests they serve"""
+    matrix = np.zeros((len(CULTURAL_ACTIVITIES), len(INTEREST_LEVELS) + len(CULTURAL_INTERESTS)), dtype=np.float32)
+    for row, (_, level, interests) in enumerate(CULTURAL_ACTIVITIES):
+        if level:
+            matrix[row, INTEREST_LEVELS.index(level):len(INTEREST_LEVELS)] = 1.0
+        for interest in interests:
+            matrix[row, len(INTEREST_LEVELS) + CULTURAL_INTERESTS.index(interest)] = 1.0
+    return matrix
+
+
+CULTURAL_MATRIX = _cultural_matrix()
+
+
+@lru_cache(maxsize=256)
+def _rank_cultural(tribal_interest: str, interests: Tuple[str, ...]) -> Tuple[str, ...]:
+    preference = np.zeros(CULTURAL_MATRIX.shape[1], dtype=np.float32)
+    if tribal_interest in INTEREST_LEVELS:
+        preference[INTEREST_LEVELS.index(tribal_interest)] = 1.0
+    for interest in interests:
+        if interest in CULTURAL_INTERESTS:
+            preference[len(INTEREST_LEVELS) + CULTURAL_INTERESTS.index(interest)] = 1.0
+    scores = CULTURAL_MATRIX @ preference
+    rows = np.flatnonzero(scores > 0)
+    return tuple(CULTURAL_ACTIVITIES[row][0] for row in rows[np.lexsort((rows, -scores[rows]))])
+
+
+def rank_cultural_activities(tribal_interest: str, special_interests: Sequence[str]) -> List[str]:
+    """Cultural activities unlocked by the interest level or special interests, best match first"""
+    return list(_rank_cultural(tribal_interest or '', tuple(sorted(special_interests or []))))
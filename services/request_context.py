@@ -0,0 +1,71 @@
+"""
+Per-request context shared with the threads that run agents
+
+The API binds values here before handing an agent call to the threadpool
+(the context is copied into the worker thread), and the model router reads
+them while generating.
+"""
+import contextvars
+import threading
+import time
+from typing import Optional
+
+_cancel_event = contextvars.ContextVar("cancel_event", default=None)
+_session = contextvars.ContextVar("session", default=None)
+# Wall-clock time (time.time()) by which the request must be answered
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class GenerationCancelled(Exception):
+    """Raised inside a generation when the client that asked for it went away"""
+
+
+def bind_cancel_event(event: threading.Event) -> contextvars.Token:
+    """Make an event the cancellation signal for agent calls in this context"""
+    return _cancel_event.set(event)
+
+
+def reset_cancel_event(token: contextvars.Token):
+    _cancel_event.reset(token)
+
+
+def current_cancel_event() -> Optional[threading.Event]:
+    return _cancel_event.get()
+
+
+def is_cancelled() -> bool:
+    """True when the current request has been cancelled"""
+    event = _cancel_event.get()
+    return event is not None and event.is_set()
+
+
+def bind_session(session: Optional[str]) -> contextvars.Token:
+    """Set the session that generations in this context belong to (for sticky backend routing)"""
+    return _session.set(session)
+
+
+def reset_session(token: contextvars.Token):
+    _session.reset(token)
+
+
+def current_session() -> Optional[str]:
+    return _session.get()
+
+
+def bind_deadline(deadline: Optional[float]) -> contextvars.Token:
+    """Set the wall-clock time (time.time()) by which this request must be answered"""
+    return _deadline.set(deadline)
+
+
+def reset_deadline(token: contextvars.Token):
+    _deadline.reset(token)
+
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+def remaining_seconds(deadline: Optional[float] = None) -> Optional[float]:
+    """Seconds left until a deadline (the request's when none is given); None when there is none"""
+    deadline = deadline if deadline is not None else _deadline.get()
+    return None if deadline is None else deadline - time.time()
@@ -0,0 +1,147 @@
+"""
+Structured, append-only request log (rotated JSON lines)
+
+Every API call produces one record carrying the endpoint, request payload,
+normalized preferences, per-agent latency, token counts and cache status.
+Records are handed to a QueueHandler, and a background QueueListener writes
+them to a size-rotated file, so logging never blocks the request path.
+
+The cache warmer mines this log for popular preference combinations and
+scripts/replay_requests.py re-drives it against a server for load testing.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Any
+
+REQUEST_LOG_PATH = os.getenv("REQUEST_LOG_PATH", os.path.join("logs", "requests.jsonl"))
+REQUEST_LOG_MAX_BYTES = int(os.getenv("REQUEST_LOG_MAX_BYTES", str(50 * 1024 * 1024)))
+REQUEST_LOG_BACKUP_COUNT = int(os.getenv("REQUEST_LOG_BACKUP_COUNT", "10"))
+
+# Record of the API call currently being served (shared by reference with worker threads)
+_current = contextvars.ContextVar("request_log_current", default=None)
+
+_logger = logging.getLogger("request_log")
+_logger.propagate = False
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def _ensure_listener():
+    """Attach the queue handler and start the file-writing listener (once per process)"""
+    global _listener
+    if _listener is not None:
+        return
+    with _listener_lock:
+        if _listener is not None:
+            return
+        os.makedirs(os.path.dirname(REQUEST_LOG_PATH) or ".", exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            REQUEST_LOG_PATH, maxBytes=REQUEST_LOG_MAX_BYTES,
+            backupCount=REQUEST_LOG_BACKUP_COUNT, encoding="utf-8",
+        )
+        file_handler.setFormatter(logging.Formatter("%(message)s"))
+        log_queue = queue.SimpleQueue()
+        _logger.addHandler(logging.handlers.QueueHandler(log_queue))
+        _logger.setLevel(logging.INFO)
+        _listener = logging.handlers.QueueListener(log_queue, file_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def append(record: Dict[str, Any]):
+    """Queue a record (with a timestamp) for writing to the request log"""
+    _ensure_listener()
+    _logger.info(json.dumps({"ts": time.time(), **record}, ensure_ascii=False, default=str))
+
+
+def start_request(endpoint: str, method: str, payload: Any = None, client: Optional[str] = None,
+                  query: str = "", body: Optional[str] = None, content_type: Optional[str] = None) -> Dict[str, Any]:
+    """Begin the record for an API call; agents and caches annotate it while it runs
+
+    payload is the parsed JSON body. A body that is not JSON (an NDJSON
+    batch upload, say) is kept as text in "body" with its content type, so
+    the call can be replayed as it was sent.
+    """
+    entry = {
+        # Arrival time: replays keep the spacing between requests, not between their completions
+        "ts": time.time(),
+        "endpoint": endpoint,
+        "method": method,
+        "query": query or None,
+        "client": client,
+        "payload": payload,
+        "preferences": None,
+        "agents": {},
+        "started_at": time.perf_counter(),
+    }
+    if body is not None:
+        entry["body"] = body
+        entry["content_type"] = content_type
+    _current.set(entry)
+    return entry
+
+
+def finish_request(entry: Dict[str, Any], status: int):
+    """Complete and queue the record for an API call"""
+    started_at = entry.pop("started_at")
+    entry["status"] = status
+    entry["latency_ms"] = round((time.perf_counter() - started_at) * 1000, 2)
+    cache_states = {agent.get("cache") for agent in entry["agents"].values() if agent.get("cache")}
+    entry["cache"] = cache_states.pop() if len(cache_states) == 1 else ("mixed" if cache_states else None)
+    append(entry)
+
+
+def _agent_entry(agent: str) -> Optional[Dict[str, Any]]:
+    entry = _current.get()
+    if entry is None:
+        return None
+    return entry["agents"].setdefault(agent, {})
+
+
+def annotate_preferences(preferences: Dict[str, Any]):
+    """Attach the normalized preferences used by the current call"""
+    entry = _current.get()
+    if entry is not None:
+        entry["preferences"] = preferences
+
+
+def record_agent(agent: str, latency: float, cache_status: str):
+    """Record an agent's latency (seconds) and cache status for the current call"""
+    agent_entry = _agent_entry(agent)
+    if agent_entry is not None:
+        agent_entry["latency_ms"] = round(latency * 1000, 2)
+        agent_entry["cache"] = cache_status
+
+
+def record_tokens(agent: str, model: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+    """Accumulate LLM token counts for an agent in the current call"""
+    agent_entry = _agent_entry(agent)
+    if agent_entry is not None:
+        agent_entry["model"] = model
+        agent_entry["prompt_tokens"] = agent_entry.get("prompt_tokens", 0) + (prompt_tokens or 0)
+        agent_entry["completion_tokens"] = agent_entry.get("completion_tokens", 0) + (completion_tokens or 0)
+
+
+def log_files(path: Optional[str] = None) -> List[str]:
+    """Existing log files for a path, oldest rotated file first"""
+    path = path or REQUEST_LOG_PATH
+    rotated = [f"{path}.{i}" for i in range(REQUEST_LOG_BACKUP_COUNT, 0, -1)]
+    return [p for p in rotated + [path] if os.path.exists(p)]
+
+
+def read(path: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Iterate over the records of a request log (including rotated files), skipping malformed lines"""
+    for file_path in log_files(path):
+        with open(file_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
@@ -0,0 +1,231 @@
+"""
+Response cache for agent outputs
+
+Agent results are cached per (agent, normalized preferences) with a TTL so
+repeated requests for the same trip skip the LLM. Every lookup annotates the
+current request log record with the preferences, agent latency and cache
+status; the cache warmer mines that log for popular preference combinations.
+
+Answers for a trip with a start_date depend on which homestays, workshops
+and guides still have room on its dates, so for the agents that list them
+the key also covers that availability and the entry lives for only
+RESPONSE_CACHE_DATED_TTL_SECONDS.
+
+The default backend is process-local. With RESPONSE_CACHE_BACKEND=sqlite the
+cache lives in a SQLite database in WAL mode, shared by all server workers.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Any, Callable
+
+from services import inventory, request_log
+
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", str(6 * 3600)))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "2000"))
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory")
+RESPONSE_CACHE_DB_PATH = os.getenv("RESPONSE_CACHE_DB_PATH", os.path.join("var", "response_cache.db"))
+RESPONSE_CACHE_DATED_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_DATED_TTL_SECONDS", "900"))
+
+# Agents whose prompts list the places with room on the trip dates
+INVENTORY_AGENTS = ("itinerary", "activities", "cultural")
+
+
+def clean_preferences(preferences: Dict[str, Any]) -> Dict[str, Any]:
+    """Collapse whitespace, sort lists and drop empty values (case is preserved)"""
+    cleaned = {}
+    for key, value in preferences.items():
+        if isinstance(value, str):
+            value = " ".join(value.split())
+        elif isinstance(value, list):
+            value = sorted(" ".join(str(v).split()) for v in value)
+        if value in ("", None, []):
+            continue
+        cleaned[key] = value
+    return cleaned
+
+
+def normalize_preferences(preferences: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalize preferences so equivalent requests share a cache key"""
+    normalized = {}
+    for key, value in clean_preferences(preferences).items():
+        if isinstance(value, str):
+            value = value.lower()
+        elif isinstance(value, list):
+            value = [v.lower() for v in value]
+        normalized[key] = value
+    return normalized
+
+
+def is_dated(agent: str, preferences: Dict[str, Any]) -> bool:
+    """True if the agent's answer depends on availability on the trip dates"""
+    return agent in INVENTORY_AGENTS and bool(preferences.get("start_date"))
+
+
+def cache_key(agent: str, preferences: Dict[str, Any]) -> str:
+    """Stable cache key for an agent call"""
+    key = {"agent": agent, "preferences": normalize_preferences(preferences)}
+    if is_dated(agent, preferences):
+        key["availability"] = inventory.inventory.availability_key(preferences)
+    payload = json.dumps(key, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """In-process LRU cache of agent outputs with per-entry expiry"""
+
+    def __init__(self, ttl: int = RESPONSE_CACHE_TTL_SECONDS, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, agent: str, preferences: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Get a cached result, or None if missing or expired"""
+        key = cache_key(agent, preferences)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry["expires_at"] <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry["value"]
+
+    def set(self, agent: str, preferences: Dict[str, Any], value: Dict[str, Any], ttl: Optional[int] = None):
+        """Store a result for an agent call"""
+        key = cache_key(agent, preferences)
+        with self._lock:
+            self._entries[key] = {
+                "agent": agent,
+                "preferences": preferences,
+                "value": value,
+                "expires_at": time.time() + (ttl or self.ttl),
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def expires_in(self, agent: str, preferences: Dict[str, Any]) -> Optional[float]:
+        """Seconds until an entry expires, or None if it is not cached"""
+        with self._lock:
+            entry = self._entries.get(cache_key(agent, preferences))
+        if entry is None:
+            return None
+        return max(0.0, entry["expires_at"] - time.time())
+
+
+class SqliteResponseCache:
+    """Response cache shared across worker processes through a SQLite (WAL) database"""
+
+    def __init__(self, db_path: str = RESPONSE_CACHE_DB_PATH, ttl: int = RESPONSE_CACHE_TTL_SECONDS,
+                 max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        """Per-thread, per-process connection (never reused across a fork)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, agent TEXT NOT NULL, value TEXT NOT NULL, "
+                "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, agent: str, preferences: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Get a cached result, or None if missing or expired"""
+        key = cache_key(agent, preferences)
+        conn = self.connection()
+        row = conn.execute("SELECT value, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        with conn:
+            if row[1] <= now:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def set(self, agent: str, preferences: Dict[str, Any], value: Dict[str, Any], ttl: Optional[int] = None):
+        """Store a result for an agent call, evicting least recently used entries past the limit"""
+        key = cache_key(agent, preferences)
+        now = time.time()
+        conn = self.connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, agent, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, agent, json.dumps(value, ensure_ascii=False), now + (ttl or self.ttl), now),
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)", (self.max_entries,),
+            )
+
+    def expires_in(self, agent: str, preferences: Dict[str, Any]) -> Optional[float]:
+        """Seconds until an entry expires, or None if it is not cached"""
+        row = self.connection().execute(
+            "SELECT expires_at FROM responses WHERE key = ?", (cache_key(agent, preferences),)
+        ).fetchone()
+        if row is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+
+cache = SqliteResponseCache() if RESPONSE_CACHE_BACKEND == "sqlite" else ResponseCache()
+
+_last_request_at = 0.0
+
+
+def is_cached(agent: str, preferences: Dict[str, Any]) -> bool:
+    """True if a live entry exists, without counting it as an access"""
+    remaining = cache.expires_in(agent, preferences)
+    return remaining is not None and remaining > 0
+
+
+def seconds_since_last_request() -> float:
+    """Seconds since the last live request went through the cache"""
+    return time.time() - _last_request_at
+
+
+def cached_call(agent: str, func: Callable, state: Dict[str, Any], output_key: str) -> Dict[str, Any]:
+    """Run an agent through the response cache; only clean, non-empty LLM results are stored"""
+    global _last_request_at
+    _last_request_at = time.time()
+    preferences = state.get("preferences", {})
+    request_log.annotate_preferences(clean_preferences(preferences))
+
+    started_at = time.perf_counter()
+    cached = cache.get(agent, preferences)
+    if cached is not None:
+        request_log.record_agent(agent, time.perf_counter() - started_at, "hit")
+        # Marked so callers can tell a replayed answer from a new one (e.g. for analytics)
+        return {**cached, "cached": True}
+    result = func(state)
+    if result.get("fallback"):
+        # Data-only stand-in while the LLM is down; never cache it
+        request_log.record_agent(agent, time.perf_counter() - started_at, "fallback")
+        return result
+    # Answers shortened by a request's deadline are not what the next request should get
+    stored = bool(result.get(output_key)) and not result.get("warning") and not result.get("truncated")
+    if stored:
+        cache.set(agent, preferences, result,
+                  RESPONSE_CACHE_DATED_TTL_SECONDS if is_dated(agent, preferences) else None)
+    request_log.record_agent(agent, time.perf_counter() - started_at, "miss" if stored else "error")
+    return result
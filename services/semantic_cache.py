@@ -0,0 +1,289 @@
+"""
+Semantic cache for chat answers
+
+The response cache only helps when a request repeats exactly, and chat
+questions almost never do: "Is Betla safe in monsoon?" and "can I visit
+Betla National Park in July" are the same question to the LLM. Here:
+
+- a question is split into its context and its ask: the place and season it
+  mentions (else the trip's destination and month) are found with the chat
+  intent entity regexes, and the rest of the text is embedded on the CPU;
+- answers are indexed per scope (dataset version, place, season, itinerary),
+  so a near-duplicate can only be served for the same context;
+- within a scope the nearest previous question is found with one
+  matrix-vector product over L2-normalised embeddings, and its answer is
+  served when the cosine similarity reaches SEMANTIC_CACHE_THRESHOLD;
+- entries expire after SEMANTIC_CACHE_TTL_SECONDS, the least recently used
+  are evicted past SEMANTIC_CACHE_MAX_ENTRIES, and everything is dropped
+  when the dataset version (a hash of data/*.json) changes.
+
+SEMANTIC_CACHE_EMBEDDER picks the embedding model: "sentence_transformers"
+(a small local model, SEMANTIC_CACHE_MODEL, from requirements.txt) or
+"hashing" (word, bigram and character trigram features hashed into a fixed
+vector, no extra dependency). "auto" uses the first that is available.
+
+The hashing fallback does no semantic matching. Hashed n-grams cannot tell
+"vegetarian" from "non-vegetarian" or "sunrise" from "sunset" (one changed
+word in a long question still scores above 0.9), so with that embedder only
+questions that are the same after stopwords and SYNONYMS are served from the
+cache; the Betla pair above is a miss.
+"""
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple, Any
+
+import numpy as np
+
+# Add data directory to path to import our data loader
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
+from data_loader import MONTHS, jharkhand_data
+
+from services import chat_intents, request_log
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "1") == "1"
+SEMANTIC_CACHE_EMBEDDER = os.getenv("SEMANTIC_CACHE_EMBEDDER", "auto")
+SEMANTIC_CACHE_MODEL = os.getenv("SEMANTIC_CACHE_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+# Lowest cosine similarity between two questions for one to get the other's answer (default depends on the embedder)
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD")) if os.getenv("SEMANTIC_CACHE_THRESHOLD") else None
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(6 * 3600)))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+
+HASHING_DIMENSIONS = 1024
+
+# Words that carry no meaning for matching questions
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "be", "it", "its", "i", "me", "my", "we", "our", "you", "your",
+    "to", "of", "in", "on", "at", "for", "and", "or", "do", "does", "can", "could", "would", "should",
+    "please", "tell", "there", "this", "that", "what", "about", "with", "any", "how", "which", "will",
+}
+
+# Common travel paraphrases mapped to one word, so the hashing embedder sees them as equal
+SYNONYMS = {
+    "kids": "children", "kid": "children", "child": "children", "family": "children",
+    "get": "reach", "go": "reach", "travel": "reach", "commute": "reach",
+    "carry": "pack", "bring": "pack", "packing": "pack", "clothes": "clothing", "wear": "clothing",
+    "dishes": "food", "eat": "food", "cuisine": "food", "meals": "food",
+    "safe": "safety", "dangerous": "safety", "risky": "safety",
+    "see": "visit", "explore": "visit",
+    "stay": "hotel", "hotels": "hotel", "accommodation": "hotel", "homestay": "hotel",
+    "suitable": "good", "ok": "good", "okay": "good", "fine": "good",
+    "cost": "price", "expensive": "price", "cheap": "price", "budget": "price",
+}
+
+
+class HashingEmbedder:
+    """Bag of words, bigrams and character trigrams hashed into a fixed-size vector"""
+
+    name = "hashing"
+    # Only rewordings through SYNONYMS; anything lower also matches questions with a different ask
+    default_threshold = 0.99
+
+    def __init__(self, dimensions: int = HASHING_DIMENSIONS):
+        self.dimensions = dimensions
+
+    def features(self, text: str) -> List[str]:
+        words = [SYNONYMS.get(w, w) for w in re.findall(r"<[a-z]+>|[a-z0-9]+", text) if w not in STOPWORDS]
+        grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+        for word in words:
+            if not word.startswith("<"):
+                padded = f"#{word}#"
+                grams.extend(f"~{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return grams
+
+    def embed(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for gram in self.features(text):
+            digest = zlib.crc32(gram.encode("utf-8"))
+            # Whole words weigh more than their character trigrams
+            vector[digest % self.dimensions] += (0.5 if gram.startswith("~") else 1.0) * (1 if digest & 1 << 31 else -1)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+
+class SentenceTransformerEmbedder:
+    """Small sentence embedding model run locally on the CPU"""
+
+    name = "sentence_transformers"
+    default_threshold = 0.85
+
+    def __init__(self, model: str = SEMANTIC_CACHE_MODEL):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model, device="cpu")
+
+    def embed(self, text: str) -> np.ndarray:
+        return self.model.encode(text, normalize_embeddings=True).astype(np.float32)
+
+
+def make_embedder(kind: str = SEMANTIC_CACHE_EMBEDDER):
+    if kind in ("auto", "sentence_transformers"):
+        try:
+            return SentenceTransformerEmbedder()
+        except ImportError:
+            if kind == "sentence_transformers":
+                raise
+    return HashingEmbedder()
+
+
+def split_question(question: str, preferences: Dict[str, Any], itinerary: str = "") -> Tuple[Tuple[str, ...], str]:
+    """(scope, text to embed) for a question
+
+    The scope is the place and season the question is about, falling back
+    to the trip's destination and month, plus a digest of the itinerary it
+    was asked against. The text has those entities replaced by placeholders.
+    """
+    entities = chat_intents.classifier().entities
+    text, slots = entities.extract(chat_intents.normalize(question))
+    place = slots.get("poi") or slots.get("festival")
+    if not place and preferences.get("destination"):
+        _, context = entities.extract(chat_intents.normalize(preferences["destination"]))
+        place = context.get("poi") or " ".join(preferences["destination"].lower().split())
+    months = slots.get("months") or ([preferences["month"].lower()] if preferences.get("month") else [])
+    seasons = sorted({jharkhand_data.get_season_for_month(m) or "" for m in months if m in MONTHS})
+    itinerary_digest = hashlib.sha256(itinerary.encode("utf-8")).hexdigest()[:12] if itinerary else ""
+    return (place or "", ",".join(seasons), itinerary_digest), text
+
+
+class SemanticCache:
+    """Nearest-question lookup over answered chat questions, per scope"""
+
+    def __init__(self, embedder=None, threshold: Optional[float] = SEMANTIC_CACHE_THRESHOLD,
+                 ttl: int = SEMANTIC_CACHE_TTL_SECONDS, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES):
+        self._embedder = embedder
+        self.threshold = threshold if threshold is not None or embedder is None else embedder.default_threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.version: Optional[str] = None
+        # scope -> {"vectors": (n, d) array, "entries": [entry, ...]}
+        self._scopes: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        # entry id -> entry, least recently used first
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def embedder(self):
+        if self._embedder is None:
+            with self._lock:
+                if self._embedder is None:
+                    self._embedder = make_embedder()
+                    if self.threshold is None:
+                        self.threshold = self._embedder.default_threshold
+        return self._embedder
+
+    def _check_version(self, version: str):
+        # Answers given against an older dataset are dropped wholesale
+        if version != self.version:
+            self._scopes.clear()
+            self._entries.clear()
+            self.version = version
+
+    def _key(self, question: str, state: Dict[str, Any]) -> Tuple[Tuple[str, ...], np.ndarray]:
+        scope, text = split_question(question, state.get("preferences", {}), state.get("itinerary", ""))
+        return (jharkhand_data.dataset_version(),) + scope, self.embedder().embed(text)
+
+    def _nearest(self, scope: Tuple[str, ...], vector: np.ndarray) -> Tuple[Optional[Dict[str, Any]], float]:
+        index = self._scopes.get(scope)
+        if not index or not index["entries"]:
+            return None, 0.0
+        similarities = index["vectors"] @ vector
+        best = int(np.argmax(similarities))
+        return index["entries"][best], float(similarities[best])
+
+    def lookup(self, question: str, state: Dict[str, Any], count: bool = True) -> Optional[Dict[str, Any]]:
+        """The cached answer to the closest earlier question in the same scope, or None"""
+        scope, vector = self._key(question, state)
+        with self._lock:
+            self._check_version(scope[0])
+            entry, similarity = self._nearest(scope, vector)
+            if entry is not None and entry["expires_at"] <= time.time():
+                self._remove(entry)
+                entry = None
+            if entry is None or similarity < self.threshold:
+                self.misses += count
+                return None
+            self._entries.move_to_end(entry["id"])
+            self.hits += count
+            return {"question": entry["question"], "answer": entry["answer"], "similarity": round(similarity, 3)}
+
+    def store(self, question: str, state: Dict[str, Any], answer: str):
+        scope, vector = self._key(question, state)
+        with self._lock:
+            self._check_version(scope[0])
+            entry, similarity = self._nearest(scope, vector)
+            if entry is not None and similarity >= 0.999:
+                # Same question again: refresh the answer in place
+                entry.update(answer=answer, expires_at=time.time() + self.ttl)
+                self._entries.move_to_end(entry["id"])
+                return
+            entry = {"id": self._next_id, "scope": scope, "question": question, "answer": answer,
+                     "expires_at": time.time() + self.ttl}
+            self._next_id += 1
+            index = self._scopes.setdefault(scope, {"vectors": np.zeros((0, vector.shape[0]), np.float32),
+                                                    "entries": []})
+            index["vectors"] = np.vstack([index["vectors"], vector[None, :]])
+            index["entries"].append(entry)
+            self._entries[entry["id"]] = entry
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries.values())))
+
+    def _remove(self, entry: Dict[str, Any]):
+        index = self._scopes[entry["scope"]]
+        position = index["entries"].index(entry)
+        del index["entries"][position]
+        index["vectors"] = np.delete(index["vectors"], position, axis=0)
+        if not index["entries"]:
+            del self._scopes[entry["scope"]]
+        self._entries.pop(entry["id"], None)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": SEMANTIC_CACHE_ENABLED,
+                "embedder": self._embedder.name if self._embedder is not None else None,
+                "threshold": self.threshold,
+                "dataset_version": self.version,
+                "entries": len(self._entries),
+                "scopes": len(self._scopes),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+cache = SemanticCache()
+
+
+def is_cached(question: str, state: Dict[str, Any]) -> bool:
+    """True if a close enough answer is cached, without counting it as a lookup"""
+    return SEMANTIC_CACHE_ENABLED and cache.lookup(question, state, count=False) is not None
+
+
+def cached_chat(func: Callable, state: Dict[str, Any]) -> Dict[str, Any]:
+    """Run the chat agent through the semantic cache; only clean LLM answers are stored"""
+    question = state['user_question']
+    if not SEMANTIC_CACHE_ENABLED:
+        return func(state)
+    started_at = time.perf_counter()
+    hit = cache.lookup(question, state)
+    if hit is not None:
+        request_log.record_agent("chat", time.perf_counter() - started_at, "hit")
+        chat_history = state.get('chat_history', []) + [{"question": question, "response": hit["answer"]}]
+        return {"chat_response": hit["answer"], "chat_history": chat_history, "cached": True,
+                "similarity": hit["similarity"]}
+    result = func(state)
+    if "intent" in result or result.get("fallback"):
+        # Answered from data: as fast as a cache hit, and kept current with the data
+        request_log.record_agent("chat", time.perf_counter() - started_at, "fallback" if result.get("fallback") else "data")
+        return result
+    # Answers cut off by a deadline are not what the next asker should get
+    stored = bool(result.get("chat_response")) and not result.get("warning") and not result.get("truncated")
+    if stored:
+        cache.store(question, state, result["chat_response"])
+    request_log.record_agent("chat", time.perf_counter() - started_at, "miss" if stored else "error")
+    return result
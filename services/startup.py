@@ -0,0 +1,159 @@
+"""
+Startup phases: lazy agent imports, warm-up and readiness
+
+Importing the API used to import every agent (and with them LangChain and
+the data loader) before the server could bind, and the first request then
+paid for reading the datasets and for Ollama loading the model. Instead:
+
+- rarely used agents are referenced through lazy_function and imported on
+  their first call (or by the warm-up, whichever comes first);
+- after startup a background warm-up runs named phases: load and index
+  every dataset, import the agents and compile the graph, and send a tiny
+  keep_alive generation so each model is resident before the first user;
+- /api/ready reports ready only once the warm-up has finished, with the
+  import time, the time of each phase and the latency of the first request.
+
+A phase that fails (typically the model preload while Ollama is down) is
+recorded and does not hold back readiness: agents degrade to their data-only
+fallbacks in that case anyway.
+"""
+import importlib
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Any, Tuple
+
+# Add data directory to path to import our data loader
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
+
+# Run the warm-up when the server starts; set WARMUP=0 to skip it (e.g. in development)
+WARMUP = os.getenv("WARMUP", "1") == "1"
+
+
+def lazy_function(module: str, name: str) -> Callable:
+    """A callable that imports module on first use and calls module.name"""
+    def call(*args, **kwargs):
+        return getattr(importlib.import_module(module), name)(*args, **kwargs)
+    call.__name__ = name
+    call.__qualname__ = f"{module}.{name}"
+    return call
+
+
+def load_data():
+    """Load and index every dataset, including the derived indexes built on first use"""
+    from datetime import date
+    from data_loader import jharkhand_data
+    from data_records import jharkhand_records
+    from services import analytics, chat_intents, climatology, event_calendar, inventory, poi_ranker, travel_times
+
+    jharkhand_data.load_pois()
+    jharkhand_data.load_tribal_culture()
+    jharkhand_data.load_seasonal_constraints()
+    jharkhand_data.load_cuisine_data()
+    jharkhand_data.load_safety_constraints()
+    jharkhand_data.load_packing_rules()
+    jharkhand_data.load_districts()
+    jharkhand_records.dishes()
+    poi_ranker.poi_index()
+    event_calendar.calendar_for(date.today().year - 1, date.today().year + 1)
+    climatology.climatology()
+    analytics.store.resolve_poi_ids("")
+    chat_intents.classifier()
+    travel_times.travel_times()
+    inventory.inventory.resources()
+    inventory.inventory.snapshot()
+
+
+def import_modules(modules: List[str]):
+    """Import modules that are otherwise imported lazily on first use"""
+    for module in modules:
+        importlib.import_module(module)
+
+
+class Startup:
+    """Timings and readiness of the process startup"""
+
+    def __init__(self):
+        self.phases: List[Tuple[str, Callable[[], Any]]] = []
+        self.import_seconds: Optional[float] = None
+        self.timings: Dict[str, float] = {}
+        self.results: Dict[str, Any] = {}
+        self.errors: Dict[str, str] = {}
+        self.first_request: Optional[Dict[str, Any]] = None
+        self._started_at: Optional[float] = None
+        self._finished_at: Optional[float] = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+
+    def add_phase(self, name: str, func: Callable[[], Any]):
+        """Register a warm-up phase; phases run in registration order"""
+        self.phases.append((name, func))
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def run(self, only: Optional[List[str]] = None):
+        """Run the warm-up phases (or only the named ones) and mark the process ready"""
+        self._started_at = time.perf_counter()
+        for name, func in self.phases:
+            if only is not None and name not in only:
+                continue
+            started = time.perf_counter()
+            try:
+                result = func()
+                if result is not None:
+                    self.results[name] = result
+            except Exception as e:
+                self.errors[name] = str(e)
+            self.timings[name] = round(time.perf_counter() - started, 3)
+        if only is None:
+            self._finished_at = time.perf_counter()
+            self._ready.set()
+            print(f"Startup: ready after {self.warmup_seconds():.2f}s warm-up "
+                  f"({', '.join(f'{name} {seconds:.2f}s' for name, seconds in self.timings.items())})"
+                  + (f"; failed phases: {', '.join(self.errors)}" if self.errors else ""))
+
+    def start(self):
+        """Run the warm-up in a background thread, or mark ready at once when disabled"""
+        if not WARMUP:
+            self._ready.set()
+            return
+        threading.Thread(target=self.run, name="warm-up", daemon=True).start()
+
+    def warmup_seconds(self) -> Optional[float]:
+        if self._started_at is None or self._finished_at is None:
+            return None
+        return round(self._finished_at - self._started_at, 3)
+
+    def record_request(self, path: str, seconds: float):
+        """Record the latency of the first API request served by this process"""
+        if self.first_request is not None:
+            return
+        with self._lock:
+            if self.first_request is None:
+                self.first_request = {
+                    "path": path,
+                    "latency_seconds": round(seconds, 3),
+                    "before_ready": not self.is_ready(),
+                }
+                print(f"Startup: first request {path} took {seconds:.3f}s")
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.is_ready(),
+            "warmup_enabled": WARMUP,
+            "import_seconds": self.import_seconds,
+            "warmup_seconds": self.warmup_seconds(),
+            "phases": dict(self.timings),
+            "results": dict(self.results),
+            "errors": dict(self.errors),
+            "first_request": self.first_request,
+        }
+
+
+# Process-wide startup state
+state = Startup()
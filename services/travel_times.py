@@ -0,0 +1,268 @@
+"""
+Travel times between POIs and district headquarters
+
+Itineraries used to be planned without any notion of how far apart places
+are, and the seasonal accessibility data was never used for routing. Here
+every pair of places gets a road distance and a driving time per season:
+
+- the road graph links each district headquarters to its nearest
+  headquarters, each POI to its nearest headquarters, and POIs that are
+  close to each other directly; an edge is the straight-line distance times
+  ROAD_FACTOR, driven at AVERAGE_SPEED_KMPH;
+- in each season the access roads of a POI are slowed down or closed
+  according to its monsoon_accessibility and the accessibility_matrix of
+  seasonal_constraints.json (a "limited" POI takes LIMITED_ACCESS_PENALTY
+  times longer to reach; a "closed" one cannot be reached);
+- all-pairs shortest paths over that graph give a (places, places) distance
+  matrix and a (seasons, places, places) time matrix.
+
+The matrices are computed once, saved with the dataset version to
+TRAVEL_TIMES_PATH as NumPy arrays, and loaded from there by later
+processes, so a query is two dict lookups and an array index.
+"""
+import math
+import os
+import sys
+import threading
+from typing import Dict, List, Optional, Sequence, Any
+
+import numpy as np
+
+# Add data directory to path to import our data loader
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
+from data_loader import MONTHS, jharkhand_data
+
+TRAVEL_TIMES_PATH = os.getenv("TRAVEL_TIMES_PATH", os.path.join("var", "travel_times.npz"))
+
+# Road distance per straight-line kilometre
+ROAD_FACTOR = float(os.getenv("TRAVEL_ROAD_FACTOR", "1.3"))
+AVERAGE_SPEED_KMPH = float(os.getenv("TRAVEL_AVERAGE_SPEED_KMPH", "40"))
+# Each headquarters is linked to this many nearest headquarters, and each POI to this many
+HUB_NEIGHBOURS = 4
+POI_HUB_NEIGHBOURS = 2
+# POIs closer than this are linked directly by a local road
+LOCAL_ROAD_KM = 60.0
+LIMITED_ACCESS_PENALTY = 1.5
+EARTH_RADIUS_KM = 6371.0
+
+SEASONS = ("winter", "summer", "monsoon", "post_monsoon")
+
+# POI subcategory -> accessibility_matrix row
+ACCESSIBILITY_ROWS = {
+    "national_park": "national_parks",
+    "waterfall": "waterfalls",
+    "hill_station": "hill_stations",
+    "temple": "temples",
+    "museum": "cultural_sites",
+}
+
+
+def access_penalty(label: str) -> float:
+    """Travel time multiplier for an accessibility label ("Limited access", "Closed", "Good", ...)"""
+    label = (label or "").lower()
+    if label.startswith("closed"):
+        return math.inf
+    if label.startswith("limited"):
+        return LIMITED_ACCESS_PENALTY
+    # "Poor" in the matrix describes waterfall flow, not the road
+    return 1.0
+
+
+def season_penalties(poi: Dict[str, Any], matrix: Dict[str, Dict[str, str]]) -> List[float]:
+    """Access penalty of a POI in each of SEASONS"""
+    row = matrix.get(ACCESSIBILITY_ROWS.get(poi.get('subcategory'), ""), {})
+    penalties = []
+    for season in SEASONS:
+        penalty = access_penalty(row.get(season, ""))
+        if season == "monsoon":
+            penalty = max(penalty, access_penalty(poi.get('monsoon_accessibility', "")))
+        penalties.append(penalty)
+    return penalties
+
+
+def haversine_matrix(coordinates: np.ndarray) -> np.ndarray:
+    """(n, n) great-circle distances in km for (n, 2) coordinates in degrees"""
+    lat, lon = np.radians(coordinates[:, 0])[:, None], np.radians(coordinates[:, 1])[:, None]
+    a = np.sin((lat - lat.T) / 2) ** 2 + np.cos(lat) * np.cos(lat.T) * np.sin((lon - lon.T) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def shortest_paths(weights: np.ndarray) -> np.ndarray:
+    """All-pairs shortest paths (Floyd-Warshall, one vectorised relaxation per node)"""
+    distances = weights.copy()
+    np.fill_diagonal(distances, 0.0)
+    for k in range(len(distances)):
+        np.minimum(distances, distances[:, k:k + 1] + distances[k:k + 1, :], out=distances)
+    return distances
+
+
+class TravelTimes:
+    """Distance and per-season time matrices over POIs and headquarters"""
+
+    def __init__(self, places: List[str], kinds: List[str], distance_km: np.ndarray, minutes: np.ndarray,
+                 version: str):
+        self.places = places
+        self.kinds = kinds
+        self.distance_km = distance_km
+        self.minutes = minutes
+        self.version = version
+        self.index: Dict[str, int] = {}
+        for row, place in enumerate(places):
+            self.index.setdefault(place.lower(), row)
+        # Display names: POI names for POI ids, district names as they are
+        self.names = list(places)
+        for poi in jharkhand_data.load_pois().get('pois', []):
+            if poi['id'] in self.index:
+                self.index.setdefault(poi['name'].lower(), self.index[poi['id']])
+                self.names[self.index[poi['id']]] = poi['name']
+
+    @classmethod
+    def build(cls, version: str) -> "TravelTimes":
+        districts = jharkhand_data.load_districts()['districts']
+        pois = [poi for poi in jharkhand_data.load_pois().get('pois', []) if poi.get('latitude') is not None]
+        matrix = jharkhand_data.load_seasonal_constraints().get('accessibility_matrix', {})
+        places = list(districts) + [poi['id'] for poi in pois]
+        kinds = ["district"] * len(districts) + ["poi"] * len(pois)
+        coordinates = np.array([[d['latitude'], d['longitude']] for d in districts.values()]
+                               + [[poi['latitude'], poi['longitude']] for poi in pois])
+        straight = haversine_matrix(coordinates)
+
+        hubs = len(districts)
+        links = np.zeros(straight.shape, dtype=bool)
+        for row in range(len(places)):
+            nearest_hubs = np.argsort(straight[row, :hubs])
+            # A hub's nearest hub is itself
+            neighbours = nearest_hubs[1:HUB_NEIGHBOURS + 1] if row < hubs else nearest_hubs[:POI_HUB_NEIGHBOURS]
+            links[row, neighbours] = True
+        links[hubs:, hubs:] |= straight[hubs:, hubs:] <= LOCAL_ROAD_KM
+        links |= links.T
+        np.fill_diagonal(links, False)
+        road_km = np.where(links, straight * ROAD_FACTOR, np.inf)
+
+        # A POI's penalty applies to every road into or out of it
+        penalties = np.ones((len(SEASONS), len(places)))
+        for column, poi in enumerate(pois, start=hubs):
+            penalties[:, column] = season_penalties(poi, matrix)
+        distance_km = shortest_paths(road_km)
+        minutes = np.stack([
+            shortest_paths(road_km / AVERAGE_SPEED_KMPH * 60.0
+                           * np.maximum(penalties[season][:, None], penalties[season][None, :]))
+            for season in range(len(SEASONS))
+        ])
+        return cls(places, kinds, distance_km.astype(np.float32), minutes.astype(np.float32), version)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp.npz"
+        np.savez_compressed(temporary, places=np.array(self.places), kinds=np.array(self.kinds),
+                            distance_km=self.distance_km, minutes=self.minutes, version=np.array(self.version))
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path: str) -> "TravelTimes":
+        with np.load(path) as saved:
+            return cls(saved['places'].tolist(), saved['kinds'].tolist(), saved['distance_km'], saved['minutes'],
+                       str(saved['version']))
+
+    def resolve(self, place: str) -> Optional[int]:
+        """Row of a POI id, POI name or district name"""
+        return self.index.get((place or "").lower().strip())
+
+    def find(self, text: str) -> Optional[int]:
+        """Row of the place named in free text ("Ranchi, Jharkhand"), longest name first"""
+        text = (text or "").lower()
+        row = self.resolve(text)
+        if row is not None:
+            return row
+        for name in sorted(self.index, key=len, reverse=True):
+            if name in text:
+                return self.index[name]
+        return None
+
+    def query(self, origin: str, destination: str, month: str = "") -> Optional[Dict[str, Any]]:
+        """Road distance and driving time between two places in a month's season"""
+        a, b = self.resolve(origin), self.resolve(destination)
+        if a is None or b is None:
+            return None
+        season = season_of(month)
+        minutes = float(self.minutes[SEASONS.index(season), a, b])
+        return {
+            "from": self.names[a],
+            "to": self.names[b],
+            "distance_km": round(float(self.distance_km[a, b])),
+            "minutes": round(minutes) if math.isfinite(minutes) else None,
+            "season": season,
+            "reachable": math.isfinite(minutes),
+        }
+
+
+def season_of(month: str) -> str:
+    """Season of a month name (winter when unknown)"""
+    month = (month or "").lower()
+    return (jharkhand_data.get_season_for_month(month) if month in MONTHS else None) or "winter"
+
+
+_travel_times = None
+_travel_times_lock = threading.Lock()
+
+
+def travel_times() -> TravelTimes:
+    """Matrices for the current dataset: loaded from TRAVEL_TIMES_PATH, or built and saved there"""
+    global _travel_times
+    if _travel_times is None:
+        with _travel_times_lock:
+            if _travel_times is None:
+                version = jharkhand_data.dataset_version()
+                loaded = None
+                if os.path.exists(TRAVEL_TIMES_PATH):
+                    try:
+                        loaded = TravelTimes.load(TRAVEL_TIMES_PATH)
+                    except (OSError, ValueError, KeyError):
+                        loaded = None
+                if loaded is None or loaded.version != version:
+                    loaded = TravelTimes.build(version)
+                    try:
+                        loaded.save(TRAVEL_TIMES_PATH)
+                    except OSError:
+                        # A read-only deployment still gets the in-memory matrices
+                        pass
+                _travel_times = loaded
+    return _travel_times
+
+
+def travel_time(origin: str, destination: str, month: str = "") -> Optional[Dict[str, Any]]:
+    """Distance and driving time between two POIs or district headquarters (None if either is unknown)"""
+    return travel_times().query(origin, destination, month)
+
+
+def format_minutes(minutes: Optional[float]) -> str:
+    if minutes is None:
+        return "not reachable this season"
+    hours, rest = divmod(int(round(minutes)), 60)
+    return f"{hours} h {rest:02d} min" if hours else f"{rest} min"
+
+
+def itinerary_legs(base: str, poi_ids: Sequence[str], month: str = "") -> List[Dict[str, Any]]:
+    """For prompts: each POI's distance and time from the base and from the nearest other listed POI"""
+    engine = travel_times()
+    origin = engine.find(base)
+    rows = [(poi_id, engine.resolve(poi_id)) for poi_id in poi_ids]
+    rows = [(poi_id, row) for poi_id, row in rows if row is not None]
+    season = SEASONS.index(season_of(month))
+    legs = []
+    for _, row in rows:
+        leg = {"place": engine.names[row]}
+        if origin is not None:
+            leg["from_base"] = f"{round(float(engine.distance_km[origin, row]))} km, " \
+                               f"{format_minutes(_finite(engine.minutes[season, origin, row]))}"
+        others = [other for _, other in rows if other != row]
+        if others:
+            nearest = min(others, key=lambda other: engine.minutes[season, row, other])
+            leg["nearest_other"] = f"{engine.names[nearest]} " \
+                                   f"({format_minutes(_finite(engine.minutes[season, row, nearest]))})"
+        legs.append(leg)
+    return legs
+
+
+def _finite(value) -> Optional[float]:
+    return float(value) if math.isfinite(value) else None
@@ -0,0 +1,235 @@
+"""
+Trip budget computed from the data instead of guessed by the LLM
+
+The prompts used to ask the model for "cost in INR", and it made the numbers
+up although the data has most of them: POI entry fees and permit costs,
+homestay, workshop, cooking class and guide prices. Here the planned places
+(the best ranked POIs open in the month, one per day) are priced:
+
+- every price is a (low, high) range, and the group size is one too ("4-6"
+  people), so each item is a 2-vector of low and high totals: low prices
+  for the smallest group, high prices for the largest;
+- per-person items (fees, permits, beds, food, workshops) scale with the
+  group, per-group items (guides, taxis) with the days or the route driven
+  (travel_times distances, one vehicle per VEHICLE_SEATS travellers);
+- the per person per day total is checked against the budget_range band.
+
+Hotel and food prices are not in the data; HOTEL_NIGHT_PER_PERSON and
+FOOD_PER_PERSON_PER_DAY hold typical ranges per budget band.
+"""
+import math
+import os
+import re
+import sys
+from typing import Dict, List, Optional, Tuple, Any
+
+import numpy as np
+
+# Add data directory to path to import our data loader
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'data'))
+from data_loader import jharkhand_data
+
+from services import poi_ranker, travel_times
+
+# Typical prices (INR) per budget band, keyed by the first word of the budget range label
+HOTEL_NIGHT_PER_PERSON = {
+    "budget": (500, 1000),
+    "mid": (1200, 2000),
+    "comfortable": (2000, 3500),
+    "luxury": (4000, 8000),
+}
+FOOD_PER_PERSON_PER_DAY = {
+    "budget": (250, 450),
+    "mid": (450, 800),
+    "comfortable": (800, 1300),
+    "luxury": (1300, 2500),
+}
+DEFAULT_BAND = "mid"
+
+# Taxi hire per km and seats per vehicle
+TAXI_RATE_PER_KM = (12, 16)
+VEHICLE_SEATS = 4
+
+# Places priced per trip: at most one a day, and no more than the itinerary prompt lists
+MAX_PLANNED_POIS = 8
+
+NUMBER_PATTERN = re.compile(r"\d[\d,]*")
+
+
+def cost_range(text: Any) -> Tuple[float, float]:
+    """(low, high) INR from a price like "500-800 INR", "₹200 per person", 150 or "Free" """
+    if isinstance(text, (int, float)):
+        return float(text), float(text)
+    numbers = [float(n.replace(",", "")) for n in NUMBER_PATTERN.findall(str(text or ""))]
+    if not numbers:
+        return 0.0, 0.0
+    if "+" in str(text) and len(numbers) == 1:
+        return numbers[0], math.inf
+    return min(numbers[:2]), max(numbers[:2])
+
+
+def group_size(num_people: Any) -> Tuple[int, int]:
+    """(smallest, largest) group for a label like "2", "4-6" or "10+" """
+    low, high = cost_range(num_people)
+    low = max(1, int(low or 1))
+    return low, max(low, int(high)) if math.isfinite(high) else low
+
+
+def plural(count: int, word: str) -> str:
+    return f"{count} {word}{'' if count == 1 else 's'}"
+
+
+def band_of(budget_range: str) -> str:
+    band = poi_ranker.first_word(budget_range)
+    return band if band in HOTEL_NIGHT_PER_PERSON else DEFAULT_BAND
+
+
+def budget_band(budget_range: str) -> Tuple[float, float]:
+    """Per person per day band of a label like "Mid-Range (₹1500-3000/day)" """
+    match = re.search(r"\(([^)]*)\)", budget_range or "")
+    return cost_range(match.group(1) if match else "")
+
+
+def planned_pois(preferences: Dict[str, Any], days: int) -> List[Dict[str, Any]]:
+    """The places the itinerary prompt leads with: best ranked POIs open in the month, one a day"""
+    month = (preferences.get('month') or 'October').lower()
+    return poi_ranker.rank_pois(preferences, month)[:min(days, MAX_PLANNED_POIS)]
+
+
+def cheapest(items: List[Dict[str, Any]], field: str) -> Optional[Tuple[float, float]]:
+    costs = [cost_range(item.get(field)) for item in items if item.get(field)]
+    return min(costs) if costs else None
+
+
+def route_km(base: str, poi_ids: List[str], month: str) -> float:
+    """Driving distance from the base through the places in order and back"""
+    engine = travel_times.travel_times()
+    stops = [row for row in [engine.find(base)] + [engine.resolve(p) for p in poi_ids] if row is not None]
+    if len(stops) < 2:
+        return 0.0
+    season = travel_times.SEASONS.index(travel_times.season_of(month))
+    path = np.array(stops + stops[:1])
+    # Legs that cannot be driven this season are left out (the planner will skip those places)
+    reachable = np.isfinite(engine.minutes[season, path[:-1], path[1:]])
+    return float(engine.distance_km[path[:-1], path[1:]][reachable].sum())
+
+
+def compute_budget(preferences: Dict[str, Any], poi_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Itemised low and high trip cost in INR for the preferences
+
+    poi_ids are the places to price; by default the POIs the itinerary
+    prompt leads with, one per day.
+    """
+    days = max(1, int(preferences.get('duration') or 1))
+    nights = max(days - 1, 0)
+    people = np.array(group_size(preferences.get('num_people') or 1), dtype=np.float64)
+    vehicles = np.ceil(people / VEHICLE_SEATS)
+    band = band_of(preferences.get('budget_range', ''))
+    month = (preferences.get('month') or '').lower()
+    accommodation_type = preferences.get('accommodation_type') or ''
+    special_interests = preferences.get('special_interests') or []
+
+    if poi_ids is None:
+        pois = planned_pois(preferences, days)
+    else:
+        pois = [poi for poi in (jharkhand_data.get_poi_by_id(p) for p in poi_ids) if poi]
+    tribe_data = jharkhand_data.load_tribal_culture()
+
+    items: List[Tuple[str, np.ndarray, str]] = []
+
+    # Entry fee or permit, whichever is higher, per person and place: (places, 2) summed over places
+    fees = np.array([
+        np.maximum(cost_range(poi.get('entry_fee') or 0),
+                   cost_range(jharkhand_data.get_permit_requirements(poi['name']).get('cost', 0))
+                   if poi.get('permit_required') else 0.0)
+        for poi in pois
+    ]).reshape(-1, 2)
+    items.append(("Entry fees and permits", fees.sum(axis=0) * people,
+                  f"{plural(len(pois), 'place')}, per person"))
+
+    if nights:
+        options = []
+        if "Homestay" in accommodation_type:
+            homestays = [cost_range(h.get('cost_per_night')) for h in tribe_data.get('homestay_options', [])]
+            if homestays:
+                options.append(np.mean(homestays, axis=0))
+        if "Hotel" in accommodation_type or "Eco-lodge" in accommodation_type or not options:
+            options.append(np.array(HOTEL_NIGHT_PER_PERSON[band], dtype=np.float64))
+        per_night = np.mean(options, axis=0)
+        items.append(("Accommodation", per_night * nights * people, f"{plural(nights, 'night')}, per person"))
+
+    items.append(("Food", np.array(FOOD_PER_PERSON_PER_DAY[band], dtype=np.float64) * days * people,
+                  f"{plural(days, 'day')}, per person"))
+
+    km = route_km(preferences.get('destination') or 'Ranchi', [poi['id'] for poi in pois], month)
+    if km:
+        fleet = (f"{int(vehicles[0])}-{int(vehicles[1])} vehicles" if vehicles[0] != vehicles[1]
+                 else plural(int(vehicles[0]), 'vehicle'))
+        items.append(("Local transport (taxi)", np.array(TAXI_RATE_PER_KM, dtype=np.float64) * km * vehicles,
+                      f"about {round(km)} km, {fleet}"))
+
+    guides = {guide['name']: cost_range(guide.get('cost_per_day')) for guide in tribe_data.get('local_guides', [])}
+    wildlife_days = sum(1 for poi in pois if poi.get('subcategory') == 'national_park')
+    cultural_days = sum(1 for poi in pois if poi.get('category') == 'cultural')
+    if preferences.get('tribal_interest') in ("High", "Very High"):
+        cultural_days += 1
+    for name, guide_days in (("Nature and Wildlife Guides", wildlife_days),
+                             ("Tribal Culture Specialists", cultural_days)):
+        if guide_days and name in guides:
+            items.append((f"Guide: {name}", np.array(guides[name]) * guide_days,
+                          f"{plural(guide_days, 'day')}, per group"))
+
+    if "Handicraft workshops" in special_interests:
+        workshop = cheapest(tribe_data.get('handicraft_workshops', []), 'cost')
+        if workshop:
+            items.append(("Handicraft workshop", np.array(workshop) * people, "one session, per person"))
+    if "Local cuisine & cooking" in special_interests:
+        cooking = cheapest(jharkhand_data.load_cuisine_data().get('cooking_experiences', []), 'cost')
+        if cooking:
+            items.append(("Cooking experience", np.array(cooking) * people, "one session, per person"))
+
+    total = np.sum([amount for _, amount, _ in items], axis=0)
+    per_person_per_day = total / (people * days)
+    band_low, band_high = budget_band(preferences.get('budget_range', ''))
+    if not band_high:
+        # No band to compare with ("Mid-Range", a free-text budget or none at all)
+        fit = "unknown"
+    elif per_person_per_day[0] > band_high:
+        fit = "over"
+    elif per_person_per_day[1] < band_low:
+        fit = "under"
+    elif per_person_per_day[0] >= band_low and per_person_per_day[1] <= band_high:
+        fit = "within"
+    else:
+        fit = "overlaps"
+
+    return {
+        "currency": "INR",
+        "people": [int(people[0]), int(people[1])],
+        "days": days,
+        "places": [poi['name'] for poi in pois],
+        "items": [{"item": name, "low": round(amount[0]), "high": round(amount[1]), "basis": basis}
+                  for name, amount, basis in items],
+        "total": {"low": round(total[0]), "high": round(total[1])},
+        "per_day": {"low": round(total[0] / days), "high": round(total[1] / days)},
+        "per_person_per_day": {"low": round(per_person_per_day[0]), "high": round(per_person_per_day[1])},
+        "budget_range": preferences.get('budget_range', ''),
+        "fit": fit,
+    }
+
+
+def inr(low: float, high: float) -> str:
+    return f"₹{low:,}" if low == high else f"₹{low:,}-{high:,}"
+
+
+def prompt_text(budget: Dict[str, Any]) -> str:
+    """Compact budget lines for a prompt"""
+    people = budget["people"]
+    group = str(people[0]) if people[0] == people[1] else f"{people[0]}-{people[1]}"
+    lines = [f"- {item['item']}: {inr(item['low'], item['high'])} ({item['basis']})" for item in budget["items"]]
+    fit = "" if budget["fit"] == "unknown" else f"; {budget['fit']} the {budget['budget_range']} budget"
+    lines.append(f"- Total for {group} {'person' if group == '1' else 'people'}, {plural(budget['days'], 'day')}: "
+                 f"{inr(budget['total']['low'], budget['total']['high'])} "
+                 f"({inr(budget['per_person_per_day']['low'], budget['per_person_per_day']['high'])} "
+                 f"per person per day{fit})")
+    return "\n".join(lines)
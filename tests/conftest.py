@@ -0,0 +1,19 @@
+import os
+import sys
+import tempfile
+
+# Services read their storage paths at import time; keep test runs out of var/ and logs/
+_tmp = tempfile.mkdtemp(prefix="sih-tests-")
+for name, filename in [
+    ("ANALYTICS_DB_PATH", "analytics.db"),
+    ("BATCH_DB_PATH", "batch_jobs.db"),
+    ("INVENTORY_DB_PATH", "inventory.db"),
+    ("JOB_DB_PATH", "jobs.db"),
+    ("RESPONSE_CACHE_DB_PATH", "response_cache.db"),
+    ("REQUEST_LOG_PATH", "requests.jsonl"),
+    ("PDF_EXPORT_DIR", "exports"),
+    ("TRAVEL_TIMES_PATH", "travel_times.npz"),
+]:
+    os.environ.setdefault(name, os.path.join(_tmp, filename))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
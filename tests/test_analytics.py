@@ -0,0 +1,63 @@
+from fastapi.testclient import TestClient
+
+import api_server
+from services import analytics, job_queue
+
+PREFERENCES = {
+    "destination": "Netarhat", "month": "November", "duration": 3, "num_people": "2",
+    "tourism_type": "Nature & Wildlife", "tribal_interest": "Medium",
+    "mobility_level": "Moderate (Light walking)", "accommodation_type": "Homestay",
+    "language_preference": "English", "budget_range": "Budget (₹500-1500/day)",
+}
+
+
+def fresh_store(monkeypatch, tmp_path):
+    store = analytics.AnalyticsStore(str(tmp_path / "analytics.db"))
+    monkeypatch.setattr(analytics, "store", store)
+    return store
+
+
+def trips(store):
+    return store.dashboard()["kpis"]["trips"]
+
+
+def test_trips_are_written_by_the_background_thread(monkeypatch, tmp_path):
+    store = fresh_store(monkeypatch, tmp_path)
+    analytics.record_trip_later(PREFERENCES, "Day 1: Netarhat sunrise point")
+    assert analytics.flush(5)
+    assert trips(store) == 1
+
+
+def test_cache_hits_are_not_recorded(monkeypatch, tmp_path):
+    store = fresh_store(monkeypatch, tmp_path)
+    replies = iter([{"itinerary": "Day 1: Netarhat"}, {"itinerary": "Day 1: Netarhat", "cached": True}])
+
+    async def fake_run_agent(request, priority, agent, func, state, output_key):
+        return next(replies)
+
+    monkeypatch.setattr(api_server, "run_agent", fake_run_agent)
+    client = TestClient(api_server.app)
+    for _ in range(2):
+        response = client.post("/api/generate_itinerary", json={"preferences": PREFERENCES},
+                               headers={"x-api-key": "analytics-test"})
+        assert response.status_code == 200
+    assert analytics.flush(5)
+    assert trips(store) == 1
+
+
+def test_retried_job_is_recorded_once(monkeypatch, tmp_path):
+    store = fresh_store(monkeypatch, tmp_path)
+    replies = iter([{"itinerary": "Day 1: Netarhat", "fallback": True},
+                    {"itinerary": "Day 1: Netarhat"}])
+    monkeypatch.setattr(api_server, "run_batch_itinerary", lambda prefs: next(replies))
+    monkeypatch.setattr(job_queue, "JOB_BACKOFF_SECONDS", 0)
+    queue = job_queue.JobQueue(str(tmp_path / "jobs.db"))
+    worker = job_queue.JobWorker(queue)
+    job_id = queue.submit("itinerary", {"preferences": PREFERENCES})["job_id"]
+
+    for _ in range(2):
+        worker.process(queue.claim(worker.owner))
+    assert queue.get(job_id)["status"] == job_queue.SUCCEEDED
+    assert queue.get(job_id)["attempts"] == 2
+    assert analytics.flush(5)
+    assert trips(store) == 1
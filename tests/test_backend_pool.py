@@ -0,0 +1,40 @@
+from services import circuit_breaker
+from services.backend_pool import BackendPool
+
+
+def make_backend(monkeypatch, outcomes):
+    pool = BackendPool(["http://127.0.0.1:9"])
+    backend = pool.backends[0]
+
+    def refresh():
+        if not outcomes.pop(0):
+            raise ConnectionError("probe failed")
+
+    monkeypatch.setattr(backend, "refresh_loaded_models", refresh)
+    return pool, backend
+
+
+def test_successful_probe_resets_failure_count(monkeypatch):
+    threshold = circuit_breaker.CIRCUIT_FAILURE_THRESHOLD
+    # Isolated probe failures with healthy probes in between never eject the backend
+    outcomes = ([False] * (threshold - 1) + [True]) * 3
+    pool, backend = make_backend(monkeypatch, outcomes)
+    while outcomes:
+        pool.check_health()
+    assert backend.breaker.state == circuit_breaker.CLOSED
+    assert backend.breaker.failures == 0
+
+
+def test_consecutive_probe_failures_eject(monkeypatch):
+    threshold = circuit_breaker.CIRCUIT_FAILURE_THRESHOLD
+    pool, backend = make_backend(monkeypatch, [False] * threshold)
+    for _ in range(threshold):
+        pool.check_health()
+    assert backend.breaker.is_open()
+
+
+def test_healthy_probe_does_not_skip_the_trial_call():
+    breaker = circuit_breaker.CircuitBreaker("test", probe=lambda: True, probe_interval=3600)
+    breaker.state = circuit_breaker.HALF_OPEN
+    breaker.record_healthy()
+    assert breaker.state == circuit_breaker.HALF_OPEN
@@ -0,0 +1,30 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import api_server
+
+PREFERENCES = {
+    "destination": "Netarhat", "month": "November", "duration": 3, "num_people": "2",
+    "tourism_type": "Nature & Wildlife", "tribal_interest": "Medium",
+    "mobility_level": "Moderate (Light walking)", "accommodation_type": "Homestay",
+    "language_preference": "English", "budget_range": "Budget (₹500-1500/day)",
+}
+
+
+def test_jsonl_accepts_bare_and_wrapped_preferences():
+    body = "\n".join([json.dumps(PREFERENCES), "", json.dumps({"preferences": PREFERENCES})]).encode()
+    items = api_server.parse_batch_payload(body, "application/x-ndjson")
+    assert [item["destination"] for item in items] == ["Netarhat", "Netarhat"]
+
+
+@pytest.mark.parametrize("line", ["[1, 2]", "\"Netarhat\"", "42", "null", "{\"preferences\": [1]}"])
+def test_jsonl_non_object_lines_are_rejected(line):
+    body = "\n".join([json.dumps(PREFERENCES), line]).encode()
+    response = TestClient(api_server.app).post(
+        "/api/batch/itineraries", content=body,
+        headers={"content-type": "application/x-ndjson", "x-api-key": "batch-payload-test"},
+    )
+    assert response.status_code == 422
+    assert "line 2" in response.json()["detail"]
@@ -0,0 +1,34 @@
+from fastapi.testclient import TestClient
+
+import api_server
+from services import cache_warmer, response_cache
+
+ITINERARY_PREFERENCES = {"destination": "Netarhat", "month": "November", "duration": 3,
+                         "tourism_type": "Nature & Wildlife", "budget_range": "Budget (₹500-1500/day)"}
+
+
+def test_bundle_warms_the_keys_endpoints_request(monkeypatch):
+    requested = {}
+
+    async def capture(request, priority, agent, func, state, output_key):
+        requested[agent] = response_cache.cache_key(agent, state["preferences"])
+        return {}
+
+    monkeypatch.setattr(api_server, "run_agent", capture)
+    client = TestClient(api_server.app)
+    headers = {"x-api-key": "cache-warmer-test"}
+    for endpoint in ("culture_recommendations", "food_recommendations", "activities_recommendations"):
+        assert client.post(f"/api/{endpoint}", json={"prompt": "Netarhat"}, headers=headers).status_code == 200
+    assert client.post("/api/weather_forecast", json={"location": "Netarhat"}, headers=headers).status_code == 200
+
+    warmed = {agent: response_cache.cache_key(agent, preferences)
+              for agent, preferences in cache_warmer.bundle("itinerary", ITINERARY_PREFERENCES)}
+    assert warmed["itinerary"] == response_cache.cache_key("itinerary", ITINERARY_PREFERENCES)
+    assert set(requested) == set(cache_warmer.BUNDLE_AGENTS)
+    for agent, key in requested.items():
+        assert warmed[agent] == key
+
+
+def test_only_itineraries_are_bundled():
+    preferences = {"destination": "Netarhat", "month": "October"}
+    assert cache_warmer.bundle("cultural", preferences) == [("cultural", preferences)]
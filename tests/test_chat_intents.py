@@ -0,0 +1,31 @@
+import pytest
+
+from services import chat_intents
+
+
+@pytest.mark.parametrize("question", [
+    "Where can I stay in October?",
+    "What is the weather in Ranchi in November?",
+    "How crowded is Jharkhand in November?",
+    "Any homestays available in March?",
+    "Where can I find a hotel in November?",
+    "Can I book a homestay in December?",
+    "what is happening in November",
+])
+def test_month_questions_are_not_festival_lookups(question):
+    result = chat_intents.classifier().classify(question)
+    assert not result.answered
+
+
+@pytest.mark.parametrize("question", [
+    "Which festivals happen in November?",
+    "Are there any festivals in October?",
+    "tribal festivals in August",
+    "When is the Sohrai festival?",
+    "which month is Sarhul",
+])
+def test_festival_questions_are_answered_from_data(question):
+    result = chat_intents.classifier().classify(question)
+    assert result.intent == "festivals"
+    assert result.answered
+
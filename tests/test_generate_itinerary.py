@@ -0,0 +1,29 @@
+from agents import generate_itinerary
+from services import model_router
+
+PREFERENCES = {"destination": "Ranchi", "month": "March", "start_date": "2027-03-01", "num_people": "2",
+               "tourism_type": "Nature & Wildlife", "budget_range": "Mid-Range (₹1500-3000/day)"}
+
+
+def prompt_for(monkeypatch, preferences):
+    prompts = []
+
+    def fake_invoke(agent, messages, *args, **kwargs):
+        prompts.append(messages[0].content)
+        return "Day 1: Ranchi"
+
+    monkeypatch.setattr(model_router, "invoke", fake_invoke)
+    assert generate_itinerary.generate_itinerary({"preferences": preferences}) == {"itinerary": "Day 1: Ranchi"}
+    return prompts[0]
+
+
+def test_overlong_trip_only_loses_the_dated_events(monkeypatch):
+    # The event calendar refuses ranges over a year; the rest of the context must survive that
+    prompt = prompt_for(monkeypatch, {**PREFERENCES, "duration": 400})
+    assert "EVENTS DURING THE TRAVEL DATES" not in prompt
+    destinations = prompt.split("**AVAILABLE DESTINATIONS")[1].split("**TRIBAL")[0]
+    assert '"name"' in destinations
+    budget = prompt.split("**COMPUTED TRIP BUDGET (INR):**")[1].split("**CULTURAL")[0]
+    assert "Accommodation" in budget
+    legs = prompt.split("road conditions):**")[1].split("**ACCOMMODATION")[0]
+    assert legs.strip() != "[]"
@@ -0,0 +1,160 @@
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from services import inventory, response_cache
+
+WORKSHOP = "Bamboo Craft Workshop"
+
+
+@pytest.fixture
+def store(tmp_path):
+    return inventory.Inventory(db_path=str(tmp_path / "inventory.db"))
+
+
+def open_day(store, kind=inventory.WORKSHOP, name=WORKSHOP) -> date:
+    """First day from tomorrow on that the resource is open"""
+    resource = store.resource(kind, name)
+    day = date.today() + timedelta(days=1)
+    while not resource.capacity_on(day):
+        day += timedelta(days=1)
+    return day
+
+
+def free_seats(store, day):
+    return store.free_units(store.resource(inventory.WORKSHOP, WORKSHOP), [day])[day.isoformat()]
+
+
+def test_hold_takes_capacity_until_full(store):
+    day = open_day(store)
+    capacity = store.resource(inventory.WORKSHOP, WORKSHOP).capacity
+    hold = store.hold(inventory.WORKSHOP, WORKSHOP, day, 1, capacity - 1)
+    assert hold["status"] == inventory.HELD
+    assert hold["units"] == capacity - 1
+    assert free_seats(store, day) == 1
+    with pytest.raises(inventory.Unavailable):
+        store.hold(inventory.WORKSHOP, WORKSHOP, day, 1, 2)
+    store.hold(inventory.WORKSHOP, WORKSHOP, day, 1, 1)
+    assert free_seats(store, day) == 0
+
+
+def test_hold_rejects_closed_and_past_days(store):
+    resource = store.resource(inventory.WORKSHOP, WORKSHOP)
+    day = date.today() + timedelta(days=1)
+    while resource.capacity_on(day):
+        day += timedelta(days=1)
+    with pytest.raises(inventory.Unavailable):
+        store.hold(inventory.WORKSHOP, WORKSHOP, day, 1, 1)
+    with pytest.raises(ValueError):
+        store.hold(inventory.WORKSHOP, WORKSHOP, date.today() - timedelta(days=1), 1, 1)
+
+
+def test_release_gives_capacity_back_once(store):
+    day = open_day(store)
+    hold = store.hold(inventory.WORKSHOP, WORKSHOP, day, 2, 3)
+    assert store.confirm(hold["hold_id"])["status"] == inventory.CONFIRMED
+    released = store.release(hold["hold_id"])
+    assert released["status"] == inventory.RELEASED
+    assert free_seats(store, day) == store.resource(inventory.WORKSHOP, WORKSHOP).capacity
+    assert store.release(hold["hold_id"]) is None
+
+
+def test_expired_holds_free_capacity(store, monkeypatch):
+    monkeypatch.setattr(inventory, "INVENTORY_HOLD_SECONDS", 0.2)
+    day = open_day(store)
+    capacity = store.resource(inventory.WORKSHOP, WORKSHOP).capacity
+    lapsed = store.hold(inventory.WORKSHOP, WORKSHOP, day, 1, capacity)
+    time.sleep(0.3)
+    # The full workshop can be held again without anyone calling expire() first
+    hold = store.hold(inventory.WORKSHOP, WORKSHOP, day, 1, capacity)
+    assert hold["status"] == inventory.HELD
+    assert store.get(lapsed["hold_id"])["status"] == inventory.EXPIRED
+    assert store.confirm(lapsed["hold_id"]) is None
+    assert free_seats(store, day) == 0
+
+
+def test_expire_releases_only_lapsed_holds(store, monkeypatch):
+    day = open_day(store)
+    monkeypatch.setattr(inventory, "INVENTORY_HOLD_SECONDS", 0.2)
+    lapsed = store.hold(inventory.WORKSHOP, WORKSHOP, day, 1, 2)
+    monkeypatch.setattr(inventory, "INVENTORY_HOLD_SECONDS", 900)
+    live = store.hold(inventory.WORKSHOP, WORKSHOP, day, 1, 1)
+    time.sleep(0.3)
+    assert store.expire() == 1
+    assert store.get(lapsed["hold_id"])["status"] == inventory.EXPIRED
+    assert store.get(live["hold_id"])["status"] == inventory.HELD
+    assert free_seats(store, day) == store.resource(inventory.WORKSHOP, WORKSHOP).capacity - 1
+
+
+class RacingConnection:
+    """Connection that lets another writer in right after the first unlocked usage read"""
+
+    def __init__(self, conn, on_read):
+        self.conn = conn
+        self.on_read = on_read
+        self.reads = 0
+
+    def execute(self, sql, *args):
+        cursor = self.conn.execute(sql, *args)
+        if sql.startswith("SELECT day, used, version FROM usage"):
+            self.reads += 1
+            if self.reads == 1:
+                rows = cursor.fetchall()
+                self.on_read()
+                return iter(rows)
+        return cursor
+
+    def __enter__(self):
+        return self.conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self.conn.__exit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+
+@pytest.mark.parametrize("existing_row", [False, True])
+def test_hold_retries_after_a_conflicting_write(store, monkeypatch, existing_row):
+    day = open_day(store)
+    other = inventory.Inventory(db_path=store.db_path)
+    if existing_row:
+        other.release(other.hold(inventory.WORKSHOP, WORKSHOP, day, 1, 1)["hold_id"])
+    racing = RacingConnection(store.connection(),
+                              lambda: other.hold(inventory.WORKSHOP, WORKSHOP, day, 1, 2))
+    monkeypatch.setattr(store, "connection", lambda: racing)
+
+    store.hold(inventory.WORKSHOP, WORKSHOP, day, 1, 3)
+    assert racing.reads == 2
+    monkeypatch.undo()
+    assert free_seats(store, day) == store.resource(inventory.WORKSHOP, WORKSHOP).capacity - 5
+
+
+def test_filter_needs_room_on_every_day(store):
+    resource = store.resource(inventory.WORKSHOP, WORKSHOP)
+    start = open_day(store)
+    while not all(resource.capacity_on(start + timedelta(days=offset)) for offset in range(3)):
+        start += timedelta(days=1)
+    preferences = {"start_date": start.isoformat(), "duration": 3, "num_people": "2"}
+    records = [{"name": WORKSHOP}]
+    assert store.filter_available(inventory.WORKSHOP, records, preferences) == tuple(records)
+
+    # The middle day is fully booked; the first and last days still have room
+    store.hold(inventory.WORKSHOP, WORKSHOP, start + timedelta(days=1), 1, resource.capacity)
+    assert store.filter_available(inventory.WORKSHOP, records, preferences) == ()
+
+
+def test_dated_cache_key_follows_availability(store, monkeypatch):
+    monkeypatch.setattr(inventory, "inventory", store)
+    day = open_day(store)
+    preferences = {"destination": "Ranchi", "start_date": day.isoformat(), "duration": 1, "num_people": "2"}
+    itinerary_key = response_cache.cache_key("itinerary", preferences)
+    weather_key = response_cache.cache_key("weather", preferences)
+
+    store.hold(inventory.WORKSHOP, WORKSHOP, day, 1, store.resource(inventory.WORKSHOP, WORKSHOP).capacity)
+    assert response_cache.cache_key("itinerary", preferences) != itinerary_key
+    assert response_cache.cache_key("weather", preferences) == weather_key
+    # Undated trips are not filtered by availability, so their key does not depend on it
+    undated = {"destination": "Ranchi", "duration": 1}
+    assert store.availability_key(undated) == ""
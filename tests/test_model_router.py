@@ -0,0 +1,29 @@
+import time
+
+from services import model_router
+from services.backend_pool import BackendPool
+
+
+def make_router():
+    return model_router.ModelRouter(model_router.MODEL_TIERS, model_router.DEFAULT_ROUTES,
+                                    BackendPool(["http://127.0.0.1:9"]))
+
+
+def test_long_queue_waits_degrade_large_tier():
+    router = make_router()
+    for _ in range(20):
+        router._waits["large"].append((time.monotonic(), model_router.DEGRADE_P95_WAIT_SECONDS + 5))
+    assert router.select_tier("itinerary") == ("small", True)
+    assert router.select_tier("itinerary", "day_trip") == ("small", False)
+
+
+def test_degradation_ends_when_waits_age_out(monkeypatch):
+    monkeypatch.setattr(model_router, "DEGRADE_WINDOW_SECONDS", 0.2)
+    router = make_router()
+    for _ in range(20):
+        router._waits["large"].append((time.monotonic(), model_router.DEGRADE_P95_WAIT_SECONDS + 5))
+    assert router.select_tier("itinerary") == ("small", True)
+    time.sleep(0.3)
+    # No call reached the large tier meanwhile, yet it is tried again
+    assert router.select_tier("itinerary") == ("large", False)
+    assert router.route_stats()["queue_wait_p95"]["large"] == 0.0
@@ -0,0 +1,34 @@
+from agents import packing_list_generator as packing
+from data_loader import jharkhand_data
+
+SEASONS = list(jharkhand_data.load_seasonal_constraints()["seasons"])
+
+
+def items(season, days=3):
+    return {(category, item): quantity
+            for category, item, quantity in packing.compute_packing_items(season, ("mixed",), "moderate", days)}
+
+
+def test_mixed_season_packs_for_every_season():
+    assert packing.resolve_season("Mixed") == packing.MIXED_SEASON
+    mixed = items(packing.MIXED_SEASON)
+    for season in SEASONS:
+        for key, quantity in items(season).items():
+            assert mixed[key] >= quantity
+    # Rain gear from the monsoon and warm layers from the winter both make the list
+    assert set(items("monsoon")) - set(items("winter")) <= set(mixed)
+    assert set(items("winter")) - set(items("monsoon")) <= set(mixed)
+
+
+def test_mixed_season_lists_every_seasons_precautions():
+    text = packing.render_packing_list(packing.MIXED_SEASON, ("mixed",), "moderate", 3)
+    for season in SEASONS:
+        for precaution in jharkhand_data.load_seasonal_constraints()["seasons"][season].get("safety_precautions", []):
+            assert f"- {precaution}" in text
+    bullets = [line for line in text.splitlines() if line.startswith("- ")]
+    assert len(bullets) == len(set(bullets))
+
+
+def test_season_labels_and_months_still_resolve():
+    assert packing.resolve_season("Post-Monsoon") == "post_monsoon"
+    assert packing.resolve_season("July") == "monsoon"
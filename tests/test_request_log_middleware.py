@@ -0,0 +1,144 @@
+import asyncio
+import json
+import threading
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import api_server
+from scripts import replay_requests
+from services import admission, request_context, request_log
+
+
+def logged(endpoint):
+    """Records of an endpoint once the background listener has written them"""
+    records = []
+    deadline = time.time() + 5
+    while not records and time.time() < deadline:
+        time.sleep(0.05)
+        records = [r for r in request_log.read() if r["endpoint"] == endpoint]
+    return records
+
+
+def disconnecting_client(app, path, body, disconnect_after):
+    """Drive one POST through an ASGI app, dropping the connection after a delay"""
+    sent = []
+
+    async def drive():
+        disconnected = asyncio.Event()
+        delivered = False
+
+        async def receive():
+            nonlocal delivered
+            if not delivered:
+                delivered = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+            "headers": [(b"content-type", b"application/json"), (b"x-api-key", b"disconnect-test")],
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+        }
+        loop = asyncio.get_running_loop()
+        loop.call_later(disconnect_after, disconnected.set)
+        await asyncio.wait_for(app(scope, receive, send), timeout=10)
+
+    asyncio.run(drive())
+    return sent
+
+
+def test_client_disconnect_cancels_generation():
+    cancelled = threading.Event()
+    seen = {}
+
+    def generation(payload):
+        seen["payload"] = payload
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            if request_context.is_cancelled():
+                cancelled.set()
+                return None
+            time.sleep(0.05)
+        return "finished"
+
+    inner = FastAPI()
+
+    @inner.post("/api/slow")
+    async def slow(request: Request):
+        payload = await request.json()
+        return await admission.run(request, "interactive", generation, payload)
+
+    app = api_server.RequestLogMiddleware(inner)
+    started = time.perf_counter()
+    sent = disconnecting_client(app, "/api/slow", json.dumps({"destination": "Ranchi"}).encode(), 0.3)
+
+    assert cancelled.is_set()
+    assert time.perf_counter() - started < 3
+    # The endpoint still got the body the middleware read for the log
+    assert seen["payload"] == {"destination": "Ranchi"}
+    assert sent[0]["status"] == admission.CLIENT_CLOSED_REQUEST
+
+    records = logged("/api/slow")
+    assert records[-1]["status"] == admission.CLIENT_CLOSED_REQUEST
+    assert records[-1]["payload"] == {"destination": "Ranchi"}
+
+
+def test_query_arrival_time_and_raw_bodies_are_logged():
+    inner = FastAPI()
+
+    @inner.get("/api/lookup")
+    def lookup(start: str):
+        time.sleep(0.2)
+        return {"start": start}
+
+    @inner.post("/api/upload")
+    async def upload(request: Request):
+        return {"bytes": len(await request.body())}
+
+    client = TestClient(api_server.RequestLogMiddleware(inner))
+    sent_at = time.time()
+    assert client.get("/api/lookup", params={"start": "2026-11-01"}).json() == {"start": "2026-11-01"}
+    ndjson = '{"destination": "Ranchi"}\n{"destination": "Netarhat"}\n'
+    client.post("/api/upload", content=ndjson, headers={"Content-Type": "application/x-ndjson"})
+
+    lookup_record = logged("/api/lookup")[-1]
+    assert lookup_record["query"] == "start=2026-11-01"
+    assert sent_at <= lookup_record["ts"] < sent_at + 0.15
+    upload_record = logged("/api/upload")[-1]
+    assert upload_record["payload"] is None
+    assert upload_record["body"] == ndjson
+    assert upload_record["content_type"] == "application/x-ndjson"
+
+
+class RecordingSession:
+    def __init__(self):
+        self.calls = []
+
+    def request(self, method, url, **kwargs):
+        self.calls.append((method, url, kwargs))
+        return type("Response", (), {"status_code": 200})()
+
+
+def test_replay_sends_query_and_raw_body():
+    session = RecordingSession()
+    replay_requests.send(lambda: session, "http://server", {
+        "method": "GET", "endpoint": "/api/events", "query": "start=2026-11-01&location=Ranchi", "payload": None,
+    }, timeout=5)
+    replay_requests.send(lambda: session, "http://server", {
+        "method": "POST", "endpoint": "/api/batch/itineraries", "query": None, "payload": None,
+        "body": '{"destination": "Ranchi"}\n', "content_type": "application/x-ndjson",
+    }, timeout=5)
+
+    method, url, kwargs = session.calls[0]
+    assert (method, url, kwargs["params"]) == ("GET", "http://server/api/events", "start=2026-11-01&location=Ranchi")
+    method, url, kwargs = session.calls[1]
+    assert kwargs["data"] == b'{"destination": "Ranchi"}\n'
+    assert kwargs["headers"] == {"Content-Type": "application/x-ndjson"}
+    assert "json" not in kwargs
@@ -0,0 +1,87 @@
+import pytest
+
+from services import semantic_cache
+
+STATE = {"preferences": {"destination": "Netarhat", "month": "January"}}
+
+LONG_QUESTION = ("Is Netarhat good for a vegetarian family travelling with two small kids and grandparents "
+                 "in winter by car from Ranchi, staying three nights near the sunset point")
+
+# Questions that look alike but need different answers
+NEGATIVE_PAIRS = [
+    ("Where can I get vegetarian food?", "Where can I get non-vegetarian food?"),
+    ("How do I reach Netarhat from Ranchi?", "How do I reach Netarhat from Jamshedpur?"),
+    ("Where is the best spot for sunrise?", "Where is the best spot for sunset?"),
+    ("Is it safe at night?", "Is it safe during the day?"),
+    ("Is the forest trail open at night for a guided walk?", "Is the forest trail open during the day for a guided walk?"),
+    (LONG_QUESTION, LONG_QUESTION.replace("vegetarian", "non-vegetarian")),
+    (LONG_QUESTION, LONG_QUESTION.replace("sunset", "sunrise")),
+    (LONG_QUESTION, LONG_QUESTION.replace("Ranchi", "Jamshedpur")),
+]
+
+# Paraphrases that should share an answer; the first is the example the cache was built for
+PARAPHRASE_PAIRS = [
+    ("Is Betla safe in monsoon?", "Can I visit Betla National Park in July?"),
+]
+
+POSITIVE_PAIRS = [
+    ("what to pack for Netarhat in winter?", "what should I carry to Netarhat in January?"),
+    ("Is it safe for kids?", "Is it safe for children?"),
+    ("how do I get there", "how do I travel there"),
+]
+
+
+def hashing_cache():
+    return semantic_cache.SemanticCache(embedder=semantic_cache.HashingEmbedder())
+
+
+@pytest.mark.parametrize("stored, asked", NEGATIVE_PAIRS + [(b, a) for a, b in NEGATIVE_PAIRS])
+def test_hashing_embedder_does_not_serve_different_questions(stored, asked):
+    cache = hashing_cache()
+    cache.store(stored, STATE, "answer")
+    assert cache.lookup(asked, STATE) is None
+
+
+@pytest.mark.parametrize("stored, asked", POSITIVE_PAIRS)
+def test_hashing_embedder_serves_rewordings(stored, asked):
+    cache = hashing_cache()
+    cache.store(stored, STATE, "answer")
+    assert cache.lookup(asked, STATE)["answer"] == "answer"
+
+
+@pytest.mark.parametrize("stored, asked", PARAPHRASE_PAIRS)
+def test_hashing_embedder_does_not_match_paraphrases(stored, asked):
+    # Documented limitation of the fallback: it is an exact-match cache in practice
+    cache = hashing_cache()
+    cache.store(stored, STATE, "answer")
+    assert cache.lookup(asked, STATE) is None
+
+
+@pytest.fixture(scope="module")
+def sentence_embedder():
+    pytest.importorskip("sentence_transformers")
+    try:
+        return semantic_cache.SentenceTransformerEmbedder()
+    except OSError as e:
+        pytest.skip(f"Model {semantic_cache.SEMANTIC_CACHE_MODEL} is not available: {e}")
+
+
+@pytest.mark.parametrize("stored, asked", PARAPHRASE_PAIRS + POSITIVE_PAIRS)
+def test_sentence_embedder_serves_paraphrases(sentence_embedder, stored, asked):
+    cache = semantic_cache.SemanticCache(embedder=sentence_embedder)
+    cache.store(stored, STATE, "answer")
+    assert cache.lookup(asked, STATE)["answer"] == "answer"
+
+
+@pytest.mark.parametrize("stored, asked", NEGATIVE_PAIRS)
+def test_sentence_embedder_does_not_serve_different_questions(sentence_embedder, stored, asked):
+    cache = semantic_cache.SemanticCache(embedder=sentence_embedder)
+    cache.store(stored, STATE, "answer")
+    assert cache.lookup(asked, STATE) is None
+
+
+def test_answers_are_scoped_to_the_trip():
+    cache = hashing_cache()
+    cache.store("what should I pack?", STATE, "answer")
+    other_trip = {"preferences": {"destination": "Betla", "month": "July"}}
+    assert cache.lookup("what should I pack?", other_trip) is None
@@ -0,0 +1,30 @@
+from fastapi.testclient import TestClient
+
+import api_server
+from services import travel_times
+
+client = TestClient(api_server.app)
+
+
+def test_travel_time_uses_display_names():
+    result = travel_times.travel_time("netarhat", "Ranchi", "july")
+    poi = next(p for p in travel_times.jharkhand_data.load_pois()["pois"] if p["id"] == "netarhat")
+    assert result["from"] == poi["name"]
+    assert result["to"] == "Ranchi"
+    assert result["season"] == "monsoon"
+
+
+def test_api_rejects_unknown_month():
+    response = client.get("/api/travel_time", params={"origin": "Ranchi", "destination": "netarhat", "month": "Foo"},
+                          headers={"x-api-key": "travel-time-test"})
+    assert response.status_code == 422
+
+
+def test_api_travel_time():
+    response = client.get("/api/travel_time", params={"origin": "Ranchi", "destination": "netarhat", "month": "July"},
+                          headers={"x-api-key": "travel-time-test"})
+    assert response.status_code == 200
+    assert response.json()["to"] != "netarhat"
+    missing = client.get("/api/travel_time", params={"origin": "Ranchi", "destination": "Atlantis"},
+                         headers={"x-api-key": "travel-time-test"})
+    assert missing.status_code == 404
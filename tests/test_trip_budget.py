@@ -0,0 +1,26 @@
+import pytest
+
+from services import trip_budget
+
+PREFERENCES = {"destination": "Ranchi", "month": "November", "duration": 3, "num_people": "2",
+               "tourism_type": "Mixed Experience"}
+
+
+@pytest.mark.parametrize("budget_range", ["", "Mid-Range", "Flexible, whatever it takes"])
+def test_budget_without_a_band_is_not_compared(budget_range):
+    budget = trip_budget.compute_budget({**PREFERENCES, "budget_range": budget_range})
+    assert budget["fit"] == "unknown"
+    assert budget["total"]["high"] > 0
+    text = trip_budget.prompt_text(budget)
+    assert "budget)" not in text
+    assert text.rstrip().endswith("per person per day)")
+
+
+@pytest.mark.parametrize("budget_range, fit", [
+    ("Budget (₹1-2/day)", "over"),
+    ("Luxury (₹1000000+/day)", "under"),
+])
+def test_budget_is_compared_with_the_band(budget_range, fit):
+    budget = trip_budget.compute_budget({**PREFERENCES, "budget_range": budget_range})
+    assert budget["fit"] == fit
+    assert trip_budget.prompt_text(budget).endswith(f"{fit} the {budget_range} budget)")